@@ -1,6 +1,9 @@
 import logging
 import re
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from io import BytesIO
 from typing import List, Dict, Optional
 from PIL import Image
@@ -38,6 +41,19 @@ class ImageDescriber:
             logger.error(f"Error loading models: {e}")
             raise
 
+        # Pooled HTTP session (keep-alive, retries) for images the browser cannot provide
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8,
+                              max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504]))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _download_image(self, src: str, headers: Optional[Dict] = None, cookies: Optional[Dict] = None) -> bytes:
+        """Downloads image bytes through the pooled session, with the browser's cookies and headers."""
+        response = self.session.get(src, timeout=15, headers=headers, cookies=cookies)
+        response.raise_for_status()
+        return response.content
+
     def translate_text(self, text: str) -> str:
 
         if not text:
@@ -66,10 +82,20 @@ class ImageDescriber:
             logger.error(f"Translation error: {e}")
             return text  # Fallback to original text if translation fails
 
-    def describe_image(self, image_data: Dict, max_tokens: int = 500) -> Optional[str]:
-
+    def describe_image(self, image_data: Dict, max_tokens: int = 500, image_bytes: Optional[bytes] = None,
+                       headers: Optional[Dict] = None, cookies: Optional[Dict] = None) -> Optional[str]:
+        """
+        Describes an image in Polish (translated alt text or generated caption).
+
+        Args:
+            image_data: Image entry from the scraper ('src', 'alt', 'is_meaningful_alt').
+            image_bytes: Image bytes already fetched by the browser; downloaded only when missing.
+            headers: Extra request headers for the download (e.g. Referer, User-Agent).
+            cookies: Browser cookies for the download (auth-protected images).
+        """
+        start_time = time.time()
+        src = image_data.get("src", "")
         try:
-            src = image_data.get("src","")
             alt = clean_text(image_data.get("alt", ""))
             is_meaningful_alt = image_data.get("is_meaningful_alt", False)
 
@@ -82,13 +108,14 @@ class ImageDescriber:
                 alt_pl = self.translate_text(alt)
                 return alt_pl
 
-            if not src:
-                logger.warning("No image URL provided")
-                return None
+            if image_bytes is None:
+                if not src:
+                    logger.warning("No image URL provided")
+                    return None
+                image_bytes = self._download_image(src, headers=headers, cookies=cookies)
+                print(f"Downloaded image ({len(image_bytes)} B) in {time.time() - start_time:.3f}s")
 
-            response = requests.get(src, timeout=15)
-            response.raise_for_status()
-            with Image.open(BytesIO(response.content)) as image:
+            with Image.open(BytesIO(image_bytes)) as image:
                 image = image.convert("RGB")
 
                 inputs = self.processor(
@@ -104,7 +131,7 @@ class ImageDescriber:
                 )
 
                 caption = self.processor.decode(generated_ids[0], skip_special_tokens=True)
-               
+                print(f"Image captioned in {time.time() - start_time:.2f}s")
                 return self.translate_text(caption)
 
         except Exception as e:
@@ -1,17 +1,87 @@
+import functools
 import logging
+import threading
 import time
 import subprocess
 import json
 import os
 from typing import List, Dict, Optional
 import numpy as np
-from llama_cpp import Llama, LlamaTokenizer
+import torch
+from llama_cpp import Llama, LlamaTokenizer, StoppingCriteriaList
 from huggingface_hub import hf_hub_download
 from sentence_transformers import SentenceTransformer, util
 import re
 
 logger = logging.getLogger(__name__)
 
+# Intencje pytań o fakty publikowane w danych strukturalnych (schema.org): właściwość faktu -> wzorce pytań
+FACT_INTENTS = {
+    "price": [r"\bcen[aęy]\b", r"\bkosztuj", r"\bkoszt\b", r"\bile płac"],
+    "availability": [r"\bdostępn", r"\bna stanie\b", r"\bw magazynie\b"],
+    "opening_hours": [r"\bgodzin\w* otwarcia", r"\botwart", r"\bczynn", r"\bo której"],
+    "address": [r"\badres", r"\bgdzie (się )?znajduje", r"\bgdzie jest\b", r"\blokalizacj"],
+    "telephone": [r"\btelefon", r"\bzadzwoni"],
+    "email": [r"\be-?mail"],
+    "rating": [r"\bocen[aęy]\b", r"\bgwiazdk", r"\brating\b"],
+    "ingredients": [r"\bskładnik", r"\bco (jest )?potrzebne\b"],
+    "servings": [r"\bporcj", r"\bdla ilu osób"],
+    "total_time": [r"\bjak długo\b", r"\bile czasu\b"],
+    "prep_time": [r"\bczas przygotowania"],
+    "cook_time": [r"\bczas (gotowania|pieczenia)"],
+    "author": [r"\bautor", r"\bkto napisał"],
+    "date_published": [r"\bkiedy (został |została |zostało )?opublikowan", r"\bdata publikacji"],
+    "brand": [r"\bmark[aęi]\b", r"\bproducent"],
+    "start_date": [r"\bkiedy (się )?odbywa", r"\bdata wydarzenia"],
+    "location": [r"\bgdzie (się )?odbywa", r"\bmiejsce wydarzenia"]
+}
+
+# Pytania wymagające syntezy lub wyjaśnienia (porównania, przyczyny, instrukcje) trafiają od razu do LLM,
+# bez próby odpowiedzi jednym zdaniem z treści strony
+GENERATIVE_PATTERNS = [
+    r"\bczym (się )?różn", r"\bporówn", r"\bdlaczego\b", r"\bwyjaśnij", r"\bopisz\b", r"\bstreść",
+    r"\bpodsumuj", r"\bwymień\b", r"\bjak (mogę |można |należy )?(zrobić|przygotować|ugotować|zainstalować)",
+    r"\bjakie (są|były) (wszystkie|najważniejsze|główne)\b", r"\bzalety\b", r"\bwady\b"
+]
+
+# Nagłówki części kontekstu (PageAssistant._build_context_text) pomijane przy podziale na zdania
+CONTEXT_LABELS = ("Nagłówki strony:", "Treść paragrafów:", "Listy na stronie:", "Linki na stronie:", "Główna treść:",
+                  "Zaktualizowana treść strony:")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-ZĄĆĘŁŃÓŚŹŻ0-9\"„(])")
+
+FACT_LABELS = {
+    "price": "Cena", "availability": "Dostępność", "opening_hours": "Godziny otwarcia", "address": "Adres",
+    "telephone": "Telefon", "email": "E-mail", "rating": "Ocena", "ingredients": "Składniki",
+    "servings": "Liczba porcji", "total_time": "Czas całkowity", "prep_time": "Czas przygotowania",
+    "cook_time": "Czas gotowania", "author": "Autor", "date_published": "Data publikacji", "brand": "Marka",
+    "start_date": "Termin", "location": "Miejsce"
+}
+
+def _locked(method):
+    """
+    Wykonuje metodę pod blokadą stanu kontekstu (wywołania z wątku przeglądarki i wątku modelu);
+    blokada obejmuje tylko odczyt i podmianę stanu, nie generowanie.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _model_operation(method):
+    """
+    Szereguje operacje modelu blokadą modelu i zapamiętuje początek operacji (do przerywania przez
+    cancel). Operacja działa na migawce kontekstu (_context_snapshot), więc ładowanie kontekstu
+    w wątku przeglądarki nie czeka na trwające generowanie.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.model_lock:
+            self.operation_started = time.monotonic()
+            self._apply_pending_llm_state()
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class PageAssistant:
     def __init__(self, 
                  model_repo_id: str = "speakleash/Bielik-4.5B-v3.0-Instruct-GGUF",
@@ -26,6 +96,25 @@ class PageAssistant:
         self.context_chunks = None
         self.chunk_embeddings_cache = None
         self.chunk_relevance_cache = {}
+        # Zdania fragmentu kontekstu i ich znormalizowane osadzenia (tekst fragmentu -> (zdania, macierz))
+        self.sentence_cache: Dict[str, tuple] = {}
+        # Odpowiedź ekstrakcyjna (jedno zdanie z treści) jest zwracana bez LLM przy podobieństwie do pytania
+        # co najmniej extractive_threshold i przewadze nad kolejnym zdaniem co najmniej extractive_margin
+        self.extractive_threshold = 0.6
+        self.extractive_margin = 0.05
+        self.extractive_chunks = 3
+        self.page_facts: List[Dict] = []
+        self.loaded_content = None  # Dane 'content', z których zbudowano bieżący kontekst
+        self.qa_stats = {"questions": 0, "fact_answers": 0, "fact_injections": 0, "llm_answers": 0,
+                         "llm_time": 0.0, "fact_time": 0.0, "extractive_answers": 0, "extractive_time": 0.0}
+        # Kontekst może być używany z wątku przeglądarki i wątku modelu (silnik asynchroniczny): lock chroni
+        # krótkie odczyty i podmiany stanu kontekstu, model_lock szereguje operacje modelu
+        self.lock = threading.RLock()
+        self.model_lock = threading.Lock()
+        # Stan LLM przywrócony z historii, wczytywany do modelu na początku kolejnej operacji modelu
+        self.pending_llm_state = None
+        self.operation_started = 0.0
+        self.cancel_requested = -1.0
         os.makedirs(self.models_dir, exist_ok=True)
 
         print(f"Używanie modelu repozytorium: {model_repo_id}, plik modelu: {model_filename}")
@@ -98,10 +187,20 @@ class PageAssistant:
         finally:
             print(f"Czas chunkingu: {time.time() - start_time:.2f}s")
 
+    def cancel(self) -> None:
+        """Przerywa trwającą operację modelu (generowanie kończy się po bieżącym tokenie)."""
+        self.cancel_requested = time.monotonic()
+
+    def is_cancelled(self) -> bool:
+        """Czy bieżąca operacja modelu została przerwana po jej rozpoczęciu."""
+        return self.cancel_requested >= self.operation_started
+
     def _generate_response(self, prompt: str, max_tokens: int = 200, stop_sequences: list = None) -> Dict:
         """Generuje odpowiedź za pomocą modelu LLM."""
         start_time = time.time()
         vram_start = self._get_vram_usage()
+        if self.is_cancelled():
+            return {"text": "", "time": 0.0, "vram_usage": vram_start, "cancelled": True}
         try:
             print(f"Generowanie odpowiedzi dla promptu: {prompt[:100]}... (max_tokens={max_tokens})")
             default_stop = ["\n\n", "<|endoftext|>"]
@@ -117,7 +216,8 @@ class PageAssistant:
                 mirostat_mode=2,
                 mirostat_tau=5.0,
                 mirostat_eta=0.1,
-                echo=False
+                echo=False,
+                stopping_criteria=StoppingCriteriaList([lambda input_ids, logits: self.is_cancelled()])
             )
             text = response["choices"][0]["text"].strip()
             vram_end = self._get_vram_usage()
@@ -125,24 +225,19 @@ class PageAssistant:
             return {
                 "text": text,
                 "time": time.time() - start_time,
-                "vram_usage": max(vram_start, vram_end)
+                "vram_usage": max(vram_start, vram_end),
+                # Przerwanie w trakcie generowania (kryterium stopu) daje obcięty tekst, który nie jest odczytywany
+                "cancelled": self.is_cancelled()
             }
         except Exception as e:
             logger.error(f"Błąd generowania odpowiedzi: {e}")
-            return {"text": "", "time": time.time() - start_time, "vram_usage": vram_start}
+            return {"text": "", "time": time.time() - start_time, "vram_usage": vram_start,
+                    "cancelled": self.is_cancelled()}
         finally:
             print(f"Czas generowania: {time.time() - start_time:.2f}s")
 
-    def load_context(self, content: Dict):
-        """Ładuje kontekst z danych scrapera, uwzględniając strukturę treści."""
-        if not content or not isinstance(content, dict):
-            logger.warning("Brak lub nieprawidłowe dane kontekstu.")
-            self.loaded_context = None
-            self.context_chunks = None
-            self.chunk_embeddings_cache = None
-            self.chunk_relevance_cache.clear()
-            return
-
+    def _build_context_text(self, content: Dict) -> str:
+        """Składa tekst kontekstu z nagłówków, paragrafów, list, linków i głównej treści."""
         # Budowanie kontekstu z różnych elementów
         context_parts = []
 
@@ -176,59 +271,344 @@ class PageAssistant:
             context_parts.append(f"Główna treść:\n{content['text']}")
 
         # Połącz wszystkie części
-        combined_context = "\n\n".join([part for part in context_parts if part])
-        self.loaded_context = combined_context
-        print(f"Załadowano kontekst strony. Długość: {len(combined_context)} znaków")
-        print(f"{context_parts}")
+        return "\n\n".join([part for part in context_parts if part])
+
+    def prepare_context(self, content: Dict) -> Optional[Dict]:
+        """
+        Buduje kontekst, fragmenty i osadzenia z danych scrapera bez ustawiania ich jako bieżący kontekst.
+
+        Returns:
+            Dict z kluczami 'context', 'chunks', 'embeddings' i 'facts' lub None dla nieprawidłowych danych.
+        """
+        if not content or not isinstance(content, dict):
+            return None
+
+        combined_context = self._build_context_text(content)
+        print(f"Zbudowano kontekst strony. Długość: {len(combined_context)} znaków")
 
         # Dziel na fragmenty i generuj osadzenia
-        self.context_chunks = self._chunk_text(combined_context)
-        if self.context_chunks:
+        chunks = self._chunk_text(combined_context)
+        embeddings = None
+        if chunks:
             try:
-                self.chunk_embeddings_cache = self.embedder.encode(self.context_chunks, convert_to_tensor=True)
-                print(f"Wygenerowano osadzenia dla {len(self.context_chunks)} fragmentów")
+                embeddings = self.embedder.encode(chunks, convert_to_tensor=True)
+                print(f"Wygenerowano osadzenia dla {len(chunks)} fragmentów")
             except Exception as e:
                 logger.error(f"Błąd generowania osadzeń: {e}")
+        return {"context": combined_context, "chunks": chunks, "embeddings": embeddings,
+                "facts": content.get('facts', [])}
+
+    def load_context(self, content: Dict, prepared: Optional[Dict] = None):
+        """
+        Ładuje kontekst z danych scrapera, uwzględniając strukturę treści.
+
+        Args:
+            content: Słownik 'content' z danych scrapera.
+            prepared: Kontekst zbudowany wcześniej przez prepare_context (np. przez prefetcher);
+                pozwala pominąć ponowne dzielenie i osadzanie.
+        """
+        if prepared is None:
+            # Dzielenie i osadzanie poza blokadą stanu (operacje modelu w tym czasie czytają poprzedni kontekst)
+            prepared = self.prepare_context(content)
+        with self.lock:
+            self.pending_llm_state = None
+            if not prepared:
+                logger.warning("Brak lub nieprawidłowe dane kontekstu.")
+                self.loaded_context = None
+                self.context_chunks = None
                 self.chunk_embeddings_cache = None
-        else:
-            self.chunk_embeddings_cache = None
-        self.chunk_relevance_cache.clear()
-        print(f"Kontekst strony załadowany. Długość: {len(combined_context)} znaków, fragmentów: {len(self.context_chunks)}")
-
+                self.chunk_relevance_cache = {}
+                self.sentence_cache = {}
+                self.page_facts = []
+                self.loaded_content = None
+                return
+
+            self.loaded_context = prepared["context"]
+            self.context_chunks = prepared["chunks"]
+            self.chunk_embeddings_cache = prepared["embeddings"]
+            # Nowe obiekty zamiast czyszczenia: migawki trwających operacji modelu zachowują swój kontekst
+            self.chunk_relevance_cache = {}
+            self.sentence_cache = {}
+            self.page_facts = prepared.get("facts") or []
+            self.loaded_content = content
+        print(f"Kontekst strony załadowany. Długość: {len(prepared['context'])} znaków, fragmentów: {len(prepared['chunks'])}")
+
+    def extend_context(self, delta: Dict) -> int:
+        """
+        Dołącza do bieżącego kontekstu nową treść strony (np. po zmianach DOM), dzieląc i osadzając
+        tylko nowe fragmenty zamiast całej strony. Bez załadowanego kontekstu nic nie zmienia
+        (sama delta nie jest pełnym kontekstem strony).
+
+        Args:
+            delta: Nowa treść w formacie słownika 'content' scrapera.
+
+        Returns:
+            Liczba dodanych fragmentów.
+        """
+        base = self._context_snapshot()
+        if not base["context"] or not base["chunks"]:
+            return 0
+        delta_text = self._build_context_text(delta) if delta else ""
+        if not delta_text:
+            return 0
+        start_time = time.time()
+        new_chunks = self._chunk_text(f"Zaktualizowana treść strony:\n{delta_text}")
+        if not new_chunks:
+            return 0
+        try:
+            new_embeddings = self.embedder.encode(new_chunks, convert_to_tensor=True)
+            if base["embeddings"] is not None:
+                new_embeddings = torch.cat([base["embeddings"], new_embeddings.to(base["embeddings"].device)])
+        except Exception as e:
+            logger.error(f"Błąd generowania osadzeń dla zmian strony: {e}")
+            return 0
+        with self.lock:
+            if self.context_chunks is not base["chunks"]:
+                # Kontekst podmieniono w trakcie osadzania: delta dotyczy już nieaktualnego kontekstu
+                return 0
+            self.loaded_context = f"{base['context']}\n\n{delta_text}"
+            self.context_chunks = base["chunks"] + new_chunks
+            self.chunk_embeddings_cache = new_embeddings
+            self.chunk_relevance_cache = {}
+        print(f"Dodano {len(new_chunks)} fragmentów do kontekstu w {time.time() - start_time:.2f}s")
+        return len(new_chunks)
+
+    @_locked
+    def export_state(self, include_llm: bool = False) -> Optional[Dict]:
+        """
+        Zwraca stan bieżącego kontekstu (np. do zapamiętania wpisu historii przeglądania).
+
+        Args:
+            include_llm: Czy dołączyć stan LLM (cache KV ostatniego promptu) z llm.save_state().
+
+        Returns:
+            Dict ze stanem kontekstu lub None, jeśli kontekst nie jest załadowany.
+        """
+        if not self.loaded_context:
+            return None
+        state = {
+            "context": self.loaded_context,
+            "chunks": self.context_chunks,
+            "embeddings": self.chunk_embeddings_cache,
+            "facts": self.page_facts,
+            "content": self.loaded_content
+        }
+        # Stan LLM jest zapisywany tylko wtedy, gdy model nie generuje (bez czekania na generowanie)
+        if include_llm and self.model_lock.acquire(blocking=False):
+            try:
+                state["llm_state"] = self.llm.save_state()
+            except Exception as e:
+                logger.warning(f"Nie udało się zapisać stanu LLM: {e}")
+            finally:
+                self.model_lock.release()
+        return state
+
+    @_locked
+    def restore_state(self, state: Dict) -> None:
+        """Przywraca stan kontekstu zapisany przez export_state (bez ponownego dzielenia i osadzania)."""
+        self.loaded_context = state["context"]
+        self.context_chunks = state["chunks"]
+        self.chunk_embeddings_cache = state["embeddings"]
+        self.chunk_relevance_cache = {}
+        self.sentence_cache = {}
+        self.page_facts = state.get("facts") or []
+        self.loaded_content = state.get("content")
+        # Model może właśnie generować: stan LLM jest wczytywany przed kolejną operacją modelu
+        self.pending_llm_state = state.get("llm_state")
+        print(f"Przywrócono kontekst strony. Długość: {len(self.loaded_context)} znaków, fragmentów: {len(self.context_chunks or [])}")
+
+    def _apply_pending_llm_state(self) -> None:
+        """Wczytuje do modelu stan LLM przywrócony przez restore_state (pod blokadą modelu)."""
+        with self.lock:
+            llm_state, self.pending_llm_state = self.pending_llm_state, None
+        if llm_state is not None:
+            try:
+                self.llm.load_state(llm_state)
+            except Exception as e:
+                logger.warning(f"Nie udało się przywrócić stanu LLM: {e}")
+
+    @_locked
+    def _context_snapshot(self) -> Dict:
+        """
+        Zwraca bieżący kontekst do użycia bez blokady stanu (load_context, extend_context i restore_state
+        podmieniają te obiekty zamiast je modyfikować).
+        """
+        return {"context": self.loaded_context, "chunks": self.context_chunks,
+                "embeddings": self.chunk_embeddings_cache, "facts": self.page_facts,
+                "relevance_cache": self.chunk_relevance_cache, "sentence_cache": self.sentence_cache}
+
+    def _match_facts(self, question: str, facts: List[Dict]) -> List[Dict]:
+        """Zwraca fakty strony odpowiadające intencjom pytania (np. cena, godziny otwarcia, składniki)."""
+        if not facts:
+            return []
+        question_lower = question.lower()
+        properties = [prop for prop, patterns in FACT_INTENTS.items()
+                      if any(re.search(pattern, question_lower) for pattern in patterns)]
+        return [fact for fact in facts if fact["property"] in properties]
+
+    def _format_fact_answer(self, facts: List[Dict]) -> Optional[str]:
+        """
+        Buduje bezpośrednią odpowiedź z faktów, jeśli dotyczą jednego obiektu strony;
+        dla wielu obiektów (np. listy produktów) zwraca None i fakty trafiają do kontekstu LLM.
+        """
+        subjects = {fact["subject"] for fact in facts}
+        if len(subjects) > 1 or len(facts) > 8:
+            return None
+        values: Dict[str, List[str]] = {}
+        for fact in facts:
+            values.setdefault(fact["property"], []).append(fact["value"])
+        subject = next(iter(subjects))
+        lines = [f"{FACT_LABELS.get(prop, prop)}: {'; '.join(dict.fromkeys(vals))}." for prop, vals in values.items()]
+        return (f"{subject} – " if subject else "") + " ".join(lines)
+
+    def fact_stats(self) -> Dict:
+        """
+        Zwraca statystyki odpowiedzi bez LLM (z danych strukturalnych i ekstrakcyjnych): skuteczność
+        i zaoszczędzony czas.
+        """
+        stats = dict(self.qa_stats)
+        stats["fact_hit_rate"] = stats["fact_answers"] / stats["questions"] if stats["questions"] else 0.0
+        stats["extractive_hit_rate"] = stats["extractive_answers"] / stats["questions"] if stats["questions"] else 0.0
+        avg_llm_time = stats["llm_time"] / stats["llm_answers"] if stats["llm_answers"] else 0.0
+        stats["time_saved"] = max(0.0, stats["fact_answers"] * avg_llm_time - stats["fact_time"])
+        stats["extractive_time_saved"] = max(0.0, stats["extractive_answers"] * avg_llm_time - stats["extractive_time"])
+        return stats
+
+    @staticmethod
+    def _split_sentences(chunk: str) -> List[str]:
+        """Dzieli fragment kontekstu na zdania (bez nagłówków części, nagłówków strony i linków)."""
+        sentences = []
+        for line in chunk.split("\n"):
+            line = line.strip().lstrip("-*").strip()
+            if not line or line.startswith("###") or line in CONTEXT_LABELS or "(http" in line \
+                    or re.match(r"^Lista (ordered|unordered) \d+:$", line):
+                continue
+            for sentence in SENTENCE_SPLIT.split(line):
+                words = len(sentence.split())
+                # Pytania (np. nagłówki FAQ) powtarzają pytanie użytkownika, a nie na nie odpowiadają
+                if 4 <= words <= 80 and not sentence.endswith("?"):
+                    sentences.append(sentence)
+        return list(dict.fromkeys(sentences))
+
+    def _sentence_embeddings(self, chunk_indices: List[int], context: Dict) -> tuple:
+        """
+        Zwraca zdania wskazanych fragmentów migawki kontekstu i macierz ich znormalizowanych osadzeń;
+        zdania fragmentów niewidzianych wcześniej są osadzane jednym wywołaniem modelu.
+        """
+        chunks, cache = context["chunks"], context["sentence_cache"]
+        missing = [chunks[i] for i in chunk_indices if chunks[i] not in cache]
+        if missing:
+            split = {chunk: self._split_sentences(chunk) for chunk in missing}
+            flat = [sentence for sentences in split.values() for sentence in sentences]
+            matrix = self.embedder.encode(flat, convert_to_numpy=True, normalize_embeddings=True) \
+                if flat else np.zeros((0, 1), dtype=np.float32)
+            offset = 0
+            for chunk, sentences in split.items():
+                cache[chunk] = (sentences, matrix[offset:offset + len(sentences)])
+                offset += len(sentences)
+        # Zdania z zakładek sąsiednich fragmentów są brane raz
+        sentences, rows, seen = [], [], set()
+        for i in chunk_indices:
+            chunk_sentences, chunk_matrix = cache[chunks[i]]
+            for sentence, row in zip(chunk_sentences, chunk_matrix):
+                if sentence not in seen:
+                    seen.add(sentence)
+                    sentences.append(sentence)
+                    rows.append(row)
+        return sentences, (np.vstack(rows) if rows else None)
+
+    def _extractive_answer(self, question: str, question_embedding, chunk_indices: List[int],
+                           context: Dict) -> Optional[Dict]:
+        """
+        Wybiera zdanie najlepiej odpowiadające pytaniu z najlepszych fragmentów (jedno mnożenie macierzy
+        osadzeń zdań przez osadzenie pytania).
+
+        Returns:
+            {'text', 'confidence', 'margin'} dla najlepszego zdania lub None (brak zdań lub pytanie
+            wymagające syntezy); o przyjęciu odpowiedzi decyduje wywołujący według progów.
+        """
+        question_lower = question.lower()
+        if any(re.search(pattern, question_lower) for pattern in GENERATIVE_PATTERNS):
+            return None
+        sentences, matrix = self._sentence_embeddings(chunk_indices, context)
+        if matrix is None:
+            return None
+        query = question_embedding.cpu().numpy().astype(np.float32).reshape(-1)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = matrix @ query
+        order = [int(i) for i in np.argsort(scores)[::-1][:10]]
+        best_text = sentences[order[0]]
+        best = float(scores[order[0]])
+        # Przewaga nad najlepszym innym zdaniem (nie fragmentem tego samego zdania uciętym na granicy fragmentu)
+        runner_up = next((float(scores[i]) for i in order[1:]
+                          if sentences[i] not in best_text and best_text not in sentences[i]), 0.0)
+        return {"text": best_text, "confidence": best, "margin": best - runner_up}
+
+    @_model_operation
     def answer_question(self, question: str) -> Dict:
-        """Odpowiada na pytanie na podstawie kontekstu strony, używając osadzeń do selekcji fragmentów."""
+        """
+        Odpowiada na pytanie na podstawie kontekstu strony, używając osadzeń do selekcji fragmentów.
+
+        Odpowiedź powstaje w pierwszym poziomie, który jest jej pewny:
+        1. fakty z danych strukturalnych (ceny, godziny otwarcia, adresy, oceny, składniki),
+        2. zdanie z najlepszych fragmentów, jeśli jego podobieństwo do pytania przekracza próg,
+        3. generacja LLM z wybranych fragmentów (i dopasowanych faktów na początku kontekstu).
+
+        Returns:
+            Wynik z polami 'source' (poziom, który odpowiedział: 'facts', 'extractive' lub 'llm'),
+            'time' (czas całkowity) i 'tier_times' (czas każdego sprawdzonego poziomu w sekundach).
+        """
         start_time = time.time()
         vram_start = self._get_vram_usage()
-        result = {"text": None, "time": 0.0, "vram_usage": vram_start, "error": None}
+        result = {"text": None, "time": 0.0, "vram_usage": vram_start, "error": None, "source": "llm",
+                  "tier_times": {}}
+        self.qa_stats["questions"] += 1
+        context = self._context_snapshot()
+        chunks, relevance_cache = context["chunks"], context["relevance_cache"]
         try:
-            if not self.loaded_context or not self.context_chunks or self.chunk_embeddings_cache is None:
+            matched_facts = self._match_facts(question, context["facts"])
+            fact_answer = self._format_fact_answer(matched_facts) if matched_facts else None
+            result["tier_times"]["facts"] = time.time() - start_time
+            if fact_answer:
+                result["text"] = fact_answer
+                result["source"] = "facts"
+                self.qa_stats["fact_answers"] += 1
+                self.qa_stats["fact_time"] += time.time() - start_time
+                stats = self.fact_stats()
+                print(f"Odpowiedź z danych strukturalnych (skuteczność: {stats['fact_hit_rate']:.0%}, "
+                      f"zaoszczędzono ~{stats['time_saved']:.1f}s)")
+                return result
+
+            if not context["context"] or not chunks or context["embeddings"] is None:
                 result["error"] = "Nie załadowano wcześniej kontekstu strony."
                 return result
             
+            # Generowanie osadzenia pytania (wspólne dla wyboru fragmentów i zdań)
+            tier_start = time.time()
+            question_embedding = self.embedder.encode(question, convert_to_tensor=True)
+
             # Sprawdzanie cache'u dla pytania
             question_key = question.lower().strip()
-            if question_key in self.chunk_relevance_cache:
+            if question_key in relevance_cache:
                 print(f"Użyto cache dla pytania: {question}")
-                relevant_indices = self.chunk_relevance_cache[question_key]
-                relevant_chunks = [self.context_chunks[i] for i in relevant_indices]
+                top_chunk_indices, relevant_indices = relevance_cache[question_key]
+                relevant_chunks = [chunks[i] for i in relevant_indices]
             else:
-                # Generowanie osadzenia pytania
-                question_embedding = self.embedder.encode(question, convert_to_tensor=True)
-
                 # Obliczanie podobieństwa kosinusowego
-                similarities = util.cos_sim(question_embedding, self.chunk_embeddings_cache)[0]
+                similarities = util.cos_sim(question_embedding, context["embeddings"])[0]
                 similarities = similarities.cpu().numpy()
                 
                 # Wybór top-k fragmentów
-                k = min(6, len(self.context_chunks))
+                k = min(6, len(chunks))
                 top_indices = np.argsort(similarities)[-k:][::-1]
                 max_sim = np.max(similarities)
                 dynamic_threshold = max(0.1, max_sim * 0.75)
 
                 relevant_indices = [int(idx) for idx in top_indices if similarities[idx] >= dynamic_threshold]
                 if not relevant_indices:
-                    relevant_indices = [np.argmax(similarities)]
+                    relevant_indices = [int(np.argmax(similarities))]
                     print(f"Użyto awaryjnie najlepszego fragmentu: {similarities[relevant_indices[0]]:.4f}")
+                top_chunk_indices = relevant_indices[:self.extractive_chunks]
 
                 # Rozszerz o sąsiednie fragmenty
                 expanded_indices = set()
@@ -238,15 +618,33 @@ class PageAssistant:
                         expanded_indices.add(idx-1)
                         if idx > 1:
                             expanded_indices.add(idx-2)
-                    if idx < len(self.context_chunks)-1:
+                    if idx < len(chunks)-1:
                         expanded_indices.add(idx+1)
-                        if idx < len(self.context_chunks)-2:
+                        if idx < len(chunks)-2:
                             expanded_indices.add(idx+2)
                 relevant_indices = sorted(expanded_indices)
-                relevant_chunks = [self.context_chunks[i] for i in relevant_indices]
-                self.chunk_relevance_cache[question_key] = relevant_indices
+                relevant_chunks = [chunks[i] for i in relevant_indices]
+                relevance_cache[question_key] = (top_chunk_indices, relevant_indices)
                 print(f"Wybrano {len(relevant_chunks)} fragmentów (próg: {dynamic_threshold:.4f})")
 
+            # Odpowiedź ekstrakcyjna: jedno zdanie z najlepszych fragmentów, jeśli model jest jej pewny
+            if not matched_facts:
+                extractive = self._extractive_answer(question, question_embedding, top_chunk_indices, context)
+                result["tier_times"]["extractive"] = time.time() - tier_start
+                if extractive:
+                    print(f"Najlepsze zdanie: pewność {extractive['confidence']:.3f}, przewaga {extractive['margin']:.3f}")
+                if extractive and extractive["confidence"] >= self.extractive_threshold \
+                        and extractive["margin"] >= self.extractive_margin:
+                    result["text"] = extractive["text"]
+                    result["source"] = "extractive"
+                    result["confidence"] = extractive["confidence"]
+                    self.qa_stats["extractive_answers"] += 1
+                    self.qa_stats["extractive_time"] += time.time() - start_time
+                    stats = self.fact_stats()
+                    print(f"Odpowiedź ekstrakcyjna w {(time.time() - start_time) * 1000:.0f} ms (skuteczność: "
+                          f"{stats['extractive_hit_rate']:.0%}, zaoszczędzono ~{stats['extractive_time_saved']:.1f}s)")
+                    return result
+
             # Połącz fragmenty
             combined_context = "\n\n".join(relevant_chunks)
             # if len(combined_context) > self.n_ctx - 300:
@@ -255,24 +653,31 @@ class PageAssistant:
             #     if last_space > 0:
             #         combined_context = combined_context[:last_space] + " [...]"
 
+            # Fakty z danych strukturalnych jako krótki kontekst o najwyższym priorytecie
+            facts_context = ""
+            if matched_facts:
+                self.qa_stats["fact_injections"] += 1
+                facts_text = "\n".join(
+                    f"- {fact['subject'] or fact['type']}: {FACT_LABELS.get(fact['property'], fact['property'])}: {fact['value']}"
+                    for fact in matched_facts[:30]
+                )
+                facts_context = f"### Dane strukturalne strony:\n{facts_text}\n\n"
+
             # Generowanie odpowiedzi
-            prompt = (
-                f"### Kontekst:\n{combined_context}\n\n"
-                f"### Pytanie:\n{question}\n\n"
-                f"### Instrukcje:\n"
-                f"1. Odpowiedz precyzyjnie w języku polskim\n"
-                f"2. Jeśli kontekst nie zawiera odpowiedzi, zwróć 'Brak informacji'\n"
-                f"3. Unikaj wprowadzenia własnej wiedzy\n"
-                f"### Odpowiedź:\n"
-            )
+            prompt = self._build_qa_prompt(question, combined_context, facts_context)
             response = self._generate_response(
                 prompt, 
                 max_tokens=400,
                 stop_sequences=["\n###", "<|endoftext|>"]
             )
+            if response.get("cancelled"):
+                result["cancelled"] = True
             result["text"] = response["text"]
             result["time"] = response["time"]
+            result["tier_times"]["llm"] = response["time"]
             result["vram_usage"] = max(vram_start, response["vram_usage"])
+            self.qa_stats["llm_answers"] += 1
+            self.qa_stats["llm_time"] += time.time() - start_time
             print(f"Odpowiedź wygenerowana w {result['time']:.2f}s, VRAM: {result['vram_usage']:.2f} MB")
             return result
         except Exception as e:
@@ -280,20 +685,69 @@ class PageAssistant:
             return result
         finally:
             result["time"] = time.time() - start_time
-            print(f"Całkowity czas QA: {result['time']:.2f}s")
+            print(f"Całkowity czas QA: {result['time']:.2f}s (poziom: {result['source']})")
+
+    def _build_qa_prompt(self, question: str, context: str, facts_context: str = "") -> str:
+        """Składa prompt pytania do LLM z kontekstu (i opcjonalnych faktów o najwyższym priorytecie)."""
+        return (
+            f"{facts_context}"
+            f"### Kontekst:\n{context}\n\n"
+            f"### Pytanie:\n{question}\n\n"
+            f"### Instrukcje:\n"
+            f"1. Odpowiedz precyzyjnie w języku polskim\n"
+            f"2. Jeśli kontekst nie zawiera odpowiedzi, zwróć 'Brak informacji'\n"
+            f"3. Unikaj wprowadzenia własnej wiedzy\n"
+            f"### Odpowiedź:\n"
+        )
+
+    @_model_operation
+    def answer_site_question(self, question: str, passages: List[Dict]) -> Dict:
+        """
+        Odpowiada na pytanie o całą witrynę na podstawie fragmentów z indeksu witryny.
+
+        Args:
+            passages: Fragmenty z SiteIndex.search ('url', 'title', 'text', 'score').
+        """
+        start_time = time.time()
+        vram_start = self._get_vram_usage()
+        result = {"text": None, "time": 0.0, "vram_usage": vram_start, "error": None, "source": "site", "sources": []}
+        try:
+            if not passages:
+                result["error"] = "Brak zaindeksowanych fragmentów witryny."
+                return result
+            context = "\n\n".join(f"[{p['title'] or p['url']}]\n{p['text']}" for p in passages)
+            response = self._generate_response(
+                self._build_qa_prompt(question, context),
+                max_tokens=400,
+                stop_sequences=["\n###", "<|endoftext|>"]
+            )
+            if response.get("cancelled"):
+                result["cancelled"] = True
+            result["text"] = response["text"]
+            result["vram_usage"] = max(vram_start, response["vram_usage"])
+            result["sources"] = list(dict.fromkeys(p["url"] for p in passages))
+            return result
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+        finally:
+            result["time"] = time.time() - start_time
+            print(f"Całkowity czas QA witryny: {result['time']:.2f}s")
 
+    @_model_operation
     def summarize_page(self) -> Dict:
         """Streszcza stronę, wykorzystując strukturalne dane z WebScraper."""
         start_time = time.time()
         vram_start = self._get_vram_usage()
         result = {"text": None, "time": 0.0, "vram_usage": vram_start, "error": None}
+        context = self._context_snapshot()
         try:
-            if not self.loaded_context:
+            if not context["context"]:
                 result["error"] = "Brak załadowanego kontekstu strony"
                 return result
 
             # Pobierz fragmenty z kontekstu
-            chunks = self.context_chunks
+            chunks = context["chunks"]
             if not chunks:
                 result["error"] = "Brak fragmentów kontekstu do streszczenia"
                 return result
@@ -339,6 +793,9 @@ class PageAssistant:
                     f"Fragment:\n{chunk}\n\nStreszczenie:"
                 )
                 summary = self._generate_response(prompt, max_tokens=500)
+                if summary.get("cancelled"):
+                    result["cancelled"] = True
+                    return result
                 if summary["text"]:
                     chunk_summaries.append(summary["text"])
                     print(f"Streszczenie fragmentu {i+1}/{len(merged_chunks)} w {summary['time']:.2f}s")
@@ -361,6 +818,9 @@ class PageAssistant:
                     f"Zachowaj kluczowe informacje.\n\n{summaries_text}\n\nFinalne streszczenie:"
                 )
                 final_response = self._generate_response(final_prompt, max_tokens=500, stop_sequences=["\n\n", "###", "<|endoftext|>", "Streszczenie:"])
+                if final_response.get("cancelled"):
+                    result["cancelled"] = True
+                    return result
                 result["text"] = final_response["text"]
                 result["time"] += final_response["time"]
                 result["vram_usage"] = max(result["vram_usage"], final_response["vram_usage"])
@@ -376,11 +836,19 @@ class PageAssistant:
             result["time"] = time.time() - start_time
             print(f"Całkowity czas streszczania: {result['time']:.2f}s")
 
-    def describe_structure(self, scraped_data: Dict) -> Dict:
-        """Opisuje strukturę strony na podstawie danych z WebScraper."""
+    @_model_operation
+    def describe_structure(self, scraped_data: Dict, outline: Optional[str] = None) -> Dict:
+        """
+        Opisuje strukturę strony na podstawie danych z WebScraper.
+
+        Args:
+            scraped_data: Dane strony z polami 'headings' i 'sections'.
+            outline: Konspekt strony z reguł (web.structure_outline); model go dopracowuje zamiast
+                opisywać pełną listę nagłówków i sekcji.
+        """
         start_time = time.time()
         vram_start = self._get_vram_usage()
-        result = {"text": None, "time": 0.0, "vram_usage": vram_start, "error": None}
+        result = {"text": None, "time": 0.0, "vram_usage": vram_start, "error": None, "source": "llm"}
         try:
             headings = scraped_data.get('headings', [])
             sections = scraped_data.get('sections', [])
@@ -389,17 +857,27 @@ class PageAssistant:
                 result["error"] = "Brak danych o nagłówkach lub sekcjach do opisu struktury"
                 return result
 
-            heading_list = "\n".join([f"Poziom {h['level']}: {h['text']}" for h in headings])
-            section_list = ""
-            if sections:
-                section_list = "\nSekcje:\n" + "\n".join([f"{s['name']} ({s['role']})" for s in sections])
+            if outline:
+                prompt = (
+                    f"Przeredaguj poniższy konspekt strony na zwięzły, płynny opis jej struktury w języku polskim. "
+                    f"Wskaż główne działy i ich przeznaczenie.\n\n"
+                    f"Konspekt:\n{outline}\n\n"
+                    f"Opis:"
+                )
+            else:
+                heading_list = "\n".join([f"Poziom {h['level']}: {h['text']}" for h in headings])
+                section_list = ""
+                if sections:
+                    section_list = "\nSekcje:\n" + "\n".join([f"{s['name']} ({s['role']})" for s in sections])
 
-            prompt = (
-                f"Opisz strukturę strony w języku polskim na podstawie poniższych danych:\n"
-                f"Nagłówki:\n{heading_list}\n{section_list}\n\n"
-                f"Opis:"
-            )
+                prompt = (
+                    f"Opisz strukturę strony w języku polskim na podstawie poniższych danych:\n"
+                    f"Nagłówki:\n{heading_list}\n{section_list}\n\n"
+                    f"Opis:"
+                )
             response = self._generate_response(prompt, max_tokens=250)
+            if response.get("cancelled"):
+                result["cancelled"] = True
             result["text"] = response["text"]
             result["time"] = response["time"]
             result["vram_usage"] = max(vram_start, response["vram_usage"])
@@ -1,4 +1,5 @@
 from datetime import datetime
+import asyncio
 import os
 import time
 import json
@@ -8,6 +9,11 @@ from voice.voice_listener import VoiceListener
 from navigation.browser_manager import BrowserManager
 from navigation.command_parser import CommandParser
 from navigation.thread_queue import ThreadSafeQueue
+from navigation.async_engine import AsyncEngine
+
+# Silnik asyncio: komendy wykonywane współbieżnie (przeglądarka, model i opisy obrazów w osobnych
+# wątkach), długie operacje przerywane nowszymi komendami. False - dotychczasowa pętla synchroniczna.
+USE_ASYNC_ENGINE = True
 
 
 def save_results(results, output_dir="results"):
@@ -19,20 +25,25 @@ def save_results(results, output_dir="results"):
 def generate_report(results, output_dir="results"):
     """Generuje raport w formacie Markdown."""
     report = "# Raport porównawczy modeli GGUF\n\n"
-    report += "| Model | Średni czas streszczania (s) | Średni czas QA (s) | Średni czas struktury (s) | Średnie zużycie VRAM (MB) | Poprawność QA (%) | Ocena streszczenia (0-5) | Ocena struktury (0-5) | Błędy |\n"
-    report += "|-------|-----------------------------|-------------------|--------------------------|---------------------------|------------------|-------------------------|-----------------------|-------|\n"
+    report += "| Model | Średni czas streszczania (s) | Średni czas QA (s) | Średni czas struktury (s) | Struktura z reguł (ms) | Struktura z modelu (s) | Średnie zużycie VRAM (MB) | Poprawność QA (%) | Ocena streszczenia (0-5) | Ocena struktury (0-5) | Błędy |\n"
+    report += "|-------|-----------------------------|-------------------|--------------------------|------------------------|------------------------|---------------------------|------------------|-------------------------|-----------------------|-------|\n"
 
     for model_name, data in results.items():
         avg_summary_time = sum([r["time"] for r in data["summaries"] if not r.get("error")]) / max(1, len(data["summaries"]))
         avg_qa_time = sum([r["time"] for r in data["questions"] if not r.get("error")]) / max(1, len(data["questions"]))
         avg_structure_time = sum([r["time"] for r in data["structures"] if not r.get("error")]) / max(1, len(data["structures"]))
+        # Opis struktury z reguł (web.structure_outline) i z modelu mierzone osobno
+        rule_structures = [r for r in data["structures"] if r.get("source") == "rules" and not r.get("error")]
+        llm_structures = [r for r in data["structures"] if r.get("source", "llm") == "llm" and not r.get("error")]
+        avg_rule_structure_ms = sum(r["time"] for r in rule_structures) * 1000 / max(1, len(rule_structures))
+        avg_llm_structure_time = sum(r["time"] for r in llm_structures) / max(1, len(llm_structures))
         avg_vram = sum([r["vram_usage"] for r in data["summaries"] + data["questions"] + data["structures"] if not r.get("error")]) / max(1, len(data["summaries"] + data["questions"] + data["structures"]))
         qa_correct = sum(1 for r in data["questions"] if r.get("correct", False)) / max(1, len(data["questions"])) * 100
         avg_summary_score = sum(r.get("score", 0) for r in data["summaries"]) / max(1, len(data["summaries"]))
         avg_structure_score = sum(r.get("score", 0) for r in data["structures"]) / max(1, len(data["structures"]))
         errors = sum(1 for r in data["summaries"] + data["questions"] + data["structures"] if r.get("error"))
 
-        report += f"| {model_name} | {avg_summary_time:.2f} | {avg_qa_time:.2f} | {avg_structure_time:.2f} | {avg_vram:.2f} | {qa_correct:.2f} | {avg_summary_score:.2f} | {avg_structure_score:.2f} | {errors} |\n"
+        report += f"| {model_name} | {avg_summary_time:.2f} | {avg_qa_time:.2f} | {avg_structure_time:.2f} | {avg_rule_structure_ms:.2f} | {avg_llm_structure_time:.2f} | {avg_vram:.2f} | {qa_correct:.2f} | {avg_summary_score:.2f} | {avg_structure_score:.2f} | {errors} |\n"
 
     with open(os.path.join(output_dir, "report.md"), "w", encoding="utf-8") as f:
         f.write(report)
@@ -134,6 +145,8 @@ def main():
     #         "zapytaj model czym różni się klimat Polski od klimatu śródziemnomorskiego",
     #         "otwórz stronę https://pl.wikipedia.org/wiki/Kozacy",
     #         "streść stronę",
+    #         "opisz strukturę strony",
+    #         "opisz szczegółowo strukturę strony",
     #         "zapytaj model kim byli Kozacy",
     #         "zapytaj model jakie były najważniejsze powstania kozackie",
     #         "zapytaj model czym różnili się Kozacy zaporoscy od dońskich",
@@ -195,8 +208,8 @@ def main():
     #                             results[model_name]["summaries"].append(result["text"])
     #                         elif "zapytaj model" in cmd:
     #                             results[model_name]["questions"].append(result["text"])
-    #                         elif "opisz strukturę strony" in cmd:
-    #                             results[model_name]["structures"].append(result["text"])
+    #                         elif "strukturę strony" in cmd:
+    #                             results[model_name]["structures"].append(result)
     #                     time.sleep(10)  
     #                 except Exception as e:
     #                     print(f"Błąd wykonania komendy dla modelu {model_name}: {e}")
@@ -261,6 +274,20 @@ def main():
                  )
     print(f"Model załadowany.")
     browser_manager = BrowserManager(page_assistant)
+    if USE_ASYNC_ENGINE:
+        # Przeglądarka jest inicjalizowana przez silnik w wątku przeglądarki
+        engine = AsyncEngine(browser_manager, queue)
+        parser = CommandParser(browser_manager, queue)
+        voice_listener = VoiceListener(parser)
+        voice_listener.start()
+        try:
+            asyncio.run(engine.run())
+        except KeyboardInterrupt:
+            print("\nZamykanie aplikacji...")
+        finally:
+            voice_listener.stop()
+            engine.shutdown()
+        return
     browser_manager.initialize()
     parser = CommandParser(browser_manager, queue)
     voice_listener = VoiceListener(parser)
@@ -362,6 +389,8 @@ def main():
                     print(f"Wynik: {result}")
                 except Exception as e:
                     print(f"Błąd wykonania: {e}")
+            # Zadania w tle (np. odświeżanie stron z magazynu) w wolnym czasie
+            browser_manager.run_idle_tasks()
             time.sleep(0.1)
     except KeyboardInterrupt:
         print("\nZamykanie aplikacji...")
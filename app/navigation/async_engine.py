@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ai.image_describer import ImageDescriber
+from ai.page_assistant import PageAssistant
+from navigation.browser_manager import BrowserManager
+from navigation.thread_queue import ThreadSafeQueue
+from voice.text_to_speech import TTSWrapper
+
+logger = logging.getLogger(__name__)
+
+class AsyncPageAssistant:
+    """Asynchroniczna fasada PageAssistant: operacje modelu wykonywane są w wątku modelu."""
+
+    def __init__(self, assistant: PageAssistant, executor: ThreadPoolExecutor):
+        self.assistant = assistant
+        self.executor = executor
+
+    async def _run(self, method: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
+
+    async def answer_question(self, question: str) -> Optional[Dict]:
+        return await self._run(self.assistant.answer_question, question)
+
+    async def answer_site_question(self, question: str, passages) -> Optional[Dict]:
+        return await self._run(self.assistant.answer_site_question, question, passages)
+
+    async def summarize_page(self) -> Optional[Dict]:
+        return await self._run(self.assistant.summarize_page)
+
+    def cancel(self) -> None:
+        """Przerywa trwającą generację (działa z dowolnego wątku)."""
+        self.assistant.cancel()
+
+class AsyncImageDescriber:
+    """Asynchroniczna fasada ImageDescriber: opisy obrazów generowane są w osobnym wątku."""
+
+    def __init__(self, describer: ImageDescriber, executor: ThreadPoolExecutor):
+        self.describer = describer
+        self.executor = executor
+
+    async def describe_image(self, image: Dict, **kwargs) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: self.describer.describe_image(image, **kwargs))
+
+class AsyncTTS:
+    """Asynchroniczna fasada TTSWrapper (synteza i odtwarzanie odbywają się w wątku TTS)."""
+
+    def __init__(self, tts: TTSWrapper):
+        self.tts = tts
+
+    def speak(self, text: str) -> None:
+        self.tts.speak(text)
+
+    async def speak_and_wait(self, text: str) -> None:
+        """Odczytuje tekst i czeka na zakończenie odtwarzania."""
+        await asyncio.to_thread(self.tts.speak, text, True)
+
+    def stop(self) -> None:
+        self.tts.stop()
+
+class AsyncEngine:
+    """
+    Silnik asyncio wykonujący komendy współbieżnie.
+
+    Playwright (synchroniczny) działa w jednym, dedykowanym wątku przeglądarki, model językowy
+    w wątku modelu, a opisywanie obrazów w wątku wizji, więc niezależna praca się nakłada:
+    strona jest scrapowana, gdy model odpowiada, a obraz opisywany, gdy LLM generuje odpowiedź.
+    Długie operacje (model, wizja) są przerywane przez nowsze komendy: kolejną operacją tego
+    samego rodzaju, komendą przeglądarki, która zmieniła stronę lub kartę (użytkownik przeszedł
+    dalej), lub komendą "stop"; pozostałe komendy przeglądarki (np. odczyt linków) się z nimi nakładają.
+    Dotychczasowe synchroniczne handlery BrowserManager pozostają bez zmian i są wykonywane
+    w wątku przeglądarki.
+    """
+
+    # Handlery wykonywane w całości w wątku modelu (nie używają Playwright)
+    MODEL_HANDLERS = ("_summarize_page", "summarize_page", "ask_site", "refine_structure")
+    STOP_HANDLERS = ("stop",)
+
+    def __init__(self, browser_manager: BrowserManager, command_queue: ThreadSafeQueue,
+                 poll_interval: float = 0.05, log_path: Optional[str] = "result_test_lipiec.txt"):
+        """
+        Args:
+            browser_manager: Menedżer przeglądarki (używany tylko w wątku przeglądarki).
+            command_queue: Kolejka komend wypełniana przez CommandParser.
+            poll_interval: Odstęp sprawdzania kolejki komend w sekundach.
+            log_path: Plik, do którego dopisywane są wyniki komend (None wyłącza zapis).
+        """
+        self.browser_manager = browser_manager
+        self.command_queue = command_queue
+        self.poll_interval = poll_interval
+        self.log_path = log_path
+        self.browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser")
+        self.model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+        self.vision_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vision")
+        self.assistant = AsyncPageAssistant(browser_manager.page_assistant, self.model_executor)
+        self.describer = AsyncImageDescriber(browser_manager.image_describer, self.vision_executor) \
+            if browser_manager.image_describer else None
+        self.tts = AsyncTTS(browser_manager.tts)
+        self.long_tasks: Dict[str, asyncio.Task] = {}
+        self.browser_pending = 0
+        self.running = False
+
+    async def on_browser(self, function: Callable, *args, **kwargs) -> Any:
+        """Wykonuje funkcję w wątku przeglądarki (jedynym wątku używającym Playwright)."""
+        self.browser_pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.browser_executor, lambda: function(*args, **kwargs))
+        finally:
+            self.browser_pending -= 1
+
+    async def _ask_model(self, question: str) -> Optional[Dict]:
+        """Pytanie do modelu: kontekst strony w wątku przeglądarki, generacja w wątku modelu."""
+        bm = self.browser_manager
+        print(f"Zadawanie pytania modelowi: {question}")
+        if not await self.on_browser(bm._ensure_page_context):
+            return None
+        answer = await self.assistant.answer_question(question)
+        if answer and answer.get("cancelled"):
+            return None
+        return bm._announce_answer(answer)
+
+    async def _describe_image(self, image_index: int) -> Optional[str]:
+        """Opis obrazu: wybór i bajty obrazu w wątku przeglądarki, opis w wątku wizji."""
+        bm = self.browser_manager
+        image = await self.on_browser(bm._select_image, image_index)
+        if image is None:
+            return None
+        description = None
+        if self.describer:
+            request = await self.on_browser(bm._image_request, image)
+            if request is not None:
+                description = await self.describer.describe_image(image, **request)
+        return bm._announce_image_description(image_index, image, description)
+
+    async def _browser_command(self, handler: Callable, args: Tuple, started: Dict[str, asyncio.Task]) -> Any:
+        """
+        Komenda przeglądarki; jeśli zmieniła stronę lub kartę, przerywa długie operacje rozpoczęte
+        przed nią (dotyczą poprzedniej strony).
+        """
+        bm = self.browser_manager
+
+        def run() -> Tuple[Any, bool]:
+            before = (bm.page, bm.current_url)
+            result = handler(*args)
+            return result, (bm.page, bm.current_url) != before
+
+        result, page_changed = await self.on_browser(run)
+        if page_changed:
+            for kind, task in started.items():
+                if self.long_tasks.get(kind) is task:
+                    self.cancel((kind,))
+        return result
+
+    def _plan(self, handler: Callable, args: Tuple) -> Tuple[Optional[str], Callable[[], Awaitable]]:
+        """Zwraca rodzaj operacji (None dla komend przeglądarki) i fabrykę korutyny komendy."""
+        name = getattr(handler, "__name__", "")
+        if name in self.MODEL_HANDLERS:
+            loop = asyncio.get_running_loop()
+            return "model", lambda: loop.run_in_executor(self.model_executor, lambda: handler(*args))
+        if name == "_ask_model":
+            return "model", lambda: self._ask_model(*args)
+        if name in ("_describe_image", "describe_image"):
+            return "vision", lambda: self._describe_image(int(args[0]))
+        started = dict(self.long_tasks)
+        return None, lambda: self._browser_command(handler, args, started)
+
+    def cancel(self, kinds: Tuple[str, ...] = ("model", "vision")) -> None:
+        """Przerywa trwające długie operacje podanych rodzajów i odczytywanie ich wyników."""
+        cancelled = []
+        for kind in kinds:
+            task = self.long_tasks.pop(kind, None)
+            if task and not task.done():
+                task.cancel()
+                cancelled.append(kind)
+                if kind == "model":
+                    self.assistant.cancel()
+        if cancelled:
+            self.tts.stop()
+            print(f"Przerwano operacje: {', '.join(cancelled)}")
+
+    def _log_result(self, result: Any) -> None:
+        print(f"Wynik: {result}")
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                f.write(f"[{timestamp}] Wynik komendy: {result}\n")
+
+    async def _execute(self, name: str, factory: Callable[[], Awaitable]) -> None:
+        start_time = time.time()
+        try:
+            result = await factory()
+            self._log_result(result)
+            print(f"Komenda {name} wykonana w {time.time() - start_time:.2f}s")
+        except asyncio.CancelledError:
+            print(f"Komenda {name} przerwana po {time.time() - start_time:.2f}s")
+        except Exception as e:
+            print(f"Błąd wykonania: {e}")
+
+    def dispatch(self, handler: Callable, args: Tuple) -> asyncio.Task:
+        """Uruchamia komendę jako zadanie asyncio, przerywając długie operacje, które zastępuje."""
+        name = getattr(handler, "__name__", str(handler))
+        kind, factory = self._plan(handler, args)
+        if name in self.STOP_HANDLERS:
+            self.cancel()
+        elif kind:
+            # Nowa operacja tego samego rodzaju zastępuje poprzednią; różne rodzaje się nakładają
+            self.cancel((kind,))
+        task = asyncio.create_task(self._execute(name, factory))
+        if kind:
+            self.long_tasks[kind] = task
+        return task
+
+    async def run(self) -> None:
+        """Inicjalizuje przeglądarkę w jej wątku i przetwarza komendy do zatrzymania silnika."""
+        await self.on_browser(self.browser_manager.initialize)
+        self.running = True
+        idle_task: Optional[asyncio.Future] = None
+        try:
+            while self.running:
+                while not self.command_queue.empty():
+                    handler, args, kwargs = self.command_queue.get()
+                    self.dispatch(handler, tuple(args))
+                # Zadania w tle tylko wtedy, gdy wątek przeglądarki nie ma komend
+                if self.browser_pending == 0 and (idle_task is None or idle_task.done()) \
+                        and self.browser_manager.idle_tasks:
+                    idle_task = asyncio.ensure_future(self.on_browser(self.browser_manager.run_idle_tasks))
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self.cancel()
+
+    def stop(self) -> None:
+        """Zatrzymuje pętlę silnika."""
+        self.running = False
+
+    def shutdown(self) -> None:
+        """Zamyka przeglądarkę w jej wątku i kończy wątki wykonawcze."""
+        self.cancel()
+        self.browser_executor.submit(self.browser_manager.close_browser).result()
+        for executor in (self.browser_executor, self.model_executor, self.vision_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
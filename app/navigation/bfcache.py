@@ -0,0 +1,126 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.url_utils import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+def estimate_size(value: Any) -> int:
+    """
+    Szacuje rozmiar danych w pamięci (w bajtach): tekst, kolekcje, tablice numpy i tensory.
+
+    LazyPageData jest liczone z pól już wyekstrahowanych (szacowanie nie wymusza ekstrakcji) oraz
+    trzymanych dla pozostałych pól danych źródłowych (HTML i drzewo).
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (int, float, bool)):
+        return 8
+    if hasattr(value, "materialized"):
+        return estimate_size(value.materialized()) + value.pending_size()
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimate_size(v) for v in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        return int(value.element_size() * value.nelement())
+    if hasattr(value, "llama_state_size"):
+        return int(value.llama_state_size)
+    return 64
+
+class BackForwardCache:
+    """
+    Pamięć podręczna wpisów historii (jak bfcache przeglądarki): dla każdej opuszczonej strony
+    przechowuje dane scrapera oraz stan kontekstu PageAssistant (fragmenty, osadzenia, fakty,
+    opcjonalnie stan LLM), dzięki czemu "cofnij" i "dalej" przywracają kontekst bez scrapingu
+    i osadzania. Wpisy najdawniej używane są usuwane po przekroczeniu budżetu pamięci.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, max_entries: int = 30, keep_llm_state: bool = False):
+        """
+        Args:
+            max_bytes: Budżet pamięci na wszystkie wpisy (szacowany).
+            max_entries: Maksymalna liczba wpisów.
+            keep_llm_state: Czy przechowywać stan LLM (cache KV ostatniego promptu); zwykle zajmuje
+                dziesiątki lub setki MB, więc domyślnie wyłączone.
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.keep_llm_state = keep_llm_state
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.bytes_used = 0
+        self.stats = {"stored": 0, "hits": 0, "misses": 0, "evicted": 0, "refreshed": 0}
+
+    def put(self, url: str, page_data: Optional[Dict], state: Dict) -> bool:
+        """
+        Zapisuje wpis historii dla URL (zastępując poprzedni).
+
+        Args:
+            url: Adres strony.
+            page_data: Dane scrapera strony.
+            state: Stan kontekstu z PageAssistant.export_state.
+
+        Returns:
+            False, jeśli wpis nie mieści się w budżecie pamięci.
+        """
+        key = canonicalize_url(url)
+        previous = self.entries.get(key)
+        # Czas pobrania danych jest zachowywany, dopóki wpis dotyczy tych samych danych strony
+        stored_at = previous["stored_at"] if previous and previous["page_data"] is page_data else time.time()
+        if not self.keep_llm_state:
+            state = {k: v for k, v in state.items() if k != "llm_state"}
+        size = estimate_size(page_data) + estimate_size(state)
+        if size > self.max_bytes and "llm_state" in state:
+            state = {k: v for k, v in state.items() if k != "llm_state"}
+            size = estimate_size(page_data) + estimate_size(state)
+        self.remove(url)
+        if size > self.max_bytes:
+            logger.info(f"Pominięto zapis {url} w bfcache: {size / 1024 / 1024:.1f} MB przekracza budżet.")
+            return False
+        self.entries[key] = {"url": url, "page_data": page_data, "state": state, "stored_at": stored_at, "size": size}
+        self.bytes_used += size
+        self.stats["stored"] += 1
+        while self.entries and (self.bytes_used > self.max_bytes or len(self.entries) > self.max_entries):
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes_used -= evicted["size"]
+            self.stats["evicted"] += 1
+        return True
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Zwraca wpis historii dla URL (i oznacza go jako ostatnio używany) lub None."""
+        key = canonicalize_url(url)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def age(self, url: str) -> Optional[float]:
+        """Zwraca wiek danych wpisu w sekundach (None, jeśli wpisu nie ma)."""
+        entry = self.entries.get(canonicalize_url(url))
+        return time.time() - entry["stored_at"] if entry else None
+
+    def touch(self, url: str) -> None:
+        """Oznacza dane wpisu jako świeże (np. gdy treść strony się nie zmieniła)."""
+        entry = self.entries.get(canonicalize_url(url))
+        if entry:
+            entry["stored_at"] = time.time()
+
+    def remove(self, url: str) -> None:
+        """Usuwa wpis historii dla URL."""
+        entry = self.entries.pop(canonicalize_url(url), None)
+        if entry:
+            self.bytes_used -= entry["size"]
+
+    def clear(self) -> None:
+        """Usuwa wszystkie wpisy."""
+        self.entries.clear()
+        self.bytes_used = 0
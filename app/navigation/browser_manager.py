@@ -1,15 +1,31 @@
 import logging
-from typing import Dict, List, Optional
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 from urllib.parse import quote_plus
 from ai.page_assistant import PageAssistant
 from ai.image_describer import ImageDescriber
-from web.scraper import WebScraper
+from web.scraper import ScrapeLimits, WebScraper
+from web.settle import SettleTimings
+from web.page_store import PageStore
+from web.response_cache import ResponseCache
+from web.search_results import SearchCache, extract_serp
+from web.wikipedia_service import WikiArticle, WikipediaService
+from web.youtube_results import extract_youtube_results, youtube_search_url
+from web.page_index import PageIndex, scroll_to_anchor
+from web.structure_outline import describe_structure, narrate_headings
+from web.extraction_profiles import ExtractionProfiles
+from web.boilerplate import BoilerplateModel
+from web.site_index import SiteIndex
+from web.site_crawler import SiteCrawler
+from navigation.prefetcher import Prefetcher
+from navigation.bfcache import BackForwardCache
+from navigation.tab_session import TabSession, TabSessionManager
+from navigation.browser_profile import BrowserProfile, BrowserProfileConfig
 from voice.text_to_speech import TTSWrapper
-from utils.url_utils import normalize_url, validate_url
+from utils.url_utils import canonicalize_url, normalize_url, validate_url
 from playwright_stealth import stealth_sync
 from playwright.sync_api import sync_playwright
-import wikipediaapi
-from pytube import Search
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +34,13 @@ class BrowserError(Exception):
     pass
 
 class BrowserManager:
-    def __init__(self, page_assistant: PageAssistant):
+    def __init__(self, page_assistant: PageAssistant, page_store_path: Optional[str] = "page_store.sqlite",
+                 scrape_limits: Optional[ScrapeLimits] = None,
+                 extraction_profiles_path: Optional[str] = "extraction_profiles.json",
+                 site_index_path: str = "site_index.sqlite",
+                 bfcache: Optional[BackForwardCache] = None,
+                 profile: Optional[BrowserProfileConfig] = None,
+                 response_cache: Optional[ResponseCache] = None):
         self.playwright = None
         self.browser = None
         self.context = None
@@ -32,68 +54,419 @@ class BrowserManager:
         self.page_data_cache: Dict[str, Dict] = {}
         self.tts = TTSWrapper()
         self.scraper = None
-        self.wiki = wikipediaapi.Wikipedia('WebAssistBot/1.0', 'pl')
-        self.youtube_results = []
+        # Wspólne źródło artykułów Wikipedii (pamięć, magazyn na dysku, opcjonalny zrzut)
+        self.wikipedia = WikipediaService()
+        self.current_article: Optional[WikiArticle] = None
+        # Adres bieżącej strony, której karta jeszcze nie wyrenderowała (np. artykuł czytany z API)
+        self.pending_render: Optional[str] = None
+        # Wyniki ostatniego wyszukiwania YouTube (wspólne dla CommandParser) i pamięć wyszukiwań
+        self.youtube_results: List[Dict] = []
+        self.youtube_cache = SearchCache(ttl=60 * 60)
+        # Czas od komendy do odczytania wyników (s), osobno dla wyników z pamięci i ze strony
+        self.youtube_latency = {"cache": {"count": 0, "total": 0.0}, "page": {"count": 0, "total": 0.0}}
         self.image_describer = ImageDescriber()  
+        self.page_store = PageStore(page_store_path) if page_store_path else None
+        self.idle_tasks: Deque[Tuple[Callable, tuple]] = deque()
+        self.prefetcher: Optional[Prefetcher] = None
+        # Limity scrapingu bardzo dużych stron (None = pełny scraping bez limitów)
+        self.scrape_limits = scrape_limits
+        # Zapamiętane per domena węzły głównej treści (przyspieszają ekstrakcję przy kolejnych wizytach)
+        self.extraction_profiles = ExtractionProfiles(extraction_profiles_path)
+        # Model szablonów witryn: powtarzalne bloki (menu, stopki) nie trafiają do kontekstu LLM
+        self.boilerplate = BoilerplateModel()
+        # Indeks witryn do pytań o całą witrynę (tworzony przy pierwszym indeksowaniu)
+        self.site_index_path = site_index_path
+        self.site_index: Optional[SiteIndex] = None
+        self.crawler: Optional[SiteCrawler] = None
+        # Dane i kontekst opuszczonych stron do natychmiastowego "cofnij"/"dalej"
+        self.bfcache = bfcache or BackForwardCache()
+        # Sesje nieaktywnych kart (scraper, historia, dane strony i kontekst asystenta)
+        self.tabs = TabSessionManager()
+        # Per-domenowe czasy gotowości stron (adaptacyjne oczekiwanie na koniec nawigacji)
+        self.settle_timings = SettleTimings()
+        # Trwały profil przeglądarki (pamięć podręczna HTTP, ciasteczka, service workery) i czasy startu
+        self.profile = BrowserProfile(profile)
+        self.first_navigation_pending = False
+        # Nagrywanie/odtwarzanie odpowiedzi sieciowych (None = bez przechwytywania żądań)
+        self.response_cache = response_cache
+        # Wyniki wyszukiwań (znormalizowana fraza -> wyniki) i ostatnie wyszukiwanie
+        self.search_cache = SearchCache()
+        self.last_search: Optional[Dict] = None
+        # Indeks bieżącej strony (źródło danych, indeks) i ostatnie szukanie na stronie
+        self.page_index: Optional[Tuple[object, PageIndex]] = None
+        self.last_find: Optional[Dict] = None
+        # Ostatni opis struktury z reguł (adres, nagłówki, sekcje, konspekt) do dopracowania modelem
+        self.last_structure: Optional[Dict] = None
 
     def initialize(self):
-        """Inicjalizuje przeglądarkę w głównym wątku."""
+        """Inicjalizuje przeglądarkę w bieżącym wątku (tylko on może później używać Playwright)."""
         try:
             if self.playwright:
                 self.close_browser()
+            start_time = time.time()
             self.playwright = sync_playwright().start()
-            self.browser = self.playwright.chromium.launch(
-                headless=False,
-                args=[
+            args = [
                 "--disable-blink-features=AutomationControlled",
                 "--disable-infobars",
                 "--no-sandbox",
                 "--disable-dev-shm-usage"
-            ]
-            )
-            self.context = self.browser.new_context(
+            ] + self.profile.launch_args()
+            context_options = dict(
                 user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36",
                 permissions=["geolocation"],
                 viewport={"width": 1920, "height": 1080},
                 java_script_enabled=True,
                 bypass_csp=True
             )
-            self.page = self.context.new_page()
-            stealth_sync(self.page)
-            self.page.set_extra_http_headers({
-                "DNT": "0",
-                "Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
-            })
-            self.scraper = WebScraper(self.page)
+            user_data_dir = self.profile.prepare()
+            if user_data_dir:
+                try:
+                    # Trwały kontekst: przeglądarka i kontekst są jednym obiektem, a karta startowa już istnieje
+                    self.context = self.playwright.chromium.launch_persistent_context(
+                        user_data_dir, headless=self.profile.config.headless, args=args, **context_options)
+                    self.profile.mark_used()
+                except Exception as e:
+                    # Np. profil używany przez inną instancję przeglądarki
+                    logger.warning(f"Nie udało się otworzyć profilu {user_data_dir}, użyto kontekstu efemerycznego: {e}")
+                    self.profile.warm = False
+                    self.context = None
+            if not self.context:
+                self.browser = self.playwright.chromium.launch(headless=self.profile.config.headless, args=args)
+                self.context = self.browser.new_context(**context_options)
+            if self.response_cache:
+                self.response_cache.attach(self.context)
+            self.page = self._new_page(self.context.pages[0] if self.context.pages else None)
+            self.scraper = self._new_scraper(self.page)
+            self.prefetcher = Prefetcher(self._new_page, self.page_assistant, scraper_factory=self._new_scraper)
+            self.profile.record("startup", time.time() - start_time)
+            self.first_navigation_pending = True
             logger.info("Przeglądarka zainicjalizowana.")
         except Exception as e:
             logger.error(f"Błąd inicjalizacji przeglądarki: {e}")
             self.tts.speak("Nie udało się zainicjalizować przeglądarki.")
             raise BrowserError(str(e))
-            
+
+    def _new_page(self, page=None):
+        """Tworzy nową kartę (lub przygotowuje istniejącą) z ustawieniami stealth i nagłówkami przeglądarki."""
+        page = page or self.context.new_page()
+        stealth_sync(page)
+        page.set_extra_http_headers({
+            "DNT": "0",
+            "Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
+        })
+        return page
+
+    def _new_scraper(self, page) -> WebScraper:
+        """Tworzy scraper karty z limitami trybu ograniczonej pamięci (jeśli ustawione)."""
+        return WebScraper(page, limits=self.scrape_limits, profiles=self.extraction_profiles,
+                          boilerplate=self.boilerplate, timings=self.settle_timings)
+
+    def _goto(self, url: str, wait_until: str = "settled") -> Dict:
+        """
+        Nawiguje bieżącą kartą do URL i czeka, aż strona będzie gotowa (zdarzenia, cisza sieci i DOM),
+        albo przy wait_until="domcontentloaded" tylko do wczytania dokumentu.
+        """
+        start_time = time.time()
+        result = self.scraper.settle.goto(url, wait_until=wait_until)
+        if self.first_navigation_pending:
+            # Pierwsza nawigacja pokazuje różnicę między zimnym a ciepłym profilem (cache, zgody cookies)
+            self.first_navigation_pending = False
+            self.profile.record("first_navigation", time.time() - start_time)
+        return result
+
+    def _user_pages(self) -> List:
+        """Zwraca karty użytkownika (bez zapasowych kart prefetchera)."""
+        if not self.context:
+            return []
+        return [p for p in self.context.pages if not (self.prefetcher and self.prefetcher.owns(p))]
+
+    def prefetch_targets(self, urls: List[str], keep_pages: bool = True) -> None:
+        """Zapowiada strony, które użytkownik prawdopodobnie otworzy, i planuje ich pobranie w tle."""
+        if not self.prefetcher:
+            return
+        self.prefetcher.announce(urls, keep_pages=keep_pages)
+        self._schedule_idle_task(self._prefetch_step)
+
+    def _prefetch_step(self) -> None:
+        """Wykonuje krok prefetchu i planuje kolejny, jeśli pozostała praca."""
+        if self.prefetcher and self.prefetcher.step():
+            self._schedule_idle_task(self._prefetch_step)
+
+    def _open_prefetched(self, url: str) -> bool:
+        """
+        Otwiera stronę ze stanu pobranego z wyprzedzeniem (karta, dane scrapera i osadzenia).
+
+        Returns:
+            True, jeśli strona była pobrana z wyprzedzeniem i została otwarta.
+        """
+        entry = self.prefetcher.take(url) if self.prefetcher else None
+        if not entry:
+            return False
+        if entry.get("page") is not None:
+            # Podmiana kart: wyrenderowana karta prefetchera staje się kartą główną
+            old_page, old_scraper = self.page, self.scraper
+            self.page, self.scraper = entry["page"], entry["scraper"]
+            self.page.bring_to_front()
+            self.prefetcher.adopt(old_page, old_scraper)
+        else:
+            self._goto(url)
+        self._update_history(url)
+        page_data = entry["page_data"]
+        self.page_data_cache[url] = page_data
+        if self.page_store:
+            self._schedule_idle_task(self._persist_page_data, url)
+        self.page_assistant.load_context(page_data.get('content', {}), prepared=entry["prepared"])
+        return True
 
     def _get_page_data(self, url: str) -> Dict:
-        """Pobiera dane ze strony, używając cache'a jeśli dostępne."""
+        """Pobiera dane ze strony, używając cache'a w pamięci lub trwałego magazynu stron, jeśli dostępne."""
         try:
             if not url:
                 url = self.current_url
+            if url == self.current_url:
+                self._ensure_rendered()
             print(f"Pobieranie danych dla URL: {url}")
+            if url == self.current_url and self.page_data_cache.get(url):
+                # Strona mogła się zmienić od scrapingu (np. doładowanie przy przewijaniu)
+                self._apply_dom_changes()
             if url not in self.page_data_cache:
-                self.page_data_cache[url] = self.scraper.scrape_page(url)
+                stored = self.page_store.get(url) if self.page_store else None
+                if stored:
+                    data, is_fresh = stored
+                    print(f"Użyto danych z magazynu stron ({'świeże' if is_fresh else 'nieaktualne'}): {url}")
+                    self.page_data_cache[url] = data
+                    if not is_fresh:
+                        self._schedule_idle_task(self._refresh_stale_page, url)
+                else:
+                    data = self.scraper.scrape_page(url)
+                    self.page_data_cache[url] = data
+                    if data and self.page_store:
+                        # Zapis wymusza ekstrakcję wszystkich pól, więc odbywa się w wolnym czasie
+                        self._schedule_idle_task(self._persist_page_data, url)
+                if url == self.current_url:
+                    self._schedule_idle_task(self._build_page_index, url)
             return self.page_data_cache[url] or {}
         except Exception as e:
             logger.error(f"Błąd pobierania danych strony: {e}")
             return {}
 
+    def _schedule_idle_task(self, task: Callable, *args) -> None:
+        """Dodaje zadanie do wykonania w wolnym czasie pętli głównej (bez duplikatów)."""
+        if (task, args) not in self.idle_tasks:
+            self.idle_tasks.append((task, args))
+
+    def run_idle_tasks(self, max_tasks: int = 1) -> None:
+        """
+        Wykonuje zaplanowane zadania w tle, gdy kolejka komend jest pusta.
+
+        Playwright w trybie synchronicznym działa tylko w wątku przeglądarki, dlatego zadania w tle
+        (np. odświeżanie nieaktualnych stron) są wykonywane w tym wątku między komendami.
+        """
+        for _ in range(max_tasks):
+            if not self.idle_tasks:
+                return
+            task, args = self.idle_tasks.popleft()
+            try:
+                task(*args)
+            except Exception as e:
+                logger.error(f"Błąd zadania w tle {getattr(task, '__name__', task)}: {e}")
+
+    def _persist_page_data(self, url: str) -> None:
+        """Zapisuje dane strony z cache'a w pamięci do trwałego magazynu."""
+        data = self.page_data_cache.get(url)
+        if data and self.page_store:
+            self.page_store.put(url, data)
+
+    def _refresh_stale_page(self, url: str) -> None:
+        """Odświeża nieaktualne dane strony, jeśli strona jest nadal otwarta w przeglądarce."""
+        if not self.page or canonicalize_url(self.page.url) != canonicalize_url(url):
+            logger.info(f"Pominięto odświeżanie {url}: strona nie jest już otwarta.")
+            return
+        data = self.scraper.scrape_page(url)
+        if not data:
+            return
+        old_hash = self.page_store.get_hash(url) if self.page_store else None
+        new_hash = self.page_store.put(url, data) if self.page_store else None
+        previous = self.page_data_cache.get(url)
+        self.page_data_cache[url] = data
+        self.bfcache.remove(url)
+        if url != self.current_url:
+            return
+        if new_hash != old_hash or not self.page_store:
+            print(f"Treść strony {url} zmieniła się, przeładowanie kontekstu.")
+            self.page_assistant.load_context(data.get('content', {}))
+        elif previous and not (hasattr(previous, "is_loaded") and not previous.is_loaded("content")) \
+                and self.page_assistant.loaded_content is previous.get('content'):
+            # Treść bez zmian: kontekst pozostaje, ale odpowiada już nowym danym strony
+            self.page_assistant.loaded_content = data.get('content')
+
+    def _apply_dom_changes(self) -> bool:
+        """
+        Aktualizuje dane i kontekst bieżącej strony o zmiany DOM (delta zamiast pełnego scrapingu).
+
+        Returns:
+            False, jeśli zmiany wymagają pełnego scrapingu lub brak danych bazowych.
+        """
+        previous = self.page_data_cache.get(self.current_url)
+        if not previous:
+            return False
+        # Deltę można dołączyć tylko do kontekstu zbudowanego z poprzednich danych tej strony
+        extends = not (hasattr(previous, "is_loaded") and not previous.is_loaded("content")) \
+            and bool(self.page_assistant.context_chunks) \
+            and self.page_assistant.loaded_content is previous.get('content')
+        result = self.scraper.update_page_data(previous)
+        if result is None:
+            return False
+        data, delta = result
+        self.page_data_cache[self.current_url] = data
+        if self.page_store:
+            self._schedule_idle_task(self._persist_page_data, self.current_url)
+        if extends:
+            added = self.page_assistant.extend_context(delta)
+            self.page_assistant.loaded_content = data.get('content')
+            logger.info(f"Zastosowano zmiany DOM dla {self.current_url}: {added} nowych fragmentów kontekstu")
+        else:
+            self.page_assistant.load_context(data.get('content', {}))
+            logger.info(f"Zastosowano zmiany DOM dla {self.current_url}: kontekst zbudowany z pełnych danych strony")
+        return True
+
+    def _reload_current_page_data(self) -> Dict:
+        """Pobiera dane bieżącej strony: przyrostowo ze zmian DOM, a w razie potrzeby pełnym scrapingiem."""
+        if self._apply_dom_changes():
+            return self.page_data_cache[self.current_url]
+        self.page_data_cache.pop(self.current_url, None)
+        if self.page_store:
+            self.page_store.delete(self.current_url)
+        page_data = self._get_page_data(self.current_url)
+        self.page_assistant.load_context(page_data.get('content', {}))
+        return page_data
+
+    def _current_page_state(self, include_llm: bool = False) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        Zwraca dane bieżącej strony i stan kontekstu asystenta (None, jeśli kontekst nie pochodzi z tych danych).
+        """
+        url = self.current_url
+        page_data = self.page_data_cache.get(url) if url else None
+        if not page_data or (hasattr(page_data, "is_loaded") and not page_data.is_loaded("content")):
+            return page_data, None
+        state = self.page_assistant.export_state(include_llm=include_llm)
+        if not state or state["content"] is not page_data.get('content'):
+            return page_data, None
+        return page_data, state
+
+    def _remember_current_page(self) -> None:
+        """Zapisuje dane i kontekst opuszczanej strony w bfcache (do natychmiastowego powrotu)."""
+        page_data, state = self._current_page_state(include_llm=self.bfcache.keep_llm_state)
+        if state:
+            self.bfcache.put(self.current_url, page_data, state)
+
+    def _save_tab(self) -> None:
+        """Zapisuje sesję aktywnej karty przed przełączeniem na inną."""
+        if not self.page or self.page.is_closed():
+            return
+        # Karta zapisuje swój adres, więc odłożona strona musi być w niej wczytana
+        self._ensure_rendered()
+        page_data, state = self._current_page_state(include_llm=self.tabs.keep_llm_state)
+        self.tabs.save(TabSession(self.page, self.scraper, self.history, self.history_index, self.current_url,
+                                  page_data, state))
+
+    def _activate_tab(self, page) -> None:
+        """Ustawia kartę jako aktywną, przywracając jej scraper, historię, dane strony i kontekst."""
+        start_time = time.time()
+        session = self.tabs.take(page)
+        if session is None:
+            # Karta otwarta poza asystentem (np. przez stronę): nowa sesja od bieżącego adresu
+            session = TabSession(page, self._new_scraper(page), [page.url], 0, page.url)
+        self.page, self.scraper = session.page, session.scraper
+        self.history, self.history_index, self.current_url = session.history, session.history_index, session.current_url
+        self.page.bring_to_front()
+        if session.page_data is not None:
+            self.page_data_cache[self.current_url] = session.page_data
+        if session.state:
+            self.page_assistant.restore_state(session.state)
+        if self.current_url and canonicalize_url(self.page.url) != canonicalize_url(self.current_url):
+            # Karta przeszła na inną stronę, gdy była nieaktywna
+            self._update_history(self.page.url)
+            page_data = self._get_page_data(self.current_url)
+            self.page_assistant.load_context(page_data.get('content', {}))
+        elif not session.state and self.current_url:
+            page_data = self._get_page_data(self.current_url)
+            self.page_assistant.load_context(page_data.get('content', {}))
+        print(f"Przełączono kartę ({self.current_url}) w {time.time() - start_time:.3f}s")
+
+    def _restore_history_entry(self, url: str) -> None:
+        """
+        Przywraca dane i kontekst strony z historii: z bfcache bez scrapingu i osadzania,
+        a przy braku wpisu standardową ścieżką pobierania danych.
+
+        Nieaktualne wpisy (starsze niż czas świeżości domeny) są odświeżane w wolnym czasie,
+        chyba że skrót DOM wczytanej strony jest identyczny jak w zapamiętanych danych.
+        """
+        start_time = time.time()
+        entry = self.bfcache.get(url)
+        if not entry or not entry["page_data"]:
+            page_data = self._get_page_data(url)
+            self.page_assistant.load_context(page_data.get('content', {}))
+            return
+        page_data = entry["page_data"]
+        self.page_data_cache[url] = page_data
+        self.page_assistant.restore_state(entry["state"])
+        # Przywrócone dane są punktem odniesienia dla kolejnych zmian DOM
+        self.scraper.tracker.reset()
+        max_age = self.page_store.max_age_for(url) if self.page_store else 24 * 3600
+        if self.bfcache.age(url) > max_age:
+            old_hash = page_data.get('metadata', {}).get('dom_hash')
+            if old_hash and old_hash == self.scraper.tracker.dom_hash():
+                self.bfcache.touch(url)
+            else:
+                self.bfcache.stats["refreshed"] += 1
+                self._schedule_idle_task(self._refresh_stale_page, url)
+        print(f"Przywrócono stronę {url} z bfcache w {time.time() - start_time:.3f}s")
+
+    def _go_to_history_entry(self, index: int) -> str:
+        """Przechodzi do wpisu historii o podanym indeksie, przywracając jego dane i kontekst."""
+        self._remember_current_page()
+        self.history_index = index
+        url = self.history[index]
+        self._goto(url)
+        self.current_url = url
+        self._restore_history_entry(url)
+        return url
+
     def _update_history(self, url: str) -> None:
         """Aktualizuje historię bez duplikatów."""
+        if url != self.current_url:
+            self._remember_current_page()
+            self.current_article = None
+            self.pending_render = None
         if self.history and self.history[-1] == url:
             return
         self.history.append(url)
         self.history_index = len(self.history) - 1
         self.current_url = url
 
+    def open_wikipedia_article(self, article: WikiArticle, render: bool = False) -> str:
+        """
+        Ustawia artykuł Wikipedii jako bieżącą stronę z kontekstem z tekstu artykułu.
+
+        Bez render karta nie jest nawigowana (wystarcza tekst artykułu); strona jest renderowana
+        dopiero wtedy, gdy komenda potrzebuje karty (linki, przyciski, formularze, scraping).
+        """
+        if render:
+            self._goto(article.url)
+        self._update_history(article.url)
+        self.current_article = article
+        self.pending_render = None if render else article.url
+        self.page_assistant.load_context(article.content)
+        return article.url
+
+    def _ensure_rendered(self) -> None:
+        """Wczytuje w karcie bieżącą stronę, jeśli jej renderowanie zostało odłożone."""
+        if self.pending_render and self.pending_render == self.current_url:
+            self._goto(self.pending_render)
+        self.pending_render = None
+
     def open_page(self, url: str, isSpeak = True, isWikipedia = False, wikipediaText = "") -> Optional[str]:
         """Otwiera stronę po normalizacji i walidacji URL."""
         try:
@@ -102,7 +475,11 @@ class BrowserManager:
             if not validate_url(url):
                 self.tts.speak("Nieprawidłowy adres URL.")
                 raise BrowserError("Nieprawidłowy adres URL.")
-            self.page.goto(url, wait_until="domcontentloaded")
+            if not isWikipedia and self._open_prefetched(url):
+                if isSpeak:
+                    self.tts.speak(f"Otworzono stronę: {url}")
+                return url
+            self._goto(url)
             self._update_history(url)
             if not isWikipedia:
                 page_data = self._get_page_data(url)
@@ -114,7 +491,8 @@ class BrowserManager:
                 logger.info(f"Ładowanie kontekstu z danymi: {list(content.keys())}")
                 self.page_assistant.load_context(content)
             else:
-                self.page_assistant.load_context(wikipediaText)
+                article = self.wikipedia.article_for_url(url)
+                self.page_assistant.load_context(article.content if article else {"text": wikipediaText})
             if isSpeak:
                 self.tts.speak(f"Otworzono stronę: {url}")
             return url
@@ -124,18 +502,34 @@ class BrowserManager:
             raise BrowserError(str(e))
 
     def search_web(self, query: str) -> Optional[str]:
-        """Wykonuje wyszukiwanie w sieci."""
+        """Wykonuje wyszukiwanie w sieci (powtórzone wyszukiwanie korzysta z zapamiętanych wyników)."""
         try:
             if not query:
                 self.tts.speak("Brak frazy do wyszukania.")
                 raise BrowserError("Brak frazy do wyszukania.")
+            cached = self.search_cache.get(query, self.default_search_engine)
+            if cached:
+                self.last_search = cached
+                self._open_cached_results(cached["url"])
+                print(f"Wyniki wyszukiwania z pamięci: {query} ({len(cached['results'])})")
+                self.tts.speak(f"Wyszukano: {query}")
+                return cached["url"]
             encoded_query = quote_plus(query)
             search_url = f"{self.default_search_engine}{encoded_query}"
-            self.page.goto(search_url, wait_until="domcontentloaded")
+            start_time = time.time()
+            self._goto(search_url)
             self._update_history(search_url)
+            results = extract_serp(self.page)
             page_data = self._get_page_data(search_url)
-            text = page_data.get('content', {})
-            self.page_assistant.load_context(text)
+            if not results:
+                # Nieznany układ strony wyników (lub strona zgody): wyniki z pełnego scrapingu
+                results = page_data.get('search_results', [])
+            self.page_assistant.load_context(page_data.get('content', {}))
+            print(f"Wyszukiwanie {query}: {len(results)} wyników w {time.time() - start_time:.2f}s")
+            if results:
+                self.last_search = self.search_cache.put(query, search_url, results, self.default_search_engine)
+            else:
+                self.last_search = None
             self.tts.speak(f"Wyszukano: {query}")
             return search_url
         except Exception as e:
@@ -143,36 +537,48 @@ class BrowserManager:
             self.tts.speak("Nie udało się wykonać wyszukiwania.")
             raise BrowserError(str(e))
 
+    def _open_cached_results(self, url: str) -> None:
+        """
+        Ustawia zapamiętaną stronę wyników jako bieżącą (historia i kontekst asystenta). Gdy dane strony
+        są w pamięci, karta jest wczytywana dopiero, gdy komenda jej potrzebuje (jak artykuły Wikipedii).
+        """
+        self._update_history(url)
+        page_data = self.page_data_cache.get(url)
+        if page_data:
+            self.pending_render = url
+        else:
+            self._goto(url)
+            page_data = self._get_page_data(url)
+        content = page_data.get('content', {})
+        if self.page_assistant.loaded_content is not content:
+            self.page_assistant.load_context(content)
+
+    def _search_results(self) -> List[Dict]:
+        """
+        Zwraca wyniki ostatniego wyszukiwania; jeśli bieżąca strona jest stroną wyników otwartą
+        inaczej niż przez search_web, wyniki są odczytywane z jej danych.
+        """
+        if self.current_url and any(engine in self.current_url for engine in ["google.com/search", "bing.com/search", "duckduckgo.com"]) \
+                and not (self.last_search and canonicalize_url(self.last_search["url"]) == canonicalize_url(self.current_url)):
+            results = self._get_page_data(self.current_url).get('search_results', [])
+            self.last_search = {"query": None, "url": self.current_url, "results": results, "stored_at": time.time()}
+        return self.last_search["results"] if self.last_search else []
+
     def read_search_results(self, max_results: int = 5) -> Optional[List[Dict]]:
         """Odczytuje wyniki wyszukiwania."""
         try:
-            if not self.current_url or not any(engine in self.current_url for engine in ["google.com/search", "bing.com/search", "duckduckgo.com"]):
+            search_results = self._search_results()
+            if not self.last_search:
                 self.tts.speak("Najpierw wykonaj wyszukiwanie.")
                 return None
-
-            page_data = self._get_page_data(self.current_url)
-            search_results = page_data.get('search_results', [])
-            if not search_results:
-                self.tts.speak("Nie znaleziono wyników wyszukiwania.")
-                return None
-
-            results = []
-            for i, result in enumerate(search_results[:max_results], 1):
-                title = result.get('title', 'Brak tytułu')
-                url = result.get('url')
-                if url and validate_url(url):
-                    results.append({
-                        "index": i,
-                        "title": title,
-                        "url": url
-                    })
-
+            results = [r for r in search_results[:max_results] if r.get('url') and validate_url(r['url'])]
             if not results:
-                self.tts.speak("Nie znaleziono prawidłowych wyników wyszukiwania.")
+                self.tts.speak("Nie znaleziono wyników wyszukiwania.")
                 return None
 
-            result_text = "\n".join([f"Wynik {r['index']}: {r['title']}" for r in results])
+            result_text = "\n".join([f"Wynik {r['index']}: {r.get('title', 'Brak tytułu')}" for r in results])
             self.tts.speak(f"Wyniki wyszukiwania:\n{result_text}")
+            self.prefetch_targets([r["url"] for r in results])
             return results
         except Exception as e:
             logger.error(f"Błąd odczytu wyników wyszukiwania: {e}")
@@ -180,24 +586,27 @@ class BrowserManager:
             return None
 
     def open_search_result(self, index: int) -> Optional[str]:
-        """Otwiera wynik wyszukiwania o podanym numerze."""
+        """Otwiera wynik wyszukiwania o podanym numerze (z listy wyników, bez ponownego odczytu)."""
         try:
-            results = self.read_search_results(max_results=10)
+            results = self._search_results()
             if not results:
                 self.tts.speak("Brak wyników wyszukiwania.")
                 return None
-            for result in results:
-                if result["index"] == index:
-                    url = result["url"]
-                    self.page.goto(url, wait_until="domcontentloaded")
-                    self._update_history(url)
-                    page_data = self._get_page_data(url)
-                    text = page_data.get('content', {})
-                    self.page_assistant.load_context(text)
-                    self.tts.speak(f"Otworzono wynik {index}: {result['title']}")
-                    return url
-            self.tts.speak(f"Nie znaleziono wyniku o numerze {index}.")
-            return None
+            result = next((r for r in results if r["index"] == index), None)
+            if not result or not validate_url(result.get("url", "")):
+                self.tts.speak(f"Nie znaleziono wyniku o numerze {index}.")
+                return None
+            url = result["url"]
+            if self._open_prefetched(url):
+                self.tts.speak(f"Otworzono wynik {index}: {result['title']}")
+                return url
+            self._goto(url)
+            self._update_history(url)
+            page_data = self._get_page_data(url)
+            text = page_data.get('content', {})
+            self.page_assistant.load_context(text)
+            self.tts.speak(f"Otworzono wynik {index}: {result['title']}")
+            return url
         except Exception as e:
             logger.error(f"Błąd otwierania wyniku wyszukiwania: {e}")
             self.tts.speak("Nie udało się otworzyć wyniku wyszukiwania.")
@@ -209,14 +618,16 @@ class BrowserManager:
             if not self.current_url:
                 self.tts.speak("Najpierw otwórz stronę.")
                 return None
-            page_data = self._get_page_data(self.current_url)
-            links = page_data.get('links', [])[:max_links]
+            self._ensure_rendered()
+            self.scraper.elements.refresh()
+            links = self.scraper.elements.items("link")[:max_links]
             if not links:
                 self.tts.speak("Nie znaleziono linków na stronie.")
                 return None
-            link_text = "\n".join([f"Link {i+1}: {link['text']}" for i, link in enumerate(links)])
+            link_text = "\n".join([f"Link {link['number']}: {link['name'] or 'Link bez tekstu'}" for link in links])
             self.tts.speak(f"Linki na stronie:\n{link_text}")
-            return [{"index": i+1, "text": link['text'], "url": link['url']} for i, link in enumerate(links)]
+            self.prefetch_targets([link['url'] for link in links if link['url']])
+            return [{"index": link['number'], "text": link['name'], "url": link['url']} for link in links]
         except Exception as e:
             logger.error(f"Błąd odczytu linków: {e}")
             self.tts.speak("Nie udało się odczytać linków.")
@@ -225,22 +636,30 @@ class BrowserManager:
     def open_page_link(self, index: int) -> Optional[str]:
         """Otwiera link o podanym numerze na stronie."""
         try:
-            links = self.read_page_links(max_results=10)
-            if not links:
-                self.tts.speak("Brak linków na stronie.")
-                return None
-            for link in links:
-                if link["index"] == index:
-                    url = link["url"]
-                    self.page.goto(url, wait_until="domcontentloaded")
-                    self._update_history(url)
-                    page_data = self._get_page_data(url)
-                    text = page_data.get('content', {})
-                    self.page_assistant.load_context(text)
-                    self.tts.speak(f"Otworzono link {index}: {link['text']}")
-                    return url
-            self.tts.speak(f"Nie znaleziono linku o numerze {index}.")
-            return None
+            if not self.current_url:
+                self.tts.speak("Najpierw otwórz stronę.")
+                return None
+            self._ensure_rendered()
+            self.scraper.elements.refresh()
+            link = self.scraper.elements.get("link", index)
+            if not link:
+                self.tts.speak(f"Nie znaleziono linku o numerze {index}.")
+                return None
+            url = link["url"]
+            if not url or not validate_url(url):
+                # Link bez adresu (np. role="link" obsługiwany skryptem strony)
+                self.click_link(index)
+                return self.current_url
+            if self._open_prefetched(url):
+                self.tts.speak(f"Otworzono link {index}: {link['name']}")
+                return url
+            self._goto(url)
+            self._update_history(url)
+            page_data = self._get_page_data(url)
+            text = page_data.get('content', {})
+            self.page_assistant.load_context(text)
+            self.tts.speak(f"Otworzono link {index}: {link['name']}")
+            return url
         except Exception as e:
             logger.error(f"Błąd otwierania linku: {e}")
             self.tts.speak("Nie udało się otworzyć linku.")
@@ -250,9 +669,7 @@ class BrowserManager:
         """Cofa się w historii przeglądania."""
         try:
             if self.history_index > 0:
-                self.history_index -= 1
-                url = self.history[self.history_index]
-                self.page.goto(url, wait_until="domcontentloaded")
+                url = self._go_to_history_entry(self.history_index - 1)
                 self.tts.speak(f"Wrócono do: {url}")
                 return url
             self.tts.speak("Brak poprzednich stron.")
@@ -266,9 +683,7 @@ class BrowserManager:
         """Przechodzi do przodu w historii przeglądania."""
         try:
             if self.history_index < len(self.history) - 1:
-                self.history_index += 1
-                url = self.history[self.history_index]
-                self.page.goto(url, wait_until="domcontentloaded")
+                url = self._go_to_history_entry(self.history_index + 1)
                 self.tts.speak(f"Przejście do: {url}")
                 return url
             self.tts.speak("Brak następnych stron.")
@@ -282,8 +697,21 @@ class BrowserManager:
         """Odświeża bieżącą stronę."""
         try:
             if self.current_url:
-                self.page.reload(wait_until="domcontentloaded")
-                self.page_data_cache.pop(self.current_url, None)
+                self._ensure_rendered()
+                self.scraper.settle.reload()
+                cached = self.page_data_cache.get(self.current_url)
+                old_hash = cached.get('metadata', {}).get('dom_hash') if cached else None
+                if old_hash and old_hash == self.scraper.tracker.dom_hash():
+                    # Treść po odświeżeniu jest identyczna: zachowaj dane i kontekst
+                    self.scraper.tracker.reset()
+                    logger.info(f"Skrót DOM bez zmian po odświeżeniu {self.current_url}, pominięto scraping.")
+                else:
+                    self.page_data_cache.pop(self.current_url, None)
+                    self.bfcache.remove(self.current_url)
+                    if self.page_store:
+                        self.page_store.delete(self.current_url)
+                    page_data = self._get_page_data(self.current_url)
+                    self.page_assistant.load_context(page_data.get('content', {}))
                 self.tts.speak("Strona odświeżona.")
                 return self.current_url
             self.tts.speak("Brak aktywnej strony.")
@@ -296,7 +724,7 @@ class BrowserManager:
     def open_browser(self) -> Optional[str]:
         """Otwiera przeglądarkę na stronie domowej."""
         try:
-            self.page.goto(self.home_page, wait_until="domcontentloaded")
+            self._goto(self.home_page)
             self._update_history(self.home_page)
             self.tts.speak("Przeglądarka uruchomiona.")
             return self.home_page
@@ -308,6 +736,12 @@ class BrowserManager:
     def close_browser(self) -> None:
         """Zamyka przeglądarkę i czyści zasoby."""
         try:
+            if self.prefetcher:
+                self.prefetcher.close()
+                self.prefetcher = None
+            logger.info(f"Statystyki usuwania szablonów witryn: {self.boilerplate.totals}")
+            if self.crawler:
+                self.crawler.stop()
             if self.page:
                 self.page.close()
             if self.context:
@@ -323,8 +757,29 @@ class BrowserManager:
             self.current_url = None
             self.history.clear()
             self.page_data_cache.clear()
+            logger.info(f"Statystyki bfcache: {self.bfcache.stats}")
+            logger.info(f"Czasy gotowości stron per domena: {self.settle_timings.report()}")
+            self.bfcache.clear()
+            logger.info(f"Statystyki sesji kart: {self.tabs.stats}")
+            logger.info(f"Czasy startu przeglądarki (profil zimny/ciepły): {self.profile.report()}")
+            if self.response_cache:
+                self.response_cache.evict()
+                logger.info(f"Pamięć odpowiedzi sieciowych: {self.response_cache.summary()}")
+            self.first_navigation_pending = False
+            self.tabs.clear()
+            self.idle_tasks.clear()
             self.history_index = -1
             self.youtube_results = []
+            logger.info(f"Czasy wyszukiwania YouTube: {self.youtube_latency}")
+            logger.info(f"Statystyki pamięci wyszukiwań: {self.search_cache.stats}")
+            self.search_cache.clear()
+            self.last_search = None
+            self.page_index = None
+            self.last_find = None
+            self.last_structure = None
+            self.current_article = None
+            self.pending_render = None
+            logger.info(f"Statystyki artykułów Wikipedii: {self.wikipedia.stats}")
             self.tts.speak("Przeglądarka zamknięta.")
         except Exception as e:
             logger.error(f"Błąd zamykania przeglądarki: {e}")
@@ -342,7 +797,7 @@ class BrowserManager:
             if not headings:
                 self.tts.speak("Brak nagłówków na stronie.")
                 return None
-            heading_text = "\n".join([f"Poziom {h['level']}: {h['text']}" + (f" ({h['aria_label']})" if h['aria_label'] else "") for h in headings])
+            heading_text = narrate_headings(headings)
             self.tts.speak(f"Nagłówki na stronie:\n{heading_text}")
             return heading_text
         except Exception as e:
@@ -356,13 +811,12 @@ class BrowserManager:
             if not self.current_url:
                 self.tts.speak("Najpierw otwórz stronę.")
                 return None
-            if "wikipedia.org" in self.current_url:
-                wiki_page = self.wiki.page(self.current_url.split("/")[-1])
-                if wiki_page.exists():
-                    content = wiki_page.text
-                    return content
-            page_data = self._get_page_data(self.current_url)
-            content = page_data.get('content', {}).get('text', '')
+            article = self.wikipedia.article_for_url(self.current_url)
+            if article:
+                content = article.text
+            else:
+                page_data = self._get_page_data(self.current_url)
+                content = page_data.get('content', {}).get('text', '')
             if not content:
                 self.tts.speak("Brak treści do odczytania.")
                 return None
@@ -377,7 +831,7 @@ class BrowserManager:
     def go_home(self) -> Optional[str]:
         """Wraca do strony domowej."""
         try:
-            self.page.goto(self.home_page, wait_until="domcontentloaded")
+            self._goto(self.home_page)
             self._update_history(self.home_page)
             self.tts.speak("Wrócono do strony domowej.")
             return self.home_page
@@ -402,10 +856,11 @@ class BrowserManager:
             if not validate_url(url):
                 self.tts.speak("Nieprawidłowy adres URL.")
                 return None
-            new_page = self.context.new_page()
-            new_page.goto(url, wait_until="domcontentloaded")
-            self.page = new_page
-            self.scraper = WebScraper(self.page)
+            self._save_tab()
+            self.page = self._new_page()
+            self.scraper = self._new_scraper(self.page)
+            self.history, self.history_index, self.current_url = [], -1, None
+            self._goto(url)
             self._update_history(url)
             page_data = self._get_page_data(url)
             text = page_data.get('content', {})
@@ -423,33 +878,113 @@ class BrowserManager:
             if not section_name:
                 self.tts.speak("Podaj nazwę sekcji.")
                 return None
-            if "wikipedia.org" in self.current_url:
-                wiki_page = self.wiki.page(self.current_url.split("/")[-1])
-                if wiki_page.exists():
-                    section = wiki_page.section_by_title(section_name)
-                    if section:
-                        self.tts.speak(f"Przejście do sekcji: {section_name}")
-                        return section_name
-                    self.tts.speak(f"Nie znaleziono sekcji: {section_name}")
-                    return None
-            page_data = self._get_page_data(self.current_url)
-            sections = page_data.get('sections', [])
-            for section in sections:
-                if section_name.lower() in section['name'].lower():
-                    section_id = section.get('id')
-                    if section_id:
-                        self.page.evaluate(f"document.getElementById('{section_id}')?.scrollIntoView()")
-                    else:
-                        self.tts.speak(f"Sekcja {section['name']} nie ma identyfikatora do przewinięcia.")
-                    self.tts.speak(f"Przejście do sekcji: {section['name']}")
-                    return section['name']
-            self.tts.speak(f"Nie znaleziono sekcji: {section_name}")
-            return None
+            article = self.wikipedia.article_for_url(self.current_url)
+            if article:
+                section = article.section(section_name)
+                if section:
+                    if not self.pending_render:
+                        # Kotwice sekcji Wikipedii to tytuły z podkreśleniami zamiast spacji
+                        self.page.evaluate("(id) => document.getElementById(id)?.scrollIntoView()",
+                                           section["title"].replace(" ", "_"))
+                    self.tts.speak(f"Przejście do sekcji: {section['title']}")
+                    return section["title"]
+                self.tts.speak(f"Nie znaleziono sekcji: {section_name}")
+                return None
+            index = self._page_index()
+            section = index.find_section(section_name) if index else None
+            if not section:
+                self.tts.speak(f"Nie znaleziono sekcji: {section_name}")
+                return None
+            if not scroll_to_anchor(self.page, section["anchor"]):
+                self.tts.speak(f"Nie udało się przewinąć do sekcji {section['name']}.")
+            self.tts.speak(f"Przejście do sekcji: {section['name']}")
+            return section['name']
         except Exception as e:
             logger.error(f"Błąd przechodzenia do sekcji: {e}")
             self.tts.speak("Nie udało się przejść do sekcji.")
             return None
 
+    def _page_index(self) -> Optional[PageIndex]:
+        """
+        Zwraca indeks bieżącej strony, budowany raz dla danych strony (po zmianie danych, np. delcie
+        DOM, od nowa); dla niewyrenderowanego artykułu Wikipedii z tekstu artykułu.
+        """
+        if self.current_article and self.pending_render:
+            source = self.current_article
+        else:
+            source = self._get_page_data(self.current_url)
+        if not source:
+            return None
+        if self.page_index and self.page_index[0] is source:
+            return self.page_index[1]
+        if isinstance(source, WikiArticle):
+            sections = [{"name": section["title"], "id": section["title"].replace(" ", "_")}
+                        for section in source.section_index.values()]
+            index = PageIndex.from_text(source.text, sections)
+        else:
+            index = PageIndex.from_page_data(source)
+        self.page_index = (source, index)
+        return index
+
+    def _build_page_index(self, url: str) -> None:
+        """Buduje w wolnym czasie indeks strony, jeśli jest nadal bieżącą stroną."""
+        if url == self.current_url:
+            self._page_index()
+
+    def _announce_find_hit(self, position: int) -> None:
+        """Odczytuje trafienie ostatniego szukania na stronie i przewija do niego stronę."""
+        result = self.last_find["result"]
+        hit = result["hits"][position]
+        self.last_find["position"] = position
+        if not self.pending_render:
+            scroll_to_anchor(self.page, hit["anchor"])
+        self.tts.speak(f"Wystąpienie {position + 1} z {result['count']}: {hit['snippet']}")
+
+    def find_on_page(self, phrase: str) -> Optional[Dict]:
+        """
+        Wyszukuje frazę na bieżącej stronie (bez względu na znaki diakrytyczne i odmianę, z tolerancją
+        literówek), podaje liczbę wystąpień, odczytuje pierwsze i przewija do niego stronę.
+
+        Returns:
+            Wynik szukania {'query', 'count', 'exact_count', 'hits'} lub None, jeśli nie znaleziono.
+        """
+        try:
+            if not self.current_url:
+                self.tts.speak("Najpierw otwórz stronę.")
+                return None
+            index = self._page_index()
+            if not index or not index.texts:
+                self.tts.speak("Brak treści do przeszukania.")
+                return None
+            start_time = time.time()
+            result = index.search(phrase)
+            print(f"Szukanie na stronie w {(time.time() - start_time) * 1000:.2f} ms")
+            if not result["count"]:
+                self.last_find = None
+                self.tts.speak(f"Nie znaleziono frazy: {phrase}")
+                return None
+            self.last_find = {"url": self.current_url, "result": result, "position": 0}
+            approximate = "" if result["exact_count"] else " (dopasowanie przybliżone)"
+            navigable = ""
+            if result["count"] > len(result["hits"]):
+                navigable = f" Można przejść do pierwszych {len(result['hits'])}."
+            self.tts.speak(f"Znaleziono frazę {phrase}{approximate}. Liczba wystąpień: {result['count']}.{navigable}")
+            self._announce_find_hit(0)
+            return result
+        except Exception as e:
+            logger.error(f"Błąd wyszukiwania frazy: {e}")
+            self.tts.speak("Nie udało się wyszukać frazy.")
+            return None
+
+    def find_next(self) -> Optional[str]:
+        """Przechodzi do następnego wystąpienia ostatnio szukanej frazy (po ostatnim wraca do pierwszego)."""
+        if not self.last_find or self.last_find["url"] != self.current_url:
+            self.tts.speak("Najpierw wyszukaj frazę na stronie.")
+            return None
+        position = (self.last_find["position"] + 1) % len(self.last_find["result"]["hits"])
+        self._announce_find_hit(position)
+        return self.last_find["result"]["hits"][position]["snippet"]
+
     def read_forms(self) -> Optional[List[Dict]]:
         """Odczytuje formularze na bieżącej stronie."""
         try:
@@ -484,57 +1019,90 @@ class BrowserManager:
             Optional[str]: Opis obrazu lub None w przypadku błędu.
         """
         try:
-            if not self.current_url:
-                self.tts.speak("Najpierw otwórz stronę.")
+            image = self._select_image(image_index)
+            if image is None:
                 return None
+            # Sprawdzenie, czy ImageDescriber jest dostępny
+            description = self._describe_image_data(image) if self.image_describer else None
+            return self._announce_image_description(image_index, image, description)
+        except Exception as e:
+            logger.error(f"Błąd opisywania obrazu {image_index}: {e}")
+            self.tts.speak("Nie udało się opisać obrazu.")
+            return None
 
-            # Pobierz dane strony
-            page_data = self._get_page_data(self.current_url)
-            images = page_data.get('images', [])
-            
-            if not images:
-                self.tts.speak("Na stronie nie znaleziono obrazów.")
-                return None
-                
-            if image_index < 1 or image_index > len(images):
-                self.tts.speak(f"Nieprawidłowy numer obrazu. Dostępne obrazy: od 1 do {len(images)}.")
-                print(f"Nieprawidłowy indeks obrazu: {image_index}, dostępne: {len(images)}")
-                return None
+    def _select_image(self, image_index: int) -> Optional[Dict]:
+        """Zwraca obraz o podanym numerze z danych bieżącej strony (błędy są komunikowane głosowo)."""
+        if not self.current_url:
+            self.tts.speak("Najpierw otwórz stronę.")
+            return None
 
-            image = images[image_index - 1]
-            print(f"Opis obrazu {image_index}: {image}")
+        # Pobierz dane strony
+        page_data = self._get_page_data(self.current_url)
+        images = page_data.get('images', [])
 
-            # Sprawdzenie, czy ImageDescriber jest dostępny
-            if self.image_describer:
-                description = self.image_describer.describe_image(image)
-                if description:
-                    self.tts.speak(f"Obraz {image_index}: {description}")
-                    return description
-                else:
-                    print(f"ImageDescriber nie zwrócił opisu dla obrazu {image_index}")
-            
-            # Fallback na tekst alt
-            description = image.get('alt', 'Brak opisu')
+        if not images:
+            self.tts.speak("Na stronie nie znaleziono obrazów.")
+            return None
+
+        if image_index < 1 or image_index > len(images):
+            self.tts.speak(f"Nieprawidłowy numer obrazu. Dostępne obrazy: od 1 do {len(images)}.")
+            print(f"Nieprawidłowy indeks obrazu: {image_index}, dostępne: {len(images)}")
+            return None
+
+        image = images[image_index - 1]
+        print(f"Opis obrazu {image_index}: {image}")
+        return image
+
+    def _announce_image_description(self, image_index: int, image: Dict, description: Optional[str]) -> str:
+        """Odczytuje opis obrazu, a gdy go brak, tekst alternatywny."""
+        if description:
             self.tts.speak(f"Obraz {image_index}: {description}")
             return description
+        print(f"ImageDescriber nie zwrócił opisu dla obrazu {image_index}")
+        # Fallback na tekst alt
+        description = image.get('alt', 'Brak opisu')
+        self.tts.speak(f"Obraz {image_index}: {description}")
+        return description
 
-        except Exception as e:
-            logger.error(f"Błąd opisywania obrazu {image_index}: {e}")
-            self.tts.speak("Nie udało się opisać obrazu.")
+    def _image_request(self, image: Dict) -> Optional[Dict]:
+        """
+        Zwraca argumenty ImageDescriber.describe_image dla obrazu: bajty już pobrane przez przeglądarkę,
+        a gdy ich brak, ciasteczka i nagłówki karty do pobrania przez sesję HTTP (None, jeśli obraz
+        jest niedostępny).
+        """
+        src = image.get("src", "")
+        if image.get("is_meaningful_alt") and image.get("alt"):
+            return {}
+        image_bytes, _ = self.scraper.images.get_bytes(src) if src else (None, None)
+        if image_bytes is not None:
+            return {"image_bytes": image_bytes}
+        if not src.startswith(("http://", "https://")):
+            logger.warning(f"Obraz {src[:60]} niedostępny w przeglądarce")
             return None
+        cookies = {c["name"]: c["value"] for c in self.context.cookies([src])} if self.context else None
+        headers = {"Referer": self.current_url or "", "User-Agent": self.page.evaluate("() => navigator.userAgent")}
+        return {"headers": headers, "cookies": cookies}
+
+    def _describe_image_data(self, image: Dict) -> Optional[str]:
+        """Opisuje obraz, korzystając z bajtów z przeglądarki lub pobierając go z ciasteczkami karty."""
+        request = self._image_request(image)
+        return self.image_describer.describe_image(image, **request) if request is not None else None
 
     def next_page(self) -> Optional[str]:
         """Przechodzi do następnej strony (np. w wynikach wyszukiwania)."""
         try:
+            self._ensure_rendered()
             next_button = self.page.query_selector('a[rel="next"]') or self.page.query_selector('a:text("Następna")')
             if next_button:
-                next_button.click()
-                self.page.wait_for_load_state("domcontentloaded")
-                self._update_history(self.page.url)
-                page_data = self._get_page_data(self.page.url)
-                text = page_data.get('content', {})
-                self.page_assistant.load_context(text)
-                self.page_data_cache.pop(self.current_url, None)
+                self.scraper.settle.run(next_button.click)
+                if self.page.url == self.current_url:
+                    # Paginacja bez zmiany adresu (JS): tylko zmienione fragmenty strony
+                    self._reload_current_page_data()
+                else:
+                    self._update_history(self.page.url)
+                    page_data = self._get_page_data(self.page.url)
+                    text = page_data.get('content', {})
+                    self.page_assistant.load_context(text)
                 self.tts.speak("Przejście do następnej strony.")
                 return self.page.url
             self.tts.speak("Brak przycisku następnej strony.")
@@ -547,15 +1115,18 @@ class BrowserManager:
     def previous_page(self) -> Optional[str]:
         """Przechodzi do poprzedniej strony (np. w wynikach wyszukiwania)."""
         try:
+            self._ensure_rendered()
             prev_button = self.page.query_selector('a[rel="prev"]') or self.page.query_selector('a:text("Poprzednia")')
             if prev_button:
-                prev_button.click()
-                self.page.wait_for_load_state("domcontentloaded")
-                self._update_history(self.page.url)
-                page_data = self._get_page_data(self.page.url)
-                text = page_data.get('content', {})
-                self.page_assistant.load_context(text)
-                self.page_data_cache.pop(self.current_url, None)
+                self.scraper.settle.run(prev_button.click)
+                if self.page.url == self.current_url:
+                    # Paginacja bez zmiany adresu (JS): tylko zmienione fragmenty strony
+                    self._reload_current_page_data()
+                else:
+                    self._update_history(self.page.url)
+                    page_data = self._get_page_data(self.page.url)
+                    text = page_data.get('content', {})
+                    self.page_assistant.load_context(text)
                 self.tts.speak("Przejście do poprzedniej strony.")
                 return self.page.url
             self.tts.speak("Brak przycisku poprzedniej strony.")
@@ -579,15 +1150,40 @@ class BrowserManager:
             raise BrowserError(str(e))
 
     def search_youtube(self, query: str) -> Optional[str]:
-        """Wyszukuje filmy na YouTube i zapisuje wyniki."""
+        """
+        Wyszukuje filmy na YouTube i odczytuje wyniki.
+
+        Wyniki są odczytywane jednym wywołaniem z danych startowych strony wyników (bez pełnego
+        scrapingu i osobnego zapytania API) i zapamiętywane per fraza.
+        """
         try:
-            search = Search(query)
-            self.youtube_results = search.results[:10]
+            start_time = time.time()
+            cached = self.youtube_cache.get(query)
+            if cached:
+                source = "cache"
+                self.youtube_results = cached["results"]
+                self._update_history(cached["url"])
+                # Wyniki są w pamięci, więc karta jest wczytywana dopiero, gdy komenda jej potrzebuje
+                self.pending_render = cached["url"]
+            else:
+                source = "page"
+                search_url = youtube_search_url(query)
+                # Dane startowe są osadzone w HTML, więc wystarcza wczytanie dokumentu
+                self._goto(search_url, wait_until="domcontentloaded")
+                self._update_history(search_url)
+                self.youtube_results = extract_youtube_results(self.page)
+                if self.youtube_results:
+                    self.youtube_cache.put(query, search_url, self.youtube_results)
             if not self.youtube_results:
                 self.tts.speak(f"Nie znaleziono filmów na temat: {query}")
                 return None
-            result_text = "\n".join([f"Film {i+1}: {video.title}" for i, video in enumerate(self.youtube_results)])
+            result_text = "\n".join([f"Film {video['index']}: {video['title']}" for video in self.youtube_results])
+            latency = time.time() - start_time
+            self.youtube_latency[source]["count"] += 1
+            self.youtube_latency[source]["total"] += latency
+            print(f"Wyniki YouTube ({source}) dla {query}: {len(self.youtube_results)} filmów, odczyt po {latency:.2f}s")
             self.tts.speak(f"Wyniki wyszukiwania na YouTube:\n{result_text}")
+            self.prefetch_targets([video["url"] for video in self.youtube_results], keep_pages=False)
             return query
         except Exception as e:
             logger.error(f"Błąd wyszukiwania na YouTube: {e}")
@@ -600,7 +1196,7 @@ class BrowserManager:
             if not self.youtube_results:
                 self.tts.speak("Najpierw wyszukaj filmy na YouTube.")
                 return None
-            result_text = "\n".join([f"Film {i+1}: {video.title}" for i, video in enumerate(self.youtube_results)])
+            result_text = "\n".join([f"Film {video['index']}: {video['title']}" for video in self.youtube_results])
             self.tts.speak(f"Wyniki wyszukiwania na YouTube:\n{result_text}")
             return result_text
         except Exception as e:
@@ -608,40 +1204,37 @@ class BrowserManager:
             self.tts.speak("Nie udało się odczytać wyników YouTube.")
             return None
 
-    def open_youtube_video(self, index: int) -> Optional[str]:
-        """Otwiera film z YouTube o podanym numerze."""
+    def open_youtube_video(self, index: int, autoplay: bool = False) -> Optional[str]:
+        """Otwiera film z YouTube o podanym numerze (opcjonalnie z automatycznym odtwarzaniem)."""
         try:
             if not self.youtube_results or index < 1 or index > len(self.youtube_results):
                 self.tts.speak("Nieprawidłowy numer filmu lub brak wyników wyszukiwania.")
                 return None
             video = self.youtube_results[index - 1]
-            self.open_page(video.watch_url)
-            self.tts.speak(f"Otworzono film: {video.title}")
-            return video.watch_url
+            url = video["url"] + ("&autoplay=1" if autoplay else "")
+            self.open_page(url)
+            self.tts.speak(f"Otworzono film: {video['title']}")
+            return url
         except Exception as e:
             logger.error(f"Błąd otwierania filmu YouTube: {e}")
             self.tts.speak("Nie udało się otworzyć filmu.")
             return None
-    
-    def summarize_page(self, wikipage) -> Optional[str]:
-        """Streszcza treść bieżącej strony."""
+
+    def summarize_page(self) -> Optional[str]:
+        """Streszcza treść bieżącej strony (dla artykułów Wikipedii używa ich streszczenia)."""
         try:
             if not self.current_url:
                 self.tts.speak("Najpierw otwórz stronę.")
                 return None
-            if "wikipedia.org" in self.current_url:
-                print(f"Streszczanie strony Wikipedia: {self.current_url}")
-                print(f"Sprawdzanie strony Wikipedia: {wikipage}")
-                if wikipage.exists():
-                    summary = wikipage.summary
-                    print(f"Streszczenie strony Wikipedia: {summary}")
-                    self.tts.speak(f"Streszczenie strony: {summary}")
-                    return summary
-                self.tts.speak("Nie znaleziono streszczenia strony.")
+            article = self.wikipedia.article_for_url(self.current_url)
+            if article and article.summary:
+                print(f"Streszczenie strony Wikipedia: {article.summary}")
+                self.tts.speak(f"Streszczenie strony: {article.summary}")
+                return article.summary
+            summary = self.page_assistant.summarize_page()
+            if summary and summary.get("cancelled"):
                 return None
-            else:
-                summary = self.page_assistant.summarize_page()
-            if summary:
+            if summary and summary.get("text"):
                 self.tts.speak(f"Streszczenie strony: {summary["text"]}")
                 return summary
             self.tts.speak("Nie udało się wygenerować streszczenia.")
@@ -651,42 +1244,145 @@ class BrowserManager:
             self.tts.speak("Nie udało się streścić strony.")
             return None
     
+    def _get_site_index(self) -> SiteIndex:
+        """Zwraca indeks witryn (współdzieli model osadzania z PageAssistant)."""
+        if self.site_index is None:
+            self.site_index = SiteIndex(self.page_assistant.embedder, self.site_index_path)
+        return self.site_index
+
+    def crawl_site(self, max_pages: int = 50, max_depth: int = 2) -> bool:
+        """Rozpoczyna indeksowanie bieżącej witryny w tle (linki w tej samej domenie)."""
+        if not self.current_url:
+            self.tts.speak("Najpierw otwórz stronę.")
+            return False
+        if self.crawler and self.crawler.is_running():
+            self.tts.speak("Indeksowanie witryny już trwa.")
+            return False
+        self.crawler = SiteCrawler(self._get_site_index(), max_pages=max_pages, max_depth=max_depth,
+                                   profiles=self.extraction_profiles)
+        self.crawler.start(self.current_url)
+        self.tts.speak(f"Rozpoczęto indeksowanie witryny {self.crawler.domain or self.current_url}.")
+        return True
+
+    def crawl_status(self) -> Optional[Dict]:
+        """Odczytuje postęp indeksowania i rozmiar indeksu bieżącej witryny."""
+        if not self.crawler or not self.crawler.stats:
+            self.tts.speak("Nie rozpoczęto indeksowania witryny.")
+            return None
+        stats = dict(self.crawler.stats)
+        stats["throughput"] = self.crawler.throughput()
+        stats["index"] = self._get_site_index().stats(self.crawler.domain)
+        state = "trwa" if self.crawler.is_running() else "zakończone"
+        self.tts.speak(
+            f"Indeksowanie {state}: {stats['pages']} stron, {stats['index']['chunks']} fragmentów w indeksie, "
+            f"{stats['throughput']:.1f} stron na sekundę."
+        )
+        return stats
+
+    def ask_site(self, question: str) -> Optional[Dict]:
+        """Odpowiada na pytanie o całą witrynę na podstawie indeksu zbudowanego przez crawl_site."""
+        try:
+            if not self.current_url:
+                self.tts.speak("Najpierw otwórz stronę.")
+                return None
+            domain = ExtractionProfiles.domain_of(self.current_url) or ""
+            passages = self._get_site_index().search(domain, question)
+            if not passages:
+                self.tts.speak("Witryna nie została jeszcze zaindeksowana. Powiedz: zaindeksuj witrynę.")
+                return None
+            answer = self.page_assistant.answer_site_question(question, passages)
+            if answer.get("cancelled"):
+                return None
+            if answer.get("text"):
+                self.tts.speak(f"Odpowiedź: {answer['text']}")
+                return answer
+            self.tts.speak("Nie udało się uzyskać odpowiedzi.")
+            return None
+        except Exception as e:
+            logger.error(f"Błąd pytania o witrynę: {e}")
+            self.tts.speak("Nie udało się uzyskać odpowiedzi.")
+            return None
+
+    def _ensure_page_context(self) -> bool:
+        """Ładuje kontekst asystenta z danych bieżącej strony, jeśli nie jest już załadowany."""
+        if self.current_article:
+            text = self.current_article.content
+        else:
+            text = self._get_page_data(self.current_url).get('content', {})
+        if not text:
+            self.tts.speak("Brak treści do analizy.")
+            return False
+        if self.page_assistant.loaded_content is not text:
+            # Kontekst jest budowany ponownie tylko po zmianie strony (osadzenia są kosztowne)
+            self.page_assistant.load_context(text)
+        return True
+
+    def _announce_answer(self, answer: Optional[Dict]) -> Optional[Dict]:
+        """Odczytuje odpowiedź modelu (przerwana generacja nie jest odczytywana)."""
+        if answer and answer.get("cancelled"):
+            return None
+        if answer:
+            self.tts.speak(f"Odpowiedź: {answer["text"]}")
+            return answer
+        self.tts.speak("Nie udało się uzyskać odpowiedzi.")
+        return None
+
     def _ask_model(self, question: str) -> Optional[str]:
         """Zadaje pytanie modelowi AI na podstawie treści strony."""
         try:
-            page_data = self._get_page_data(self.current_url)
-            text = page_data.get('content', {})
             print(f"Zadawanie pytania modelowi: {question}")
-            if not text:
-                self.tts.speak("Brak treści do analizy.")
+            if not self._ensure_page_context():
                 return None
-            self.page_assistant.load_context(text)
             answer = self.page_assistant.answer_question(question)
-            if answer:
-                self.tts.speak(f"Odpowiedź: {answer["text"]}")
-                return answer
-            self.tts.speak("Nie udało się uzyskać odpowiedzi.")
-            return None
+            return self._announce_answer(answer)
         except Exception as e:
             logger.error(f"Błąd zadawania pytania modelowi: {e}")
             self.tts.speak("Nie udało się uzyskać odpowiedzi.")
             return None
         
-    def describe_structure(self) -> Optional[str]:
-        """Opisuje strukturę bieżącej strony."""
+    def describe_structure(self) -> Optional[Dict]:
+        """
+        Opisuje strukturę bieżącej strony konspektem z nagłówków i regionów strony (reguły, bez modelu).
+
+        Returns:
+            Wynik {'text', 'time', 'vram_usage', 'error', 'source', 'complex', 'outline'} lub None.
+        """
         try:
             if not self.current_url:
                 self.tts.speak("Najpierw otwórz stronę.")
                 return None
             page_data = self._get_page_data(self.current_url)
-            headings = page_data.get('headings', [])
-            sections = page_data.get('sections', [])
-            if not headings or not sections:
+            description = describe_structure(page_data)
+            if description["error"]:
                 self.tts.speak("Brak danych o strukturze strony.")
                 return None
-            description = self.page_assistant.get_page_data.describe_structure(headings, sections)
-            if description:
-                self.tts.speak(f"Struktura strony: {description}")
+            self.last_structure = {"url": self.current_url, "headings": page_data.get('headings', []),
+                                   "sections": page_data.get('sections', []), "text": description["text"]}
+            self.tts.speak(f"Struktura strony: {description['text']}")
+            if description["complex"]:
+                self.tts.speak("Strona jest rozbudowana. Powiedz: opisz szczegółowo strukturę strony, "
+                               "aby model przygotował pełniejszy opis.")
+            return description
+        except Exception as e:
+            logger.error(f"Błąd opisu struktury strony: {e}")
+            self.tts.speak("Nie udało się opisać struktury strony.")
+            return None
+
+    def refine_structure(self) -> Optional[Dict]:
+        """
+        Dopracowuje modelem językowym ostatni opis struktury bieżącej strony (opcjonalnie, np. dla
+        rozbudowanych stron). Korzysta tylko z zapamiętanego konspektu, bez dostępu do karty.
+        """
+        try:
+            structure = self.last_structure
+            if not structure or structure["url"] != self.current_url:
+                self.tts.speak("Najpierw opisz strukturę strony.")
+                return None
+            description = self.page_assistant.describe_structure(structure, outline=structure["text"])
+            if description.get("cancelled"):
+                return None
+            if description["text"]:
+                self.tts.speak(f"Struktura strony: {description['text']}")
                 return description
             self.tts.speak("Nie udało się wygenerować opisu struktury.")
             return None
@@ -697,17 +1393,19 @@ class BrowserManager:
     
     def click_link(self, index: int) -> None:
         try:
-            links = self.page.query_selector_all('a')
+            self._ensure_rendered()
+            elements = self.scraper.elements
+            elements.refresh()
+            links = elements.items("link")
             if not links:
                 self.tts.speak("Nie znaleziono linków na stronie.")
                 return
-            if index < 1 or index > len(links):
-                self.tts.speak(f"Nieprawidłowy numer linku. Dostępne linki: od 1 do {len(links)}.")
+            link = elements.get("link", index)
+            if not link:
+                self.tts.speak(f"Nieprawidłowy numer linku. Dostępne linki: od {links[0]['number']} do {links[-1]['number']}.")
                 return
-            links[index-1].click()
-            self.page.wait_for_load_state('domcontentloaded')
-            self.current_url = self.page.url
-            self._update_history(self.current_url)
+            self.scraper.settle.run(lambda: elements.locator(link).click(timeout=5000))
+            self._update_history(self.page.url)
             page_data = self._get_page_data(self.current_url)
             text = page_data.get('content', {})
             self.page_assistant.load_context(text)
@@ -718,28 +1416,27 @@ class BrowserManager:
     
     def click_button(self, index: int) -> None:
         try:
-            buttons = self.page.query_selector_all('button, input[type="button"], [role="button"]')
+            self._ensure_rendered()
+            elements = self.scraper.elements
+            elements.refresh()
+            buttons = elements.items("button")
             if not buttons:
                 self.tts.speak("Nie znaleziono przycisków na stronie.")
                 return
-            if index < 1 or index > len(buttons):
-                self.tts.speak(f"Nieprawidłowy numer przycisku. Dostępne przyciski: od 1 do {len(buttons)}.")
+            button = elements.get("button", index)
+            if not button:
+                self.tts.speak(f"Nieprawidłowy numer przycisku. Dostępne przyciski: od {buttons[0]['number']} do {buttons[-1]['number']}.")
                 return
-            buttons[index-1].click()
-            import time
-            time.sleep(1)  # Czekanie na wykonanie akcji
+            self.scraper.settle.run(lambda: elements.locator(button).click(timeout=5000))
             new_url = self.page.url
             if new_url != self.current_url:
-                self.current_url = new_url
-                self._update_history(self.current_url)
+                self._update_history(new_url)
                 page_data = self._get_page_data(self.current_url)
                 text = page_data.get('content', {})
                 self.page_assistant.load_context(text)
                 self.tts.speak(f"Kliknięto przycisk {index}, przejście do nowej strony.")
             else:
-                page_data = self._get_page_data(self.current_url)
-                text = page_data.get('content', {})
-                self.page_assistant.load_context(text)
+                self._reload_current_page_data()
                 self.tts.speak(f"Kliknięto przycisk {index}.")
         except Exception as e:
             logger.error(f"Błąd klikania przycisku: {e}")
@@ -770,18 +1467,22 @@ class BrowserManager:
         except Exception as e:
             logger.error(f"Błąd wypełniania formularza: {e}")
             self.tts.speak("Nie udało się wypełnić formularza.")
+    def stop(self) -> None:
+        """Przerywa trwającą operację modelu i odczytywanie."""
+        self.page_assistant.cancel()
+        self.tts.stop()
+
     def close_tab(self) -> None:
         try:
             if self.page:
                 self.page.close()
-                pages = self.context.pages
+                pages = self._user_pages()
                 if pages:
-                    self.page = pages[0]  # Przełącz na pierwszą pozostałą kartę
-                    self.current_url = self.page.url
-                    self._update_history(self.current_url)
+                    self._activate_tab(pages[0])  # Przełącz na pierwszą pozostałą kartę
                 else:
                     self.page = None
                     self.current_url = None
+                    self.history, self.history_index = [], -1
                 self.tts.speak("Zamknięto kartę.")
         except Exception as e:
             logger.error(f"Błąd zamykania karty: {e}")
@@ -789,16 +1490,16 @@ class BrowserManager:
 
     def switch_tab(self, index: int) -> None:
         try:
-            pages = self.context.pages
+            pages = self._user_pages()
             if not pages:
                 self.tts.speak("Brak otwartych kart.")
                 return
             if index < 1 or index > len(pages):
                 self.tts.speak(f"Nieprawidłowy numer karty. Dostępne karty: od 1 do {len(pages)}.")
                 return
-            self.page = pages[index-1]
-            self.current_url = self.page.url
-            self._update_history(self.current_url)
+            if pages[index-1] is not self.page:
+                self._save_tab()
+                self._activate_tab(pages[index-1])
             self.tts.speak(f"Przełączono na kartę {index}.")
         except Exception as e:
             logger.error(f"Błąd przełączania karty: {e}")
@@ -809,7 +1510,7 @@ class BrowserManager:
             if not self.current_url:
                 self.tts.speak("Najpierw otwórz stronę.")
                 return
-            title = self.page.title()
+            title = self.current_article.title if self.pending_render else self.page.title()
             self.tts.speak(f"Aktualna strona: {title}, URL: {self.current_url}")
         except Exception as e:
             logger.error(f"Błąd powiadamiania o aktualnej stronie: {e}")
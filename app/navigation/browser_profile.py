@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Katalogi profilu Chromium z danymi, które można bezpiecznie usunąć (pamięć podręczna zasobów,
+# skompilowany kod, pamięć podręczna service workerów); ciasteczka i localStorage zostają
+CACHE_DIRS = (
+    os.path.join("Default", "Cache"),
+    os.path.join("Default", "Code Cache"),
+    os.path.join("Default", "GPUCache"),
+    os.path.join("Default", "Service Worker", "CacheStorage"),
+    os.path.join("Default", "Service Worker", "ScriptCache"),
+    "GrShaderCache",
+    "ShaderCache",
+)
+
+# Plik w katalogu profilu oznaczający, że profil był już używany (ciepły start)
+PROFILE_MARKER = ".webassist_profile"
+
+@dataclass
+class BrowserProfileConfig:
+    """Ustawienia profilu przeglądarki."""
+    user_data_dir: Optional[str] = "browser_profile"  # None = efemeryczny kontekst (bez trwałego profilu)
+    headless: bool = False
+    disk_cache_mb: int = 256           # Limit pamięci podręcznej HTTP Chromium (--disk-cache-size)
+    max_profile_mb: int = 1024         # Po przekroczeniu przy starcie usuwane są katalogi pamięci podręcznej
+    timings_path: Optional[str] = "browser_timings.json"
+
+class BrowserProfile:
+    """
+    Zarządzany katalog profilu przeglądarki (trwały kontekst Playwright) oraz pomiary startu.
+
+    Trwały profil zachowuje między uruchomieniami pamięć podręczną HTTP, ciasteczka (np. zgody
+    na cookies) i service workery, więc pierwsza wizyta na znanej stronie nie jest zimnym
+    ładowaniem. Czasy startu przeglądarki i pierwszej nawigacji są zapisywane osobno dla
+    profilu zimnego (nowy lub efemeryczny) i ciepłego, aby można je było porównać.
+    """
+
+    def __init__(self, config: Optional[BrowserProfileConfig] = None):
+        self.config = config or BrowserProfileConfig()
+        self.warm = self.is_persistent() and os.path.exists(self._marker_path())
+        self.timings = self._load_timings()
+
+    def is_persistent(self) -> bool:
+        return bool(self.config.user_data_dir)
+
+    @property
+    def kind(self) -> str:
+        """Rodzaj startu: 'warm' (profil używany wcześniej) lub 'cold'."""
+        return "warm" if self.warm else "cold"
+
+    def _marker_path(self) -> str:
+        return os.path.join(self.config.user_data_dir, PROFILE_MARKER)
+
+    def launch_args(self) -> List[str]:
+        """Zwraca argumenty Chromium z limitem pamięci podręcznej dysku."""
+        return [f"--disk-cache-size={self.config.disk_cache_mb * 1024 * 1024}"]
+
+    def prepare(self) -> Optional[str]:
+        """
+        Przygotowuje katalog profilu przed uruchomieniem (tworzy go i przycina pamięć podręczną,
+        jeśli profil przekracza limit rozmiaru).
+
+        Returns:
+            Ścieżka katalogu profilu lub None dla kontekstu efemerycznego.
+        """
+        if not self.is_persistent():
+            return None
+        path = self.config.user_data_dir
+        os.makedirs(path, exist_ok=True)
+        self.warm = os.path.exists(self._marker_path())
+        size_mb = self.size_bytes() / 1024 / 1024
+        if size_mb > self.config.max_profile_mb:
+            freed = self.clear_cache()
+            logger.info(f"Profil {path} ({size_mb:.0f} MB) przekroczył limit {self.config.max_profile_mb} MB; "
+                        f"usunięto pamięć podręczną ({freed / 1024 / 1024:.0f} MB).")
+        return path
+
+    def mark_used(self) -> None:
+        """Oznacza profil jako używany (kolejne uruchomienia będą ciepłe)."""
+        if not self.is_persistent():
+            return
+        try:
+            with open(self._marker_path(), "w", encoding="utf-8") as f:
+                f.write(str(time.time()))
+        except OSError as e:
+            logger.warning(f"Nie udało się oznaczyć profilu {self.config.user_data_dir}: {e}")
+
+    def size_bytes(self, path: Optional[str] = None) -> int:
+        """Zwraca rozmiar katalogu (domyślnie całego profilu) w bajtach."""
+        total = 0
+        for root, _, files in os.walk(path or self.config.user_data_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def clear_cache(self) -> int:
+        """Usuwa katalogi pamięci podręcznej profilu (przy zamkniętej przeglądarce); zwraca zwolnione bajty."""
+        freed = 0
+        for relative in CACHE_DIRS:
+            path = os.path.join(self.config.user_data_dir, relative)
+            if os.path.isdir(path):
+                freed += self.size_bytes(path)
+                shutil.rmtree(path, ignore_errors=True)
+        return freed
+
+    def _load_timings(self) -> Dict[str, Dict]:
+        """Wczytuje zapisane pomiary startu z pliku JSON."""
+        path = self.config.timings_path
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Nie udało się wczytać czasów startu z {path}: {e}")
+            return {}
+
+    def _save_timings(self) -> None:
+        """Zapisuje pomiary atomowo (plik tymczasowy + podmiana)."""
+        path = self.config.timings_path
+        if not path:
+            return
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.timings, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Nie udało się zapisać czasów startu do {path}: {e}")
+
+    def record(self, metric: str, seconds: float) -> None:
+        """
+        Zapisuje pomiar dla bieżącego rodzaju startu.
+
+        Args:
+            metric: 'startup' (uruchomienie przeglądarki) lub 'first_navigation' (pierwsza strona).
+            seconds: Zmierzony czas.
+        """
+        stats = self.timings.setdefault(self.kind, {}).setdefault(metric, {"count": 0, "total": 0.0, "last": 0.0})
+        stats["count"] += 1
+        stats["total"] += seconds
+        stats["last"] = seconds
+        self._save_timings()
+        print(f"Czas {metric} ({'ciepły' if self.warm else 'zimny'} profil): {seconds:.2f}s")
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Zwraca średnie czasy startu i pierwszej nawigacji (w sekundach) dla profilu zimnego i ciepłego."""
+        return {kind: {metric: round(stats["total"] / stats["count"], 3) for metric, stats in metrics.items()
+                       if stats["count"]}
+                for kind, metrics in self.timings.items()}
@@ -2,9 +2,6 @@ import json
 import logging
 import re
 from typing import Callable, Dict, Optional
-import wikipediaapi
-from pytube import Search
-from urllib.parse import quote_plus
 
 from ai.image_describer import ImageDescriber
 from voice.text_to_speech import TTSWrapper
@@ -22,7 +19,6 @@ class CommandParser:
         self.browser_manager = browser_manager
         self.command_queue = command_queue
         self.tts = TTSWrapper()
-        self.wiki = wikipediaapi.Wikipedia('WebAssistBot/1.0', 'pl')
         self.current_wiki_page = None
         self.command_patterns: Dict[str, Callable] = {
             # Otwieranie stron
@@ -37,7 +33,7 @@ class CommandParser:
 
             # Czytanie treści
             r"(?:przeczytaj|czytaj) nagłówki": self.browser_manager.read_headings,
-            r"(?:streść|podsumuj) stronę": lambda: self.browser_manager.summarize_page(wikipage=self.current_wiki_page),
+            r"(?:streść|podsumuj) stronę": self._summarize_page,
             r"(?:odśwież|przeładuj) stronę": self.browser_manager.refresh_page,
             r"(?:przeczytaj|czytaj) treść": self.browser_manager.read_content,
 
@@ -58,7 +54,7 @@ class CommandParser:
 
             # Sekcje i obrazy
             r"przejdź do sekcji\s+(.*)": lambda section: self.browser_manager.go_to_section(section),
-            r"(?:opisz|przeczytaj) obraz\s+(\d+)": lambda index: self.browser_manager.describe_image(int(index)),
+            r"(?:opisz|przeczytaj) obraz\s+(\d+)": self._describe_image,
 
             # Paginacja
             r"(?:przejdź|idź) do następnej strony": self.browser_manager.next_page,
@@ -69,10 +65,16 @@ class CommandParser:
             r"zamknij kartę": self.browser_manager.close_tab,
             r"przełącz na kartę\s+(\d+)": lambda index: self.browser_manager.switch_tab(int(index)),
 
+            # Indeks witryny (pytania o całą witrynę)
+            r"(?:zaindeksuj|przeszukaj) (?:witrynę|serwis|całą stronę)": self.browser_manager.crawl_site,
+            r"(?:stan|status) indeksowania": self.browser_manager.crawl_status,
+            r"(?:zapytaj|zadaj pytanie) (?:o witrynę|witrynę|serwis|całą witrynę)\s+(.*)": self.browser_manager.ask_site,
+
             # Model językowy
             r"(?:zapytaj|zadaj pytanie modelowi)\s+(.*)": self.browser_manager._ask_model,
 
             # Szukanie na stronie
+            r"(?:znajdź dalej|następne wystąpienie)": self.browser_manager.find_next,
             r"(?:znajdź|wyszukaj) na stronie\s+(.*)": lambda phrase: self._find_on_page(phrase),
 
             # Wyszukiwanie ogólne
@@ -97,12 +99,14 @@ class CommandParser:
 
             # Struktura
             r"(?:opisz|zobacz) strukturę strony": self.browser_manager.describe_structure,
+            r"(?:opisz|zobacz) szczegółowo strukturę strony": self.browser_manager.refine_structure,
+
+            # Przerwanie trwającej operacji (np. streszczania) i odczytywania
+            r"(?:stop|przerwij|zatrzymaj|cisza)$": self.browser_manager.stop,
 
             # Zamknięcie
             r"(?:zamknij|wyłącz) przeglądarkę": self.browser_manager.close_browser,
         }
-        
-        self.youtube_results = []
 
     def parse_command(self, command: str) -> None:
         """Parsuje komendę i dodaje ją do kolejki."""
@@ -119,19 +123,28 @@ class CommandParser:
         raise CommandError(f"Nieznana komenda: {command}")
 
 
+    def _summarize_page(self) -> Optional[str]:
+        """Streszcza bieżącą stronę (dla Wikipedii używa streszczenia artykułu)."""
+        return self.browser_manager.summarize_page()
+
+    def _describe_image(self, index: str) -> Optional[str]:
+        """Opisuje obraz o podanym numerze."""
+        return self.browser_manager.describe_image(int(index))
+
     def _search_wikipedia(self, query: str) -> Optional[str]:
         """Wyszukuje artykuł na Wikipedii i odczytuje jego streszczenie."""
         try:
             query = query.title().replace(".", "") 
             print(f"Wyszukuję na Wikipedii: {query}")
             self.tts.speak(f"Wyszukuję na Wikipedii: {query}")
-            self.current_wiki_page = self.wiki.page(query)
-            if not self.current_wiki_page.exists():
+            self.current_wiki_page = self.browser_manager.wikipedia.article(query)
+            if not self.current_wiki_page:
                 self.tts.speak(f"Nie znaleziono artykułu na temat: {query}")
                 return None
             summary = self.current_wiki_page.summary[:300] + ("..." if len(self.current_wiki_page.summary) > 300 else "")
             self.tts.speak(f"Krótkie streszczenie artykułu z Wikipedii: {summary}")
-            self.browser_manager.open_page(self.current_wiki_page.fullurl, isSpeak=False, isWikipedia=True, wikipediaText=self.current_wiki_page.text)
+            # Wystarcza tekst artykułu; karta wczyta stronę dopiero, gdy będzie potrzebna
+            self.browser_manager.open_wikipedia_article(self.current_wiki_page)
             return summary
         except Exception as e:
             logger.error(f"Błąd wyszukiwania na Wikipedii: {e}")
@@ -146,7 +159,7 @@ class CommandParser:
                 return None
             
             
-            sections = list(self.current_wiki_page.sections)
+            sections = [s["title"] for s in self.current_wiki_page.sections]
             print(f"Znaleziono {len(sections)} sekcji w artykule.")
             if not sections:
                 self.tts.speak("Artykuł nie zawiera sekcji.")
@@ -166,11 +179,11 @@ class CommandParser:
                 self.tts.speak("Najpierw wyszukaj artykuł na Wikipedii.")
                 return None
             print(f"Szukam sekcji: {section_name.title()}")
-            section = self.current_wiki_page.section_by_title(section_name.title())
+            section = self.current_wiki_page.section(section_name)
             if not section:
                 self.tts.speak(f"Nie znaleziono sekcji: {section_name}")
                 return None
-            text = section.text[:500] + ("..." if len(section.text) > 500 else "")
+            text = section["text"][:500] + ("..." if len(section["text"]) > 500 else "")
             print(f"Odczytano sekcję: {section_name}")
             print(f"Treść sekcji: {text}")
             self.tts.speak(f"Sekcja {section_name}: {text}")
@@ -181,84 +194,22 @@ class CommandParser:
             return None
 
     def _search_youtube(self, query: str) -> Optional[str]:
-        """Wyszukuje filmy na YouTube, otwiera stronę wyników i zapisuje wyniki."""
-        try:
-            # Otwórz stronę wyników wyszukiwania YouTube
-            encoded_query = quote_plus(query)
-            print(f"Wyszukuję filmy na YouTube: {encoded_query}")
-            self.tts.speak(f"Wyszukuję filmy na YouTube: {query}")
-            youtube_search_url = f"https://www.youtube.com/results?search_query={encoded_query}"
-            self.browser_manager.open_page(youtube_search_url, isSpeak=False)
-            
-            # Pobierz wyniki za pomocą pytube
-            search = Search(query)
-            self.youtube_results = search.results[:10]  # Ogranicz do 10 wyników
-            if not self.youtube_results:
-                self.tts.speak(f"Nie znaleziono filmów na temat: {query}")
-                return None
-            
-            # Odczytaj wyniki
-            self._read_youtube_results()
-            return query
-        except Exception as e:
-            logger.error(f"Błąd wyszukiwania na YouTube: {e}")
-            self.tts.speak("Nie udało się wyszukać filmów na YouTube.")
-            return None
+        """Wyszukuje filmy na YouTube (wyniki są wspólne z BrowserManager)."""
+        print(f"Wyszukuję filmy na YouTube: {query}")
+        self.tts.speak(f"Wyszukuję filmy na YouTube: {query}")
+        return self.browser_manager.search_youtube(query)
 
     def _read_youtube_results(self) -> Optional[str]:
         """Odczytuje wyniki wyszukiwania filmów na YouTube."""
-        try:
-            if not self.youtube_results:
-                self.tts.speak("Najpierw wyszukaj filmy na YouTube.")
-                return None
-            result_text = "\n".join([f"Film {i+1}: {video.title}" for i, video in enumerate(self.youtube_results)])
-            self.tts.speak(f"Wyniki wyszukiwania na YouTube:\n{result_text}")
-            return result_text
-        except Exception as e:
-            logger.error(f"Błąd odczytu wyników YouTube: {e}")
-            self.tts.speak("Nie udało się odczytać wyników YouTube.")
-            return None
+        return self.browser_manager.read_youtube_results()
 
     def _open_youtube_video(self, index: int) -> Optional[str]:
         """Otwiera film z YouTube o podanym numerze i próbuje go odtworzyć automatycznie."""
-        try:
-            if not self.youtube_results or index < 1 or index > len(self.youtube_results):
-                self.tts.speak("Nieprawidłowy numer filmu lub brak wyników wyszukiwania.")
-                return None
-            video = self.youtube_results[index - 1]
-            
-            # Dodanie autoplay
-            import urllib.parse
-            parsed_url = urllib.parse.urlparse(video.watch_url)
-            if parsed_url.query:
-                autoplay_url = video.watch_url + "&autoplay=1"
-            else:
-                autoplay_url = video.watch_url + "?autoplay=1"
-
-            self.browser_manager.open_page(autoplay_url)
-            self.tts.speak(f"Otworzono film: {video.title}")
-            return autoplay_url
-        except Exception as e:
-            logger.error(f"Błąd otwierania filmu YouTube: {e}")
-            self.tts.speak("Nie udało się otworzyć filmu.")
-            return None
+        return self.browser_manager.open_youtube_video(index, autoplay=True)
 
 
     def _find_on_page(self, phrase: str) -> Optional[str]:
-        """Wyszukuje frazę na stronie."""
-        try:
-            page_data = self.browser_manager._get_page_data(self.browser_manager.current_url)
-            text = page_data.get('content', {}).get('text', '')
-            if not text:
-                self.tts.speak("Brak treści do przeszukania.")
-                return None
-            if phrase.lower() in text.lower():
-                self.tts.speak(f"Znaleziono frazę: {phrase}")
-                return phrase
-            self.tts.speak(f"Nie znaleziono frazy: {phrase}")
-            return None
-        except Exception as e:
-            logger.error(f"Błąd wyszukiwania frazy: {e}")
-            self.tts.speak("Nie udało się wyszukać frazy.")
-            return None
+        """Wyszukuje frazę na stronie (indeks strony w BrowserManager)."""
+        result = self.browser_manager.find_on_page(phrase)
+        return phrase if result else None
         
@@ -0,0 +1,252 @@
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from playwright.sync_api import Page
+
+from ai.page_assistant import PageAssistant
+from web.scraper import WebScraper
+from utils.url_utils import canonicalize_url, validate_url
+
+logger = logging.getLogger(__name__)
+
+class Prefetcher:
+    """
+    Spekulatywnie pobiera, scrapuje i osadza strony zapowiedziane użytkownikowi (wyniki wyszukiwania,
+    linki, filmy), korzystając z zapasowych kart przeglądarki w czasie odczytywania wyników.
+
+    Praca jest dzielona na krótkie kroki (step) wykonywane przez pętlę główną w wolnym czasie,
+    ponieważ synchroniczne API Playwright działa tylko w wątku głównym. Nawigacje w kilku kartach
+    startują z wait_until="commit", więc przeglądarka ładuje je równolegle.
+    """
+
+    def __init__(self, page_factory: Callable[[], Page], page_assistant: PageAssistant,
+                 max_targets: int = 3, max_pages: int = 2, byte_budget: int = 15 * 1024 * 1024,
+                 max_ready: int = 6, timeout: int = 10000,
+                 scraper_factory: Optional[Callable[[Page], WebScraper]] = None):
+        """
+        Args:
+            page_factory: Funkcja tworząca nową kartę w kontekście przeglądarki.
+            page_assistant: Asystent używany do wstępnego budowania osadzeń.
+            max_targets: Liczba pierwszych zapowiedzianych celów pobieranych z wyprzedzeniem.
+            max_pages: Liczba zapasowych kart (równoległych pobrań).
+            byte_budget: Limit bajtów pobranych na jedną zapowiedź celów.
+            max_ready: Maksymalna liczba przechowywanych gotowych stron.
+            timeout: Limit czasu ładowania strony w ms.
+            scraper_factory: Funkcja tworząca scraper dla karty (domyślnie WebScraper bez limitów).
+        """
+        self.page_factory = page_factory
+        self.page_assistant = page_assistant
+        self.max_targets = max_targets
+        self.max_pages = max_pages
+        self.byte_budget = byte_budget
+        self.max_ready = max_ready
+        self.timeout = timeout
+        self.scraper_factory = scraper_factory or WebScraper
+        self.pages: List[Page] = []
+        self.scrapers: Dict[int, WebScraper] = {}
+        self.busy: Dict[int, Dict] = {}
+        self.pending: Deque[str] = deque()
+        self.keep_pages = True
+        self.ready: "OrderedDict[str, Dict]" = OrderedDict()
+        self.announced: set = set()
+        self.bytes_used = 0
+        self.stats = {"announced": 0, "prefetched": 0, "failed": 0, "hits": 0, "misses": 0,
+                      "budget_skips": 0, "bytes": 0}
+
+    @staticmethod
+    def _key(url: str) -> str:
+        """Klucz celu: kanoniczny URL bez parametru autoplay (dodawanego przy otwieraniu filmów)."""
+        return canonicalize_url(re.sub(r"[?&]autoplay=1\b", "", url))
+
+    def owns(self, page: Page) -> bool:
+        """Sprawdza, czy karta jest zapasową kartą prefetchera."""
+        return any(page is p for p in self.pages)
+
+    def announce(self, urls: List[str], keep_pages: bool = True) -> None:
+        """
+        Zapowiada cele, które użytkownik prawdopodobnie otworzy; pobierane są pierwsze max_targets.
+
+        Args:
+            urls: URL-e w kolejności prezentowania użytkownikowi.
+            keep_pages: Czy zachować wyrenderowaną kartę do podmiany przy otwarciu
+                (False np. dla filmów, które nie powinny odtwarzać się w tle).
+        """
+        self.pending.clear()
+        self.keep_pages = keep_pages
+        self.bytes_used = 0
+        self.announced = set()
+        inflight = {task["key"] for task in self.busy.values()}
+        for url in urls:
+            if not url or not validate_url(url):
+                continue
+            if len(self.announced) >= self.max_targets:
+                break
+            key = self._key(url)
+            self.announced.add(key)
+            if key not in self.ready and key not in inflight and url not in self.pending:
+                self.pending.append(url)
+        self.stats["announced"] += len(self.announced)
+        logger.info(f"Zapowiedziano {len(self.pending)} celów do pobrania z wyprzedzeniem")
+
+    def has_work(self) -> bool:
+        """Czy pozostały cele do pobrania lub trwające pobrania."""
+        return bool(self.pending or self.busy)
+
+    def _on_request_finished(self, request) -> None:
+        """
+        Zlicza bajty pobrane przez zapasowe karty (budżet przepustowości): rzeczywisty rozmiar
+        przesłanej odpowiedzi, także bez nagłówka content-length (odpowiedzi chunked i kompresowane).
+        """
+        try:
+            sizes = request.sizes()
+            length = max(0, sizes["responseBodySize"]) + max(0, sizes["responseHeadersSize"])
+        except Exception:
+            # Rozmiary niedostępne (np. karta zamknięta w trakcie): nagłówek odpowiedzi, jeśli jest
+            try:
+                response = request.response()
+                length = int(response.headers.get("content-length", 0)) if response else 0
+            except Exception:
+                length = 0
+        self.bytes_used += length
+        self.stats["bytes"] += length
+
+    def _free_page(self) -> Optional[Page]:
+        """Zwraca wolną zapasową kartę, tworząc nową lub odbierając ją najstarszej gotowej stronie."""
+        for page in self.pages:
+            if id(page) not in self.busy and not any(e.get("page") is page for e in self.ready.values()):
+                return page
+        if len(self.pages) < self.max_pages:
+            page = self.page_factory()
+            page.on("requestfinished", self._on_request_finished)
+            self.pages.append(page)
+            self.scrapers[id(page)] = self.scraper_factory(page)
+            return page
+        for entry in self.ready.values():
+            page = entry.get("page")
+            if page is not None and id(page) not in self.busy:
+                entry["page"] = None
+                entry["scraper"] = None
+                return page
+        return None
+
+    def step(self) -> bool:
+        """
+        Wykonuje jeden krok pracy: rozpoczyna nowe pobranie albo kończy najstarsze trwające.
+
+        Returns:
+            True, jeśli pozostała dalsza praca.
+        """
+        if self.pending:
+            if self.bytes_used >= self.byte_budget:
+                self.stats["budget_skips"] += len(self.pending)
+                logger.info(f"Przekroczono budżet prefetchu ({self.bytes_used} B), pominięto {len(self.pending)} celów")
+                self.pending.clear()
+            else:
+                page = self._free_page()
+                if page is not None:
+                    url = self.pending.popleft()
+                    self._start(page, url)
+                    return self.has_work()
+        if self.busy:
+            page_id = next(iter(self.busy))
+            self._finish(page_id)
+        return self.has_work()
+
+    def _start(self, page: Page, url: str) -> None:
+        """Rozpoczyna nawigację zapasowej karty bez czekania na załadowanie strony."""
+        try:
+            page.goto(url, wait_until="commit", timeout=self.timeout)
+            self.busy[id(page)] = {"page": page, "url": url, "key": self._key(url), "started": time.time()}
+            print(f"Prefetch: rozpoczęto pobieranie {url}")
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Prefetch: nie udało się rozpocząć pobierania {url}: {e}")
+
+    def _finish(self, page_id: int) -> None:
+        """Czeka na załadowanie strony, scrapuje ją i buduje osadzenia."""
+        task = self.busy.pop(page_id)
+        page = task["page"]
+        try:
+            page.wait_for_load_state("domcontentloaded", timeout=self.timeout)
+            page_data = self.scrapers[page_id].scrape_page()
+            if not page_data:
+                raise ValueError("brak danych strony")
+            prepared = self.page_assistant.prepare_context(page_data.get('content', {}))
+            keep = self.keep_pages
+            if not keep:
+                page.goto("about:blank")
+            self.ready[task["key"]] = {
+                "url": task["url"],
+                "page_data": page_data,
+                "prepared": prepared,
+                "page": page if keep else None,
+                "scraper": self.scrapers[page_id] if keep else None,
+                "created": time.time()
+            }
+            self.ready.move_to_end(task["key"])
+            while len(self.ready) > self.max_ready:
+                self.ready.popitem(last=False)
+            self.stats["prefetched"] += 1
+            print(f"Prefetch: gotowe {task['url']} w {time.time() - task['started']:.2f}s")
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Prefetch: błąd pobierania {task['url']}: {e}")
+
+    def take(self, url: str) -> Optional[Dict]:
+        """
+        Zwraca pobrany z wyprzedzeniem stan strony (dane, kontekst i opcjonalnie kartę) lub None.
+
+        Trafienia i chybienia (dla zapowiedzianych celów) są zliczane w stats.
+        """
+        key = self._key(url)
+        entry = self.ready.pop(key, None)
+        if entry:
+            self.stats["hits"] += 1
+            if entry.get("page") is not None:
+                self.release(entry["page"])
+        elif key in self.announced:
+            self.stats["misses"] += 1
+            self.pending = deque(u for u in self.pending if self._key(u) != key)
+        print(f"Prefetch {'trafienie' if entry else 'chybienie'}: {url} (skuteczność: {self.hit_rate():.0%})")
+        return entry
+
+    def adopt(self, page: Page, scraper: WebScraper) -> None:
+        """Przejmuje kartę zwolnioną po podmianie na kartę pobraną z wyprzedzeniem."""
+        try:
+            page.goto("about:blank")
+        except Exception as e:
+            logger.warning(f"Prefetch: błąd czyszczenia przejętej karty: {e}")
+        page.on("requestfinished", self._on_request_finished)
+        self.pages.append(page)
+        self.scrapers[id(page)] = scraper
+
+    def release(self, page: Page) -> None:
+        """Usuwa kartę z puli prefetchera (np. po podmianie na kartę główną)."""
+        self.pages = [p for p in self.pages if p is not page]
+        self.scrapers.pop(id(page), None)
+        try:
+            page.remove_listener("requestfinished", self._on_request_finished)
+        except Exception:
+            pass
+
+    def hit_rate(self) -> float:
+        """Zwraca skuteczność prefetchu (trafienia / otwarte zapowiedziane cele)."""
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def close(self) -> None:
+        """Zamyka zapasowe karty i czyści stan."""
+        for page in self.pages:
+            try:
+                page.close()
+            except Exception:
+                pass
+        self.pages.clear()
+        self.scrapers.clear()
+        self.busy.clear()
+        self.pending.clear()
+        self.ready.clear()
+        logger.info(f"Statystyki prefetchu: {self.stats}, skuteczność: {self.hit_rate():.0%}")
@@ -0,0 +1,96 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from playwright.sync_api import Page
+
+from navigation.bfcache import estimate_size
+from web.scraper import WebScraper
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TabSession:
+    """Stan nieaktywnej karty: karta, jej scraper, historia, dane bieżącej strony i kontekst asystenta."""
+    page: Page
+    scraper: WebScraper
+    history: List[str] = field(default_factory=list)
+    history_index: int = -1
+    current_url: Optional[str] = None
+    page_data: Optional[Dict] = None
+    state: Optional[Dict] = None
+    last_used: float = field(default_factory=time.time)
+    size: int = 0
+
+class TabSessionManager:
+    """
+    Przechowuje sesje nieaktywnych kart, aby przełączenie karty przywracało jej scraper, historię,
+    dane strony i kontekst PageAssistant bez ponownego scrapingu i osadzania.
+
+    Sesja aktywnej karty żyje w BrowserManager; tutaj trafia przy przełączeniu na inną kartę.
+    Po przekroczeniu wspólnego budżetu pamięci najdawniej używane karty tracą dane strony
+    i kontekst (zachowują kartę i historię; kontekst zostanie odbudowany przy powrocie).
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, keep_llm_state: bool = False):
+        """
+        Args:
+            max_bytes: Budżet pamięci na dane i kontekst wszystkich nieaktywnych kart (szacowany).
+            keep_llm_state: Czy przechowywać stan LLM karty (cache KV ostatniego promptu).
+        """
+        self.max_bytes = max_bytes
+        self.keep_llm_state = keep_llm_state
+        self.sessions: Dict[int, TabSession] = {}
+        self.stats = {"saved": 0, "restored": 0, "evicted": 0}
+
+    @property
+    def bytes_used(self) -> int:
+        return sum(session.size for session in self.sessions.values())
+
+    def save(self, session: TabSession) -> None:
+        """Zapisuje sesję karty opuszczanej przy przełączeniu."""
+        self._prune_closed()
+        if session.state and not self.keep_llm_state:
+            session.state = {k: v for k, v in session.state.items() if k != "llm_state"}
+        session.last_used = time.time()
+        session.size = estimate_size(session.page_data) + estimate_size(session.state)
+        self.sessions[id(session.page)] = session
+        self.stats["saved"] += 1
+        self._enforce_budget()
+
+    def take(self, page: Page) -> Optional[TabSession]:
+        """Zwraca i usuwa sesję karty, która staje się aktywna (None, jeśli karta nie ma sesji)."""
+        session = self.sessions.pop(id(page), None)
+        if session is not None and session.page is not page:
+            # Identyfikator obiektu zamkniętej karty mógł zostać użyty ponownie
+            session = None
+        if session is not None:
+            self.stats["restored"] += 1
+        return session
+
+    def _prune_closed(self) -> None:
+        """Usuwa sesje kart zamkniętych poza asystentem (np. przez stronę)."""
+        for key, session in list(self.sessions.items()):
+            try:
+                closed = session.page.is_closed()
+            except Exception:
+                closed = True
+            if closed:
+                del self.sessions[key]
+
+    def _enforce_budget(self) -> None:
+        """Zwalnia dane i kontekst najdawniej używanych kart po przekroczeniu budżetu pamięci."""
+        for session in sorted(self.sessions.values(), key=lambda s: s.last_used):
+            if self.bytes_used <= self.max_bytes:
+                return
+            if session.size:
+                logger.info(f"Zwolniono kontekst karty {session.current_url} ({session.size / 1024 / 1024:.1f} MB)")
+                session.page_data = None
+                session.state = None
+                session.size = 0
+                self.stats["evicted"] += 1
+
+    def clear(self) -> None:
+        """Usuwa wszystkie sesje."""
+        self.sessions.clear()
@@ -1,10 +1,40 @@
+import json
+import logging
+import os
 import re
-from typing import Optional
-from urllib.parse import urljoin, urlparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
 
 import requests
 
+logger = logging.getLogger(__name__)
+
 POPULAR_SUFFIXES = [".com", ".pl", ".org", ".net", ".info", ".edu", ".gov", ".io", ".co"]
+TRACKING_PARAM_PREFIXES = ("utm_", "fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "_hsenc", "_hsmi")
+
+# Znane serwisy (nazwa wypowiadana bez końcówki -> domena), rozpoznawane bez zapytań sieciowych
+KNOWN_DOMAINS = {
+    "onet": "onet.pl", "wp": "wp.pl", "interia": "interia.pl", "gazeta": "gazeta.pl", "wyborcza": "wyborcza.pl",
+    "tvn24": "tvn24.pl", "tvp": "tvp.pl", "polsatnews": "polsatnews.pl", "rp": "rp.pl", "money": "money.pl",
+    "bankier": "bankier.pl", "pudelek": "pudelek.pl", "wykop": "wykop.pl", "allegro": "allegro.pl",
+    "olx": "olx.pl", "ceneo": "ceneo.pl", "empik": "empik.com", "mediaexpert": "mediaexpert.pl",
+    "xkom": "x-kom.pl", "morele": "morele.net", "otodom": "otodom.pl", "otomoto": "otomoto.pl",
+    "pracuj": "pracuj.pl", "filmweb": "filmweb.pl", "mbank": "mbank.pl", "pkobp": "pkobp.pl",
+    "gov": "gov.pl", "pkp": "pkp.pl", "intercity": "intercity.pl", "jakdojade": "jakdojade.pl",
+    "google": "google.com", "youtube": "youtube.com", "wikipedia": "wikipedia.org", "facebook": "facebook.com",
+    "instagram": "instagram.com", "twitter": "twitter.com", "linkedin": "linkedin.com", "reddit": "reddit.com",
+    "github": "github.com", "stackoverflow": "stackoverflow.com", "amazon": "amazon.com", "netflix": "netflix.com",
+    "bbc": "bbc.com", "cnn": "cnn.com", "spotify": "spotify.com", "duckduckgo": "duckduckgo.com", "bing": "bing.com"
+}
+
+DOMAIN_CACHE_PATH = "domain_cache.json"
+DOMAIN_CACHE_TTL = 30 * 24 * 3600        # Czas ważności rozpoznanej domeny
+DOMAIN_NEGATIVE_TTL = 24 * 3600          # Czas ważności nieudanego rozpoznania
+_domain_cache: Optional[Dict[str, Dict]] = None
+_domain_cache_lock = threading.Lock()
 
 def clean_text(text: str) -> str:
     """Oczyszcza tekst, usuwając nadmiarowe spacje i znaki specjalne."""
@@ -14,7 +44,12 @@ def clean_text(text: str) -> str:
     return text
 
 def normalize_url(url: str, base_url: Optional[str] = None) -> str:
-    """Normalizuje URL, rozwiązując linki relatywne."""
+    """
+    Normalizuje URL, rozwiązując linki relatywne.
+
+    Końcówka domeny (np. "onet" -> onet.pl) jest uzupełniana tylko dla adresów podanych przez
+    użytkownika (bez base_url); linki ze stron są jedynie rozwiązywane względem base_url.
+    """
   
     if not url:
         return ""
@@ -25,6 +60,8 @@ def normalize_url(url: str, base_url: Optional[str] = None) -> str:
     if not url.startswith(('http://', 'https://')):
         url = "http://" + url
     
+    if base_url:
+        return url
     print(f"Normalizuję URL: {url}")
     parsed = urlparse(url)
 
@@ -44,18 +81,98 @@ def has_valid_suffix(netloc: str) -> bool:
     return len(suffix) > 0
 
 
-def try_possible_suffixes(domain: str) -> Optional[str]:
-    """Próbuje znaleźć poprawną domenę spośród popularnych końcówek."""
-    for suffix in POPULAR_SUFFIXES:
-        test_url = f"http://{domain.rstrip('.')}{suffix}"
-        try:
-            response = requests.head(test_url, timeout=2)
-            if response.status_code < 400:
-                return test_url
-        except requests.RequestException:
-            continue
+def _load_domain_cache() -> Dict[str, Dict]:
+    """Wczytuje trwały cache rozpoznanych domen (wywoływać pod blokadą)."""
+    global _domain_cache
+    if _domain_cache is None:
+        _domain_cache = {}
+        if DOMAIN_CACHE_PATH and os.path.exists(DOMAIN_CACHE_PATH):
+            try:
+                with open(DOMAIN_CACHE_PATH, "r", encoding="utf-8") as f:
+                    _domain_cache = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Nie udało się wczytać cache'a domen: {e}")
+    return _domain_cache
+
+def _save_domain_cache() -> None:
+    """Zapisuje cache domen atomowo (wywoływać pod blokadą)."""
+    if not DOMAIN_CACHE_PATH:
+        return
+    tmp_path = DOMAIN_CACHE_PATH + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_domain_cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, DOMAIN_CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"Nie udało się zapisać cache'a domen: {e}")
+
+def _probe_url(test_url: str) -> Optional[str]:
+    """Sprawdza, czy adres odpowiada (zapytanie HEAD)."""
+    try:
+        response = requests.head(test_url, timeout=2)
+        if response.status_code < 400:
+            return test_url
+    except requests.RequestException:
+        pass
     return None
 
+def try_possible_suffixes(domain: str) -> Optional[str]:
+    """
+    Próbuje znaleźć poprawną domenę spośród popularnych końcówek.
+
+    Kolejność: lista znanych serwisów, trwały cache (pozytywny i negatywny), a na końcu
+    równoległe zapytania do wszystkich końcówek, kończone przy pierwszej odpowiadającej domenie.
+    """
+    name = domain.rstrip('.').lower()
+    known = KNOWN_DOMAINS.get(name.replace(" ", "").replace("-", ""))
+    if known:
+        return f"https://{known}"
+
+    with _domain_cache_lock:
+        entry = _load_domain_cache().get(name)
+    if entry:
+        ttl = DOMAIN_CACHE_TTL if entry.get("url") else DOMAIN_NEGATIVE_TTL
+        if time.time() - entry.get("checked", 0) <= ttl:
+            print(f"Użyto cache'a domen dla {name}: {entry.get('url') or 'brak domeny'}")
+            return entry.get("url")
+
+    start_time = time.time()
+    found = None
+    executor = ThreadPoolExecutor(max_workers=len(POPULAR_SUFFIXES))
+    try:
+        futures = [executor.submit(_probe_url, f"http://{name}{suffix}") for suffix in POPULAR_SUFFIXES]
+        for future in as_completed(futures):
+            found = future.result()
+            if found:
+                break
+    finally:
+        # Nie czekaj na pozostałe zapytania po pierwszym trafieniu
+        executor.shutdown(wait=False, cancel_futures=True)
+    print(f"Rozpoznano domenę {name} -> {found or 'brak'} w {time.time() - start_time:.2f}s")
+
+    with _domain_cache_lock:
+        _load_domain_cache()[name] = {"url": found, "checked": time.time()}
+        _save_domain_cache()
+    return found
+
+def canonicalize_url(url: str) -> str:
+    """Zwraca kanoniczną postać URL używaną jako klucz cache (bez fragmentu, parametrów śledzących i 'www.')."""
+    if not url:
+        return ""
+    parsed = urlparse(url)
+    scheme = "https" if parsed.scheme in ("http", "https") else parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    if netloc.endswith((":80", ":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunparse((scheme, netloc, path, "", query, ""))
+
 def validate_url(url: str) -> bool:
     """Sprawdza, czy URL jest prawidłowy."""
     try:
@@ -20,6 +20,7 @@ class VoiceListener:
         self.wake_detector = WakeWordDetector(self.recognizer)
         self.is_listening = False
         self.is_wake_up = False 
+        self.command_heard = False     # Czy po ostatniej aktywacji padła komenda (pomiar fałszywych aktywacji)
         self.stop_event = threading.Event()
         self.sample_rate = 16000
         self.silence_threshold = 0.01  # Dostosuj w zależności od środowiska
@@ -49,6 +50,7 @@ class VoiceListener:
                 elif self.wake_detector.check_for_wake_word():
                     print("Wykryto słowo aktywujące!")
                     self.is_wake_up = True
+                    self.command_heard = False
                     self._play_notification_sound(frequency=440, duration=0.6)
                 
                 
@@ -66,6 +68,9 @@ class VoiceListener:
             
             if audio_data is None or audio_data.size == 0:
                 print("Nie nagrano żadnej komendy.")
+                if not self.command_heard:
+                    self.wake_detector.report_false_accept()
+                    self.command_heard = True
                 self._play_notification_sound(frequency=600, duration=0.3)
                 return
             
@@ -74,6 +79,7 @@ class VoiceListener:
             
             # Transkrypcja mowy na tekst
             command = self.recognizer.transcribe(wav_data)
+            self.command_heard = True
             if command:
                 if command.lower().strip() == "stop":
                     print("Otrzymano komendę stop.")
@@ -198,4 +204,8 @@ class VoiceListener:
         """Zatrzymanie systemu"""
         self.stop_event.set()
         self.is_listening = False
-        self.is_wake_up = False
\ No newline at end of file
+        self.is_wake_up = False
+        stats = self.wake_detector.get_stats()
+        print(f"Nasłuch słowa aktywującego: {stats['listened_s']:.0f} s, wykrycia: {stats['detections']}, "
+              f"fałszywe aktywacje: {stats['false_accepts_per_hour']:.2f}/h, "
+              f"opóźnienie: {stats['latency_ms']:.0f} ms, CPU: {stats['cpu_percent']:.1f}%")
\ No newline at end of file
@@ -1,24 +1,59 @@
-import io
+import json
 import logging
+import queue
 import re
-import wave
-import numpy as np
+import time
 import sounddevice as sd
-import speech_recognition as sr
-from typing import Optional
-
-from voice.speech_recognition import SpeechRecognizer
+import vosk
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 class WakeWordDetector:
-    def __init__(self, recognizer, wake_word: str = "komputer", sample_rate: int = 16000):
+    """
+    Ciągłe wykrywanie słowa aktywującego: jeden otwarty strumień mikrofonu i rozpoznawanie Vosk
+    ograniczone do gramatyki słowa aktywującego, sprawdzane na wynikach częściowych.
+
+    Nasłuch w spoczynku nie używa pełnego rozpoznawania mowy (ani Whispera) i nie ma przerw
+    na kalibrację szumu między nagraniami.
+    """
+
+    def __init__(self, recognizer, wake_word: str = "komputer", sample_rate: int = 16000,
+                 block_duration: float = 0.1, vosk_model_path: Optional[str] = None,
+                 use_partials: bool = True, min_confidence: float = 0.7):
+        """
+        Args:
+            recognizer: SpeechRecognizer, którego model Vosk jest współdzielony (bez ponownego ładowania).
+            wake_word: Słowo aktywujące (musi występować w słowniku modelu Vosk).
+            sample_rate: Częstotliwość próbkowania strumienia.
+            block_duration: Długość bloku audio przekazywanego do rozpoznawania w sekundach.
+            vosk_model_path: Model Vosk, gdy rozpoznawanie mowy go nie ma (np. tylko Whisper).
+            use_partials: Wykrywanie na wynikach częściowych (niższe opóźnienie); inaczej dopiero
+                na wyniku końcowym z pewnością co najmniej min_confidence (mniej fałszywych aktywacji).
+            min_confidence: Minimalna pewność słowa w wyniku końcowym.
+        """
         self.sample_rate = sample_rate
-        self.wake_word_regex = re.compile(rf'\b{wake_word}\b', re.IGNORECASE)
-        self.audio_buffer = np.array([], dtype=np.float32)
+        self.block_size = int(sample_rate * block_duration)
+        self.wake_word = wake_word.lower()
+        self.wake_word_regex = re.compile(rf'\b{re.escape(self.wake_word)}\b', re.IGNORECASE)
+        self.use_partials = use_partials
+        self.min_confidence = min_confidence
         self.stream = None
+        # Bloki audio (bajty int16, czas nadejścia); ograniczona, by przy zatrzymanej analizie nie rosła
+        self.audio_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=int(5 / block_duration))
 
         self.recognizer = recognizer
+        model = getattr(recognizer, "vosk_model", None)
+        if model is None:
+            if not vosk_model_path:
+                raise ValueError("Wykrywanie słowa aktywującego wymaga modelu Vosk.")
+            model = vosk.Model(vosk_model_path)
+        # Gramatyka: słowo aktywujące albo dowolna inna mowa ([unk]), która go nie wyzwala
+        self.kaldi = vosk.KaldiRecognizer(model, sample_rate, json.dumps([self.wake_word, "[unk]"]))
+        self.kaldi.SetWords(True)
+
+        self.stats = {"listened": 0.0, "cpu": 0.0, "detections": 0, "false_accepts": 0,
+                      "dropped_blocks": 0, "latencies": []}
 
     def start_listening(self):
         """Rozpoczyna nasłuchiwanie mikrofonu."""
@@ -26,40 +61,99 @@ class WakeWordDetector:
             logger.warning("Już nasłuchuję!")
             return
 
-        self.audio_buffer = np.array([], dtype=np.float32)
-        self.stream = sd.InputStream(
+        self._clear_queue()
+        self.kaldi.Reset()
+        self.stream = sd.RawInputStream(
             samplerate=self.sample_rate,
+            blocksize=self.block_size,
             channels=1,
+            dtype='int16',
             callback=self._audio_callback
         )
         self.stream.start()
         logger.info("Nasłuchiwanie rozpoczęte.")
 
-    def _audio_callback(self, indata, frames, time, status):
-        self.audio_buffer = np.append(self.audio_buffer, indata[:, 0])
+    def _audio_callback(self, indata, frames, time_info, status):
+        if status:
+            logger.warning(f"Strumień słowa aktywującego: {status}")
+        try:
+            self.audio_queue.put_nowait((bytes(indata), time.perf_counter()))
+        except queue.Full:
+            self.stats["dropped_blocks"] += 1
+
+    def _clear_queue(self):
+        while not self.audio_queue.empty():
+            try:
+                self.audio_queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _is_wake_word(self, final: bool) -> bool:
+        if not final:
+            return bool(self.wake_word_regex.search(json.loads(self.kaldi.PartialResult()).get("partial", "")))
+        words = json.loads(self.kaldi.Result()).get("result", [])
+        return any(w["word"] == self.wake_word and w.get("conf", 1.0) >= self.min_confidence for w in words)
 
     def check_for_wake_word(self, duration: float = 1.0) -> bool:
-        """Nagrywa krótki fragment i sprawdza, czy pojawiło się słowo aktywujące."""
-        r = sr.Recognizer()
-        r.pause_threshold = 1.0
+        """
+        Analizuje dźwięk ze strumienia przez najwyżej `duration` sekund i sprawdza, czy pojawiło się
+        słowo aktywujące. Po wykryciu strumień jest zatrzymywany, by mikrofon był wolny dla komendy;
+        kolejne wywołanie wznawia nasłuch.
+        """
         try:
-            with sr.Microphone() as source:
-                logger.info("Słucham...")
-                r.adjust_for_ambient_noise(source, duration=0.5)
-                audio = r.listen(source, timeout=3, phrase_time_limit=duration)
-                wav_data = audio.get_wav_data(convert_rate=16000, convert_width=2)
-                text =  self.recognizer.transcribe(wav_data)
-                return bool(self.wake_word_regex.search(text))
-        except sr.WaitTimeoutError:
-            logger.info("Timeout nasłuchu")
-        except sr.UnknownValueError:
-            logger.warning("Nie rozpoznano mowy")
+            if self.stream is None:
+                self.start_listening()
+            deadline = time.perf_counter() + duration
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                try:
+                    block, arrived = self.audio_queue.get(timeout=remaining)
+                except queue.Empty:
+                    return False
+                cpu_start = time.thread_time()
+                final = self.kaldi.AcceptWaveform(block)
+                detected = (final or self.use_partials) and self._is_wake_word(final)
+                self.stats["cpu"] += time.thread_time() - cpu_start
+                self.stats["listened"] += len(block) / 2 / self.sample_rate
+                if detected:
+                    latency = time.perf_counter() - arrived
+                    self.stats["detections"] += 1
+                    self.stats["latencies"].append(latency)
+                    logger.info(f"Wykryto słowo aktywujące (opóźnienie {latency * 1000:.0f} ms)")
+                    self.stop()
+                    return True
         except Exception as e:
-            logger.error(f"Błąd rozpoznawania: {e}")
-        
-        
-        
+            logger.error(f"Błąd wykrywania słowa aktywującego: {e}")
+            self.stop()
+            return False
+
+    def report_false_accept(self):
+        """Odnotowuje aktywację, po której nie padła żadna komenda (fałszywe wykrycie)."""
+        self.stats["false_accepts"] += 1
+
+    def get_stats(self) -> Dict:
+        """
+        Zwraca pomiary nasłuchu: liczbę wykryć, fałszywe aktywacje na godzinę nasłuchu, średnie
+        i maksymalne opóźnienie wykrycia od nadejścia bloku audio (ms) oraz użycie CPU przez
+        rozpoznawanie względem czasu nasłuchu (%).
+        """
+        listened = self.stats["listened"]
+        latencies = self.stats["latencies"]
+        return {
+            "listened_s": listened,
+            "detections": self.stats["detections"],
+            "false_accepts": self.stats["false_accepts"],
+            "false_accepts_per_hour": self.stats["false_accepts"] / listened * 3600 if listened else 0.0,
+            "latency_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            "max_latency_ms": max(latencies) * 1000 if latencies else 0.0,
+            "cpu_percent": self.stats["cpu"] / listened * 100 if listened else 0.0,
+            "dropped_blocks": self.stats["dropped_blocks"],
+        }
+
     def stop(self):
         if self.stream:
             self.stream.stop()
             self.stream.close()
+            self.stream = None
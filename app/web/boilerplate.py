@@ -0,0 +1,205 @@
+import logging
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.url_utils import canonicalize_url
+from web.extraction_profiles import ExtractionProfiles
+
+logger = logging.getLogger(__name__)
+
+class BoilerplateModel:
+    """
+    Model powtarzalnych bloków szablonu witryny (menu, banery cookies, stopki, paski boczne).
+
+    Dla każdej domeny zliczane są hashe shingli (k-słownych okien tekstu) w odwiedzonych stronach.
+    Shingle obecne w co najmniej min_pages stronach (i w min_ratio z nich) uznawane są za szablon,
+    a bloki treści złożone głównie z takich shingli są usuwane przed budową kontekstu dla LLM.
+    """
+
+    def __init__(self, shingle_size: int = 5, min_pages: int = 2, min_ratio: float = 0.5,
+                 block_threshold: float = 0.6, max_shingles: int = 200000, max_page_stats: int = 100):
+        """
+        Args:
+            shingle_size: Liczba słów w shinglu.
+            min_pages: Minimalna liczba stron domeny, w których blok musi wystąpić.
+            min_ratio: Minimalny udział stron domeny zawierających shingle szablonu.
+            block_threshold: Udział shingli szablonu, od którego blok (paragraf, lista) jest usuwany.
+            max_shingles: Limit zapamiętanych shingli na domenę (rzadkie są usuwane po przekroczeniu).
+            max_page_stats: Liczba stron, dla których przechowywane są statystyki.
+        """
+        self.shingle_size = shingle_size
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.block_threshold = block_threshold
+        self.max_shingles = max_shingles
+        self.max_page_stats = max_page_stats
+        self.domains: Dict[str, Dict] = {}
+        self.page_stats: "OrderedDict[str, Dict]" = OrderedDict()
+        self.totals = {"pages": 0, "filtered_pages": 0, "removed_blocks": 0, "tokens_saved": 0}
+
+    @staticmethod
+    def _words(text: str) -> List[str]:
+        return re.findall(r"\w+", text.lower())
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return zlib.crc32(value.encode("utf-8"))
+
+    @staticmethod
+    def estimate_tokens(chars: int) -> int:
+        """Szacuje liczbę tokenów LLM dla podanej liczby znaków (~4 znaki na token)."""
+        return (chars + 3) // 4
+
+    def _shingles(self, text: str) -> List[int]:
+        """Zwraca hashe shingli tekstu; krótki blok jest jednym shinglem."""
+        words = self._words(text)
+        k = self.shingle_size
+        if len(words) <= k:
+            return [self._hash(" ".join(words))] if words else []
+        return [self._hash(" ".join(words[i:i + k])) for i in range(len(words) - k + 1)]
+
+    def _page_signatures(self, content: Dict) -> Set[int]:
+        """Zbiera hashe wszystkich bloków treści strony (każdy liczony raz na stronę)."""
+        signatures: Set[int] = set()
+        signatures.update(self._shingles(content.get("text", "")))
+        for paragraph in content.get("paragraphs", []):
+            signatures.update(self._shingles(paragraph))
+        for lists in content.get("lists", {}).values():
+            for items in lists:
+                signatures.update(self._shingles(" ".join(items)))
+        for heading in content.get("headings", []):
+            signatures.add(self._hash("h:" + heading.get("text", "").lower()))
+        for link in content.get("links", []):
+            signatures.add(self._hash(f"l:{link.get('text', '').lower()}|{link.get('url', '')}"))
+        return signatures
+
+    def _observe(self, url: str, domain: str, content: Dict) -> Dict:
+        """Dodaje stronę do statystyk domeny (ponowne wizyty tego samego URL nie są liczone)."""
+        model = self.domains.setdefault(domain, {"pages": set(), "counts": {}})
+        key = canonicalize_url(url)
+        if key in model["pages"]:
+            return model
+        model["pages"].add(key)
+        counts = model["counts"]
+        for signature in self._page_signatures(content):
+            counts[signature] = counts.get(signature, 0) + 1
+        if len(counts) > self.max_shingles:
+            model["counts"] = {s: c for s, c in counts.items() if c > 1}
+        return model
+
+    def _frequent(self, model: Dict) -> int:
+        """Zwraca minimalną liczbę stron, od której shingle należy do szablonu domeny."""
+        return max(self.min_pages, int(len(model["pages"]) * self.min_ratio + 0.999))
+
+    def _is_boilerplate(self, signatures: Iterable[int], counts: Dict[int, int], threshold: int) -> bool:
+        signatures = list(signatures)
+        if not signatures:
+            return False
+        frequent = sum(1 for s in signatures if counts.get(s, 0) >= threshold)
+        return frequent / len(signatures) >= self.block_threshold
+
+    def _strip_text(self, text: str, counts: Dict[int, int], threshold: int) -> str:
+        """Usuwa z tekstu fragmenty pokryte shinglami szablonu."""
+        tokens = [(m.group().lower(), m.start(), m.end()) for m in re.finditer(r"\w+", text)]
+        k = self.shingle_size
+        if len(tokens) <= k:
+            return "" if self._is_boilerplate(self._shingles(text), counts, threshold) else text
+        spans = []
+        for j in range(len(tokens) - k + 1):
+            if counts.get(self._hash(" ".join(t[0] for t in tokens[j:j + k])), 0) >= threshold:
+                start, end = tokens[j][1], tokens[j + k - 1][2]
+                if spans and start <= spans[-1][1]:
+                    spans[-1][1] = max(spans[-1][1], end)
+                else:
+                    spans.append([start, end])
+        if not spans:
+            return text
+        parts, last = [], 0
+        for start, end in spans:
+            parts.append(text[last:start])
+            last = end
+        parts.append(text[last:])
+        return re.sub(r"\s+", " ", "".join(parts)).strip()
+
+    def process(self, url: Optional[str], content: Dict) -> Dict:
+        """
+        Uczy model na treści strony i zwraca treść bez bloków szablonu witryny.
+
+        Statystyki usuniętych bloków i zaoszczędzonych tokenów trafiają do content['boilerplate']
+        oraz do page_stats.
+        """
+        domain = ExtractionProfiles.domain_of(url)
+        if not domain or not content:
+            return content
+        model = self._observe(url, domain, content)
+        self.totals["pages"] += 1
+        if len(model["pages"]) < self.min_pages:
+            return content
+
+        counts = model["counts"]
+        threshold = self._frequent(model)
+        removed = {"paragraphs": 0, "lists": 0, "links": 0, "headings": 0}
+        before = len(content.get("text", "")) + sum(len(p) for p in content.get("paragraphs", []))
+
+        paragraphs = [p for p in content.get("paragraphs", [])
+                      if not self._is_boilerplate(self._shingles(p), counts, threshold)]
+        removed["paragraphs"] = len(content.get("paragraphs", [])) - len(paragraphs)
+        content["paragraphs"] = paragraphs
+
+        lists = {}
+        removed_list_chars = 0
+        for list_type, items_lists in content.get("lists", {}).items():
+            kept = []
+            for items in items_lists:
+                if self._is_boilerplate(self._shingles(" ".join(items)), counts, threshold):
+                    removed_list_chars += sum(len(item) for item in items)
+                else:
+                    kept.append(items)
+            removed["lists"] += len(items_lists) - len(kept)
+            lists[list_type] = kept
+        if "lists" in content:
+            content["lists"] = lists
+
+        links = [l for l in content.get("links", [])
+                 if counts.get(self._hash(f"l:{l.get('text', '').lower()}|{l.get('url', '')}"), 0) < threshold]
+        removed_link_chars = sum(len(l.get("text", "")) + len(l.get("url", "")) for l in content.get("links", [])) \
+            - sum(len(l.get("text", "")) + len(l.get("url", "")) for l in links)
+        removed["links"] = len(content.get("links", [])) - len(links)
+        content["links"] = links
+
+        headings = [h for h in content.get("headings", [])
+                    if counts.get(self._hash("h:" + h.get("text", "").lower()), 0) < threshold]
+        removed["headings"] = len(content.get("headings", [])) - len(headings)
+        removed_heading_chars = sum(len(h.get("text", "")) for h in content.get("headings", [])) \
+            - sum(len(h.get("text", "")) for h in headings)
+        content["headings"] = headings
+
+        if content.get("text"):
+            content["text"] = self._strip_text(content["text"], counts, threshold)
+            content["length"] = len(content["text"])
+            content["word_count"] = len(content["text"].split())
+            content["sentence_count"] = len(re.split(r'[.!?]+', content["text"])) - 1 if content["text"] else 0
+
+        after = len(content.get("text", "")) + sum(len(p) for p in content.get("paragraphs", []))
+        removed_chars = before - after + removed_list_chars + removed_link_chars + removed_heading_chars
+        stats = {
+            "domain": domain,
+            "removed": removed,
+            "removed_chars": removed_chars,
+            "tokens_saved": self.estimate_tokens(removed_chars)
+        }
+        content["boilerplate"] = stats
+        self.page_stats[canonicalize_url(url)] = stats
+        while len(self.page_stats) > self.max_page_stats:
+            self.page_stats.popitem(last=False)
+        self.totals["filtered_pages"] += 1
+        self.totals["removed_blocks"] += sum(removed.values())
+        self.totals["tokens_saved"] += stats["tokens_saved"]
+        print(f"Usunięto szablon witryny {domain}: {sum(removed.values())} bloków, ~{stats['tokens_saved']} tokenów")
+        return content
+
+    def stats_for(self, url: str) -> Optional[Dict]:
+        """Zwraca statystyki usuniętego szablonu dla strony (lub None)."""
+        return self.page_stats.get(canonicalize_url(url))
@@ -0,0 +1,138 @@
+import logging
+from typing import Dict, Optional
+
+from playwright.sync_api import Page
+
+logger = logging.getLogger(__name__)
+
+# Skrypt instalowany w każdym dokumencie: MutationObserver zapisuje zmienione poddrzewa (najbliższy
+# element blokowy) oraz długość usuniętego tekstu, aby po kliknięciu lub doładowaniu treści
+# można było ponownie wyekstrahować tylko zmienione fragmenty.
+TRACKER_SCRIPT = """
+(() => {
+    if (window.__waTracker) return;
+    const BLOCKS = 'article,section,main,li,tr,p,div,ul,ol,table,form,figure,h1,h2,h3,h4,h5,h6';
+    const IGNORED = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'SVG', 'META', 'LINK']);
+    const state = {changed: new Set(), removedChars: 0, version: 0, lastMutation: 0};
+
+    const rootOf = (node) => {
+        const el = node.nodeType === 1 ? node : node.parentElement;
+        if (!el || IGNORED.has(el.tagName)) return null;
+        return el.closest(BLOCKS) || el;
+    };
+
+    const observer = new MutationObserver((records) => {
+        for (const record of records) {
+            if (record.type === 'characterData') {
+                const root = rootOf(record.target);
+                if (root) state.changed.add(root);
+                continue;
+            }
+            for (const node of record.addedNodes) {
+                const root = rootOf(node);
+                if (root) state.changed.add(root);
+            }
+            for (const node of record.removedNodes) {
+                state.removedChars += (node.textContent || '').trim().length;
+            }
+        }
+        state.version++;
+        state.lastMutation = performance.now();
+    });
+
+    const start = () => observer.observe(document.documentElement, {
+        childList: true, subtree: true, characterData: true
+    });
+    if (document.documentElement) start();
+    else document.addEventListener('readystatechange', start, {once: true});
+
+    const hashText = (text) => {
+        let hash = 0x811c9dc5;
+        for (let i = 0; i < text.length; i++) {
+            hash ^= text.charCodeAt(i);
+            hash = Math.imul(hash, 0x01000193) >>> 0;
+        }
+        return hash.toString(16) + ':' + text.length;
+    };
+
+    window.__waTracker = {
+        take: (maxChars) => {
+            const roots = [...state.changed].filter(el => el.isConnected);
+            const topLevel = roots.filter(el => !roots.some(other => other !== el && other.contains(el)));
+            const fragments = [];
+            let total = 0;
+            let overflow = false;
+            for (const el of topLevel) {
+                const html = el.outerHTML;
+                total += html.length;
+                if (total > maxChars) { overflow = true; break; }
+                fragments.push(html);
+            }
+            const result = {
+                fragments, overflow, removedChars: state.removedChars, version: state.version
+            };
+            state.changed = new Set();
+            state.removedChars = 0;
+            return result;
+        },
+        hash: () => hashText(document.body ? document.body.innerText : ''),
+        lastMutation: () => state.lastMutation,
+        version: () => state.version
+    };
+})();
+"""
+
+class DomTracker:
+    """Śledzi zmiany DOM strony (MutationObserver), umożliwiając przyrostową ekstrakcję danych."""
+
+    def __init__(self, page: Page, max_fragment_chars: int = 200000, max_removed_chars: int = 200):
+        """
+        Args:
+            page: Obiekt Playwright Page.
+            max_fragment_chars: Maksymalny rozmiar HTML zmienionych fragmentów; powyżej wymagany jest pełny scraping.
+            max_removed_chars: Maksymalna długość usuniętego tekstu, przy której delta jest jeszcze poprawna.
+        """
+        self.page = page
+        self.max_fragment_chars = max_fragment_chars
+        self.max_removed_chars = max_removed_chars
+
+    def install(self) -> None:
+        """Instaluje obserwatora w bieżącym i każdym kolejnym dokumencie karty."""
+        try:
+            self.page.add_init_script(TRACKER_SCRIPT)
+            self.page.evaluate(TRACKER_SCRIPT)
+        except Exception as e:
+            logger.warning(f"Nie udało się zainstalować śledzenia DOM: {e}")
+
+    def take_changes(self) -> Optional[Dict]:
+        """
+        Pobiera i czyści zapisane zmiany DOM.
+
+        Returns:
+            Dict z listą 'fragments' (HTML zmienionych poddrzew) i flagą 'full' (wymagany pełny scraping)
+            lub None, jeśli śledzenie nie jest dostępne w dokumencie.
+        """
+        try:
+            changes = self.page.evaluate(
+                "(maxChars) => window.__waTracker ? window.__waTracker.take(maxChars) : null",
+                self.max_fragment_chars
+            )
+        except Exception as e:
+            logger.warning(f"Błąd pobierania zmian DOM: {e}")
+            return None
+        if changes is None:
+            return None
+        changes["full"] = changes["overflow"] or changes["removedChars"] > self.max_removed_chars
+        return changes
+
+    def reset(self) -> None:
+        """Odrzuca zapisane zmiany (np. po pełnym scrapingu)."""
+        self.take_changes()
+
+    def dom_hash(self) -> Optional[str]:
+        """Zwraca skrót widocznego tekstu dokumentu (do wykrywania zmian po odświeżeniu)."""
+        try:
+            return self.page.evaluate("() => window.__waTracker ? window.__waTracker.hash() : null")
+        except Exception as e:
+            logger.warning(f"Błąd obliczania skrótu DOM: {e}")
+            return None
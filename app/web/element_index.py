@@ -0,0 +1,148 @@
+import logging
+import time
+from typing import Dict, List, Optional
+
+from playwright.sync_api import Locator, Page
+
+logger = logging.getLogger(__name__)
+
+# Indeksuje elementy interaktywne dokumentu w jednym wywołaniu: nadaje nowym elementom stały
+# atrybut data-wa-id (numeracja per rodzaj, bez ponownego użycia numerów w dokumencie) i zwraca
+# tylko zmiany od poprzedniego wywołania (dodane, usunięte i elementy ze zmienioną nazwą).
+# Bez zmian DOM (wersja obserwatora DomTracker) wywołanie kończy się od razu.
+ELEMENT_INDEX_SCRIPT = """
+(maxName) => {
+    const LINKS = 'a[href], [role="link"]';
+    const BUTTONS = 'button, input[type="button"], input[type="submit"], input[type="reset"], [role="button"], summary';
+    const NAV = 'nav, footer, [role="navigation"]';
+    let state = window.__waElements;
+    const reset = !state;
+    if (reset) state = window.__waElements = {map: new Map(), next: {link: 1, button: 1}, version: null};
+    const version = window.__waTracker ? window.__waTracker.version() : null;
+    if (!reset && version !== null && version === state.version) {
+        return {reset, added: [], removed: [], renamed: []};
+    }
+    state.version = version;
+
+    const kindOf = (el) => {
+        const role = el.getAttribute('role');
+        if (el.tagName === 'A' && el.hasAttribute('href')) {
+            const href = el.getAttribute('href').trim().toLowerCase();
+            if (!href || href.startsWith('#') || href.startsWith('javascript:') || role === 'button') return 'button';
+            return el.closest(NAV) ? null : 'link';
+        }
+        if (role === 'link') return el.closest(NAV) ? null : 'link';
+        return 'button';
+    };
+    const nameOf = (el) => {
+        let name = (el.getAttribute('aria-label') || '').trim();
+        const labelledBy = el.getAttribute('aria-labelledby');
+        if (!name && labelledBy) {
+            name = labelledBy.split(/\\s+/).map(id => document.getElementById(id)).filter(Boolean)
+                .map(node => node.innerText || node.textContent || '').join(' ').trim();
+        }
+        if (!name) name = (el.innerText || el.textContent || '').trim();
+        if (!name && el.tagName === 'INPUT') name = (el.value || '').trim();
+        if (!name) {
+            const img = el.querySelector('img[alt]');
+            name = img ? img.alt.trim() : '';
+        }
+        if (!name) name = (el.getAttribute('title') || '').trim();
+        return name.replace(/\\s+/g, ' ').slice(0, maxName);
+    };
+    const roleOf = (el) => el.getAttribute('role') || (el.tagName === 'A' ? 'link' : 'button');
+
+    const removed = [];
+    const renamed = [];
+    for (const [id, el] of state.map) {
+        if (!el.isConnected) {
+            state.map.delete(id);
+            removed.push(id);
+            continue;
+        }
+        const name = nameOf(el);
+        if (name !== el.__waName) {
+            el.__waName = name;
+            renamed.push({id, name});
+        }
+    }
+    const added = [];
+    document.querySelectorAll(LINKS + ', ' + BUTTONS).forEach(el => {
+        // Element sklonowany przez stronę ma cudzy data-wa-id i dostaje własny
+        if (el.dataset.waId && state.map.get(el.dataset.waId) === el) return;
+        const kind = kindOf(el);
+        if (!kind) return;
+        const number = state.next[kind]++;
+        const id = kind + '-' + number;
+        el.setAttribute('data-wa-id', id);
+        el.__waName = nameOf(el);
+        state.map.set(id, el);
+        added.push({id, kind, number, role: roleOf(el), name: el.__waName, url: kind === 'link' && el.href ? el.href : null});
+    });
+    return {reset, added, removed, renamed};
+}
+"""
+
+class ElementIndex:
+    """
+    Indeks elementów interaktywnych strony (linki i przyciski) ze stałymi numerami i lokatorami.
+
+    Numery są nadawane raz na dokument i nie zmieniają się, gdy strona się zmienia (usunięte elementy
+    zostawiają luki), więc odczyt linków i komendy kliknięcia używają tej samej numeracji.
+    Odświeżenie przesyła z przeglądarki tylko zmiany od poprzedniego odświeżenia.
+    """
+
+    KINDS = ("link", "button")
+
+    def __init__(self, page: Page, max_name_chars: int = 150):
+        """
+        Args:
+            page: Obiekt Playwright Page.
+            max_name_chars: Maksymalna długość nazwy dostępnej elementu.
+        """
+        self.page = page
+        self.max_name_chars = max_name_chars
+        self.elements: Dict[str, Dict[int, Dict]] = {kind: {} for kind in self.KINDS}
+        self.by_id: Dict[str, Dict] = {}
+
+    def refresh(self) -> None:
+        """Aktualizuje indeks o zmiany dokumentu (przy nowym dokumencie buduje go od nowa)."""
+        start_time = time.time()
+        try:
+            delta = self.page.evaluate(ELEMENT_INDEX_SCRIPT, self.max_name_chars)
+        except Exception as e:
+            logger.warning(f"Błąd aktualizacji indeksu elementów: {e}")
+            return
+        if delta["reset"]:
+            self.clear()
+        for element_id in delta["removed"]:
+            element = self.by_id.pop(element_id, None)
+            if element:
+                self.elements[element["kind"]].pop(element["number"], None)
+        for change in delta["renamed"]:
+            if change["id"] in self.by_id:
+                self.by_id[change["id"]]["name"] = change["name"]
+        for element in delta["added"]:
+            self.elements[element["kind"]][element["number"]] = element
+            self.by_id[element["id"]] = element
+        if delta["reset"] or delta["added"] or delta["removed"]:
+            print(f"Indeks elementów: {len(self.elements['link'])} linków, {len(self.elements['button'])} przycisków "
+                  f"(+{len(delta['added'])}/-{len(delta['removed'])}) w {time.time() - start_time:.3f}s")
+
+    def items(self, kind: str) -> List[Dict]:
+        """Zwraca elementy danego rodzaju w kolejności numerów."""
+        return list(self.elements[kind].values())
+
+    def get(self, kind: str, number: int) -> Optional[Dict]:
+        """Zwraca element o numerze (None, jeśli nie istnieje lub został usunięty)."""
+        return self.elements[kind].get(number)
+
+    def locator(self, element: Dict) -> Locator:
+        """Zwraca stały lokator elementu (atrybut data-wa-id)."""
+        return self.page.locator(f'[data-wa-id="{element["id"]}"]')
+
+    def clear(self) -> None:
+        """Czyści indeks (np. po nawigacji do nowego dokumentu)."""
+        for elements in self.elements.values():
+            elements.clear()
+        self.by_id.clear()
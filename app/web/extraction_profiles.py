@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup, Tag
+
+logger = logging.getLogger(__name__)
+
+# Identyfikatory i klasy nadające się do selektora: bez cyfr (często generowanych dynamicznie)
+# i bez znaków wymagających escapowania w CSS
+STABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z_-]*$")
+
+def _stable_names(values) -> List[str]:
+    """Zwraca stabilne nazwy klas lub identyfikatorów (do selektorów i odcisku szablonu)."""
+    if isinstance(values, str):
+        values = values.split()
+    return [v for v in (values or []) if STABLE_NAME.match(v)]
+
+def css_path(node: Tag) -> Optional[str]:
+    """
+    Buduje selektor CSS prowadzący do węzła: od najbliższego przodka ze stabilnym id
+    (lub od body), z klasami i :nth-of-type tylko tam, gdzie rodzeństwo jest niejednoznaczne.
+    """
+    parts = []
+    current = node
+    while isinstance(current, Tag) and current.name not in ("body", "html", "[document]"):
+        element_id = _stable_names(current.get("id"))
+        if element_id:
+            parts.append(f"{current.name}#{element_id[0]}")
+            break
+        part = current.name + "".join(f".{c}" for c in _stable_names(current.get("class"))[:2])
+        parent = current.parent
+        if isinstance(parent, Tag):
+            same = [s for s in parent.find_all(current.name, recursive=False)
+                    if _stable_names(s.get("class"))[:2] == _stable_names(current.get("class"))[:2]]
+            if len(same) > 1:
+                part += f":nth-of-type({parent.find_all(current.name, recursive=False).index(current) + 1})"
+        parts.append(part)
+        current = parent
+    if not parts:
+        return None
+    return " > ".join(reversed(parts))
+
+def template_fingerprint(soup: BeautifulSoup, max_depth: int = 3) -> str:
+    """
+    Zwraca odcisk szablonu strony: skrót zbioru sygnatur (tag, id, klasy) elementów body do
+    głębokości max_depth. Strony zbudowane z tego samego szablonu mają zwykle ten sam odcisk.
+    """
+    root = soup.body or soup
+    signatures = set()
+    level = [root]
+    for _ in range(max_depth):
+        next_level = []
+        for element in level:
+            for child in element.find_all(True, recursive=False):
+                if child.name in ("script", "style", "noscript", "template"):
+                    continue
+                ids = "#".join(_stable_names(child.get("id")))
+                classes = ".".join(sorted(_stable_names(child.get("class"))))
+                signatures.add(f"{child.name}#{ids}.{classes}")
+                next_level.append(child)
+        level = next_level
+    return hashlib.sha1("|".join(sorted(signatures)).encode("utf-8")).hexdigest()[:16]
+
+class ExtractionProfiles:
+    """
+    Trwałe profile ekstrakcji treści dla domen: selektor węzła z główną treścią (lub użycie
+    Readability) zapamiętany osobno dla każdego szablonu strony (odcisku) w domenie.
+    """
+
+    def __init__(self, path: Optional[str] = "extraction_profiles.json", max_templates: int = 5,
+                 min_length: int = 100, max_failures: int = 3):
+        """
+        Args:
+            path: Ścieżka pliku JSON z profilami (None = profile tylko w pamięci).
+            max_templates: Maksymalna liczba szablonów zapamiętanych dla jednej domeny.
+            min_length: Minimalna długość tekstu węzła uznawana za poprawny wynik profilu.
+            max_failures: Liczba unieważnień (pomniejszana przez poprawne użycia), po której domena
+                przestaje być profilowana.
+        """
+        self.path = path
+        self.max_templates = max_templates
+        self.min_length = min_length
+        self.max_failures = max_failures
+        self.lock = threading.Lock()
+        self.profiles: Dict[str, Dict] = self._load()
+        self.stats = {"hits": 0, "invalidated": 0, "learned": 0}
+
+    @staticmethod
+    def domain_of(url: Optional[str]) -> Optional[str]:
+        """Zwraca klucz domeny (bez www.) lub None dla URL-i bez hosta."""
+        if not url:
+            return None
+        domain = urlparse(url).netloc.lower().split(":")[0]
+        if domain.startswith("www."):
+            domain = domain[4:]
+        return domain or None
+
+    def _load(self) -> Dict[str, Dict]:
+        """Wczytuje profile z pliku JSON."""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Nie udało się wczytać profili ekstrakcji z {self.path}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Zapisuje profile atomowo (plik tymczasowy + podmiana)."""
+        if not self.path:
+            return
+        with self.lock:
+            payload = json.dumps(self.profiles, ensure_ascii=False, indent=2)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Nie udało się zapisać profili ekstrakcji do {self.path}: {e}")
+
+    def lookup(self, url: str, fingerprint: str) -> Optional[Dict]:
+        """Zwraca profil dla domeny URL i szablonu strony lub None (brak profilu lub inny szablon)."""
+        domain = self.domain_of(url)
+        with self.lock:
+            templates = self.profiles.get(domain, {}).get("templates", {})
+            profile = templates.get(fingerprint)
+            if profile:
+                profile["used_at"] = time.time()
+            return dict(profile) if profile else None
+
+    def record_hit(self, url: str, fingerprint: str) -> None:
+        """Zlicza poprawne użycie profilu."""
+        domain = self.domain_of(url)
+        with self.lock:
+            entry = self.profiles.get(domain, {})
+            profile = entry.get("templates", {}).get(fingerprint)
+            if profile:
+                profile["hits"] = profile.get("hits", 0) + 1
+                entry["failures"] = max(0, entry.get("failures", 0) - 1)
+        self.stats["hits"] += 1
+
+    def learn(self, url: str, fingerprint: str, method: str, selector: Optional[str], length: int) -> None:
+        """
+        Zapamiętuje, jak znaleziono główną treść strony.
+
+        Args:
+            method: 'selector' (węzeł wskazany selektorem) lub 'readability'.
+            selector: Selektor CSS węzła (dla method='selector').
+            length: Długość tekstu znalezionej treści.
+        """
+        domain = self.domain_of(url)
+        if not domain or (method == "selector" and not selector):
+            return
+        with self.lock:
+            entry = self.profiles.setdefault(domain, {"templates": {}, "failures": 0})
+            if entry.get("failures", 0) >= self.max_failures:
+                return
+            templates = entry["templates"]
+            templates[fingerprint] = {
+                "method": method,
+                "selector": selector,
+                "length": length,
+                "hits": 0,
+                "learned_at": time.time(),
+                "used_at": time.time()
+            }
+            while len(templates) > self.max_templates:
+                oldest = min(templates, key=lambda key: templates[key].get("used_at", 0))
+                del templates[oldest]
+        self.stats["learned"] += 1
+        logger.info(f"Zapamiętano profil ekstrakcji dla {domain}: {method} {selector or ''}")
+        self.save()
+
+    def invalidate(self, url: str, fingerprint: str, reason: str) -> None:
+        """Usuwa profil szablonu, który dał błędny wynik (np. zbyt krótki tekst lub brak węzła)."""
+        domain = self.domain_of(url)
+        with self.lock:
+            entry = self.profiles.get(domain)
+            if not entry or entry["templates"].pop(fingerprint, None) is None:
+                return
+            entry["failures"] = entry.get("failures", 0) + 1
+        self.stats["invalidated"] += 1
+        logger.info(f"Unieważniono profil ekstrakcji dla {domain}: {reason}")
+        self.save()
@@ -0,0 +1,115 @@
+import base64
+import binascii
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+from playwright.sync_api import Page
+
+from utils.url_utils import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# Oznacza element <img> o podanym adresie, aby zrobić zrzut tylko tego elementu
+MARK_IMAGE_SCRIPT = """
+(src) => {
+    document.querySelectorAll('[data-wa-image]').forEach(el => el.removeAttribute('data-wa-image'));
+    const img = Array.from(document.images).find(img => img.currentSrc === src || img.src === src);
+    if (!img || !img.complete || !img.naturalWidth) return false;
+    img.setAttribute('data-wa-image', '1');
+    img.scrollIntoView({block: 'center'});
+    return true;
+}
+"""
+
+class BrowserImageSource:
+    """
+    Dostarcza bajty obrazów już pobranych przez przeglądarkę: z przechwyconych odpowiedzi sieciowych
+    karty, z adresów data: lub ze zrzutu elementu <img> (np. obrazy blob: i chronione logowaniem).
+    """
+
+    def __init__(self, page: Page, max_responses: int = 300, max_image_bytes: int = 10 * 1024 * 1024):
+        """
+        Args:
+            page: Obiekt Playwright Page.
+            max_responses: Maksymalna liczba zapamiętanych odpowiedzi z obrazami (najstarsze są usuwane).
+            max_image_bytes: Maksymalny rozmiar obrazu pobieranego z przeglądarki.
+        """
+        self.page = page
+        self.max_responses = max_responses
+        self.max_image_bytes = max_image_bytes
+        # Treść odpowiedzi jest pobierana z przeglądarki dopiero przy opisie obrazu
+        self.responses: "OrderedDict[str, object]" = OrderedDict()
+        self.stats = {"response": 0, "data_url": 0, "screenshot": 0, "missed": 0}
+        self.page.on("response", self._on_response)
+
+    def _on_response(self, response) -> None:
+        """Zapamiętuje odpowiedzi z obrazami pobranymi przez kartę."""
+        try:
+            if response.request.resource_type != "image" or response.status != 200:
+                return
+            key = canonicalize_url(response.url)
+        except Exception:
+            return
+        self.responses[key] = response
+        self.responses.move_to_end(key)
+        while len(self.responses) > self.max_responses:
+            self.responses.popitem(last=False)
+
+    @staticmethod
+    def _decode_data_url(src: str) -> Optional[bytes]:
+        header, _, payload = src.partition(",")
+        try:
+            if header.endswith(";base64"):
+                return base64.b64decode(payload)
+            return unquote_to_bytes(payload)
+        except (binascii.Error, ValueError):
+            return None
+
+    def get_bytes(self, src: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Zwraca bajty obrazu bez ponownego pobierania z sieci.
+
+        Returns:
+            Krotka (bajty, źródło: 'data_url' | 'response' | 'screenshot') lub (None, None),
+            jeśli przeglądarka nie ma obrazu.
+        """
+        start_time = time.time()
+        data, source = None, None
+        if src.startswith("data:"):
+            data, source = self._decode_data_url(src), "data_url"
+        else:
+            response = self.responses.get(canonicalize_url(src)) if not src.startswith("blob:") else None
+            if response is not None:
+                try:
+                    body = response.body()
+                    if body and len(body) <= self.max_image_bytes:
+                        data, source = body, "response"
+                except Exception as e:
+                    # Przeglądarka mogła już zwolnić bufor odpowiedzi (np. po nawigacji)
+                    logger.debug(f"Treść odpowiedzi obrazu niedostępna ({src}): {e}")
+            if data is None:
+                data = self._screenshot(src)
+                source = "screenshot" if data else None
+        if data:
+            self.stats[source] += 1
+            print(f"Obraz z przeglądarki ({source}, {len(data)} B) w {time.time() - start_time:.3f}s")
+            return data, source
+        self.stats["missed"] += 1
+        return None, None
+
+    def _screenshot(self, src: str) -> Optional[bytes]:
+        """Robi zrzut elementu <img> wyświetlającego obraz (ostatnia deska ratunku, np. dla blob:)."""
+        try:
+            if not self.page.evaluate(MARK_IMAGE_SCRIPT, src):
+                return None
+            return self.page.locator('[data-wa-image="1"]').first.screenshot(type="png", timeout=3000)
+        except Exception as e:
+            logger.debug(f"Nie udało się zrobić zrzutu obrazu {src}: {e}")
+            return None
+
+    def clear(self) -> None:
+        """Czyści zapamiętane odpowiedzi."""
+        self.responses.clear()
@@ -0,0 +1,84 @@
+import logging
+import time
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+class LazyPageData(MutableMapping):
+    """
+    Dane strony zachowujące się jak dict, w których każde pole (np. 'content', 'forms') jest
+    ekstrahowane dopiero przy pierwszym dostępie i zapamiętywane.
+
+    Pola wyliczone i nadpisane trzymane są w _values; pozostałe pola liczą funkcje z _extractors,
+    zwykle na wspólnym, jednokrotnie parsowanym drzewie HTML. Dane źródłowe ekstraktorów (HTML,
+    drzewo) trzymane są w _source i zwalniane, gdy wszystkie pola zostały wyekstrahowane.
+    """
+
+    def __init__(self, extractors: Dict[str, Callable[[], Any]], values: Optional[Dict] = None,
+                 source: Optional[Dict] = None):
+        """
+        Args:
+            extractors: Funkcje wyliczające pola przy pierwszym dostępie.
+            values: Pola już wyliczone.
+            source: Dane źródłowe współdzielone przez ekstraktory; opcjonalny klucz 'size' to ich
+                przybliżony rozmiar w pamięci (w bajtach).
+        """
+        self._extractors = dict(extractors)
+        self._values: Dict[str, Any] = dict(values or {})
+        self._source: Dict[str, Any] = source if source is not None else {}
+        self._release_if_done()
+
+    def _release_if_done(self) -> None:
+        if not self._extractors:
+            self._source.clear()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            if key not in self._extractors:
+                raise KeyError(key)
+            start_time = time.time()
+            # Ekstraktor jest usuwany dopiero po udanej ekstrakcji (błąd nie traci pola)
+            self._values[key] = self._extractors[key]()
+            del self._extractors[key]
+            self._release_if_done()
+            print(f"Ekstrakcja pola '{key}' w {time.time() - start_time:.3f}s")
+        return self._values[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._extractors.pop(key, None)
+        self._values[key] = value
+        self._release_if_done()
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self._values and key not in self._extractors:
+            raise KeyError(key)
+        self._values.pop(key, None)
+        self._extractors.pop(key, None)
+        self._release_if_done()
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._values
+        yield from (key for key in self._extractors if key not in self._values)
+
+    def __len__(self) -> int:
+        return len(self._values) + sum(1 for key in self._extractors if key not in self._values)
+
+    def __repr__(self) -> str:
+        return f"LazyPageData(loaded={list(self._values)}, pending={list(self._extractors)})"
+
+    def is_loaded(self, key: str) -> bool:
+        """Sprawdza, czy pole zostało już wyekstrahowane."""
+        return key in self._values
+
+    def pending_size(self) -> int:
+        """Przybliżony rozmiar danych źródłowych trzymanych dla pól jeszcze niewyekstrahowanych (w bajtach)."""
+        return int(self._source.get("size", 0))
+
+    def materialized(self) -> Dict[str, Any]:
+        """Zwraca tylko pola już wyekstrahowane (bez wymuszania ekstrakcji pozostałych)."""
+        return dict(self._values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Wymusza ekstrakcję wszystkich pól i zwraca zwykły dict (np. do serializacji)."""
+        return {key: self[key] for key in list(self)}
@@ -0,0 +1,306 @@
+import logging
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from Levenshtein import distance as levenshtein_distance
+from playwright.sync_api import Page
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?…])\s+")
+
+# Litery, których NFD nie rozkłada na literę bazową i znak diakrytyczny
+FOLD_TABLE = str.maketrans({"ł": "l", "đ": "d", "ø": "o", "ß": "ss"})
+
+# Końcówki fleksyjne (zapisane bez znaków diakrytycznych), odcinane od najdłuższej
+POLISH_SUFFIXES = sorted({
+    "osciami", "osciach", "owiach", "owymi", "owego", "owemu", "owych", "oscia", "osci", "iego", "iemu",
+    "ymi", "imi", "ami", "ach", "ego", "emu", "ych", "ich", "owi", "owa", "owe", "owy", "iem", "osc",
+    "ow", "om", "em", "ej", "ie", "ym", "im", "mi", "a", "e", "i", "o", "u", "y",
+}, key=len, reverse=True)
+MIN_STEM = 3
+
+# Odległość edycyjna tolerowana między rdzeniami (literówki, błędy rozpoznawania mowy) i minimalna
+# długość rdzenia, od której jest dopuszczana
+MAX_DISTANCE = 1
+MIN_FUZZY_LENGTH = 4
+FUZZY_WEIGHT = 0.7
+
+# Przewija do fragmentu tekstu dokumentu: po identyfikatorze elementu, a bez niego po pierwszym
+# wystąpieniu tekstu (kontekst trafienia, potem samo trafienie) w złączonych węzłach tekstowych.
+# Zwraca true, jeśli przewinięto.
+SCROLL_TO_ANCHOR_SCRIPT = """
+(anchor) => {
+    const scroll = (el) => { el.scrollIntoView({block: 'center'}); return true; };
+    if (anchor.id) {
+        const el = document.getElementById(anchor.id);
+        if (el) return scroll(el);
+    }
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    const starts = [];
+    const nodes = [];
+    let full = '';
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const parent = node.parentElement;
+        if (!parent || ['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE'].includes(parent.tagName)) continue;
+        let text = node.nodeValue.replace(/\\s+/g, ' ');
+        if (!text.trim()) continue;
+        if (full.endsWith(' ') && text.startsWith(' ')) text = text.slice(1);
+        starts.push(full.length);
+        nodes.push(node);
+        full += text;
+        if (!full.endsWith(' ')) full += ' ';
+    }
+    full = full.toLowerCase();
+    for (const target of [anchor.context, anchor.text]) {
+        if (!target) continue;
+        const at = full.indexOf(target.toLowerCase());
+        if (at < 0) continue;
+        let lo = 0, hi = starts.length - 1;
+        while (lo < hi) {
+            const mid = (lo + hi + 1) >> 1;
+            if (starts[mid] <= at) lo = mid; else hi = mid - 1;
+        }
+        return scroll(nodes[lo].parentElement);
+    }
+    return false;
+}
+"""
+
+@lru_cache(maxsize=65536)
+def fold(word: str) -> str:
+    """Zwraca słowo małymi literami i bez znaków diakrytycznych (np. 'Łódź' -> 'lodz')."""
+    decomposed = unicodedata.normalize("NFD", word.casefold().translate(FOLD_TABLE))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Zwraca przybliżony rdzeń złożonego słowa, odcinając polską końcówkę fleksyjną ('kotami' -> 'kot')."""
+    if not word.isalpha():
+        return word
+    for suffix in POLISH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+def term(word: str) -> str:
+    """Klucz indeksu dla słowa: rdzeń słowa bez znaków diakrytycznych."""
+    return stem(fold(word))
+
+def query_terms(text: str) -> List[str]:
+    return [term(word) for word in WORD_PATTERN.findall(text)]
+
+class FuzzyVocabulary:
+    """
+    Słownik rdzeni z wyszukiwaniem przybliżonym (odległość edycyjna do MAX_DISTANCE lub zamiana
+    sąsiednich liter).
+
+    Każdy rdzeń jest zapisywany także pod wariantami z jedną usuniętą literą, więc kandydaci
+    dla zapytania to kilka odczytów ze słownika (zamiast porównania z całym słownictwem);
+    kandydaci są potwierdzani odległością Levenshteina.
+    """
+
+    def __init__(self):
+        self.terms: Set[str] = set()
+        self.deletes: Dict[str, Set[str]] = defaultdict(set)
+
+    @staticmethod
+    def _variants(word: str) -> Set[str]:
+        return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+    def add(self, word: str) -> None:
+        if word in self.terms:
+            return
+        self.terms.add(word)
+        if len(word) >= MIN_FUZZY_LENGTH:
+            for variant in self._variants(word):
+                self.deletes[variant].add(word)
+
+    def expand(self, word: str) -> Dict[str, bool]:
+        """Zwraca rdzenie pasujące do rdzenia zapytania: {rdzeń: czy dokładnie}."""
+        matches = {word: True} if word in self.terms else {}
+        if len(word) < MIN_FUZZY_LENGTH:
+            return matches
+        candidates = set(self.deletes.get(word, ()))
+        for variant in self._variants(word):
+            if variant in self.terms:
+                candidates.add(variant)
+            candidates.update(self.deletes.get(variant, ()))
+        for candidate in candidates:
+            if candidate != word and (levenshtein_distance(word, candidate, score_cutoff=MAX_DISTANCE) <= MAX_DISTANCE
+                                      or self._is_transposition(word, candidate)):
+                matches.setdefault(candidate, False)
+        return matches
+
+    @staticmethod
+    def _is_transposition(a: str, b: str) -> bool:
+        """Sprawdza, czy słowa różnią się tylko zamianą dwóch sąsiednich liter ('histroia' i 'historia')."""
+        if len(a) != len(b):
+            return False
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+
+class TitleIndex:
+    """Indeks tytułów (np. sekcji) dopasowywanych do nazwy podanej przez użytkownika."""
+
+    def __init__(self, titles: List[str]):
+        self.titles = titles
+        self.terms: List[List[str]] = [query_terms(title) for title in titles]
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.vocabulary = FuzzyVocabulary()
+        for i, terms in enumerate(self.terms):
+            for t in dict.fromkeys(terms):
+                self.postings[t].append(i)
+                self.vocabulary.add(t)
+
+    def best(self, name: str) -> Optional[int]:
+        """
+        Zwraca numer tytułu najlepiej pasującego do nazwy: zawierającego wszystkie słowa nazwy
+        (dokładnie lub w przybliżeniu), z największym udziałem dokładnych dopasowań i najkrótszego.
+        """
+        wanted = query_terms(name)
+        if not wanted:
+            return None
+        scores: Dict[int, List[float]] = defaultdict(lambda: [0.0] * len(wanted))
+        for position, word in enumerate(wanted):
+            for candidate, exact in self.vocabulary.expand(word).items():
+                weight = 1.0 if exact else FUZZY_WEIGHT
+                for i in self.postings[candidate]:
+                    scores[i][position] = max(scores[i][position], weight)
+        ranked = [(sum(weights), -len(self.terms[i]), -i) for i, weights in scores.items() if all(weights)]
+        return -max(ranked)[2] if ranked else None
+
+class PageIndex:
+    """
+    Pozycyjny indeks odwrócony treści jednej strony dla szukania na stronie i nawigacji po sekcjach.
+
+    Tekst jest dzielony na zdania (bloki), a słowa zapisywane jako rdzenie bez znaków diakrytycznych,
+    więc 'znajdź kotami' trafia też w 'kot' i 'kotów'; rdzenie różniące się jedną literą są
+    dopasowywane w przybliżeniu. Frazy są wyszukywane po pozycjach słów w bloku, zaczynając od
+    najrzadszego słowa, a trafienia zwracane z fragmentem tekstu i kotwicą do przewinięcia strony.
+    """
+
+    def __init__(self, texts: List[str], sections: Optional[List[Dict]] = None):
+        """
+        Args:
+            texts: Bloki tekstu strony w kolejności dokumentu (np. zdania treści).
+            sections: Sekcje i nagłówki strony [{'name', 'id'}] do nawigacji.
+        """
+        start_time = time.time()
+        self.texts = texts
+        self.terms: List[List[str]] = []
+        self.spans: List[List[Tuple[int, int]]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.vocabulary = FuzzyVocabulary()
+        for block, text in enumerate(texts):
+            words = list(WORD_PATTERN.finditer(text))
+            terms = [term(word.group()) for word in words]
+            self.terms.append(terms)
+            self.spans.append([word.span() for word in words])
+            for position, t in enumerate(terms):
+                self.postings[t].append((block, position))
+        for t in self.postings:
+            self.vocabulary.add(t)
+        self.sections = sections or []
+        self.section_titles = TitleIndex([section["name"] for section in self.sections])
+        self.build_seconds = time.time() - start_time
+        logger.info(f"Zbudowano indeks strony: {len(texts)} bloków, {len(self.postings)} rdzeni, "
+                    f"{len(self.sections)} sekcji w {self.build_seconds:.3f}s")
+
+    @classmethod
+    def from_text(cls, text: str, sections: Optional[List[Dict]] = None) -> "PageIndex":
+        """Buduje indeks z tekstu strony podzielonego na zdania."""
+        return cls([sentence for sentence in SENTENCE_PATTERN.split(text or "") if sentence.strip()], sections)
+
+    @classmethod
+    def from_page_data(cls, page_data: Dict) -> "PageIndex":
+        """Buduje indeks z danych strony (treść z 'content', sekcje z 'headings' i 'sections')."""
+        sections = [{"name": heading["text"], "id": ""}
+                    for heading in page_data.get("headings", []) if heading.get("text")]
+        sections += [{"name": section["name"], "id": section.get("id", "")}
+                     for section in page_data.get("sections", []) if section.get("name")]
+        return cls.from_text(page_data.get("content", {}).get("text", ""), sections)
+
+    def _snippet(self, block: int, start: int, end: int, context_chars: int = 60) -> str:
+        """Zwraca fragment bloku wokół znaków [start, end), ucięty na granicach słów."""
+        text = self.texts[block]
+        left = max(0, start - context_chars)
+        right = min(len(text), end + context_chars)
+        if left > 0:
+            space = text.find(" ", left, start)
+            left = space + 1 if space >= 0 else left
+        if right < len(text):
+            space = text.rfind(" ", end, right)
+            right = space if space >= 0 else right
+        return text[left:right].strip()
+
+    def _hit(self, block: int, position: int, length: int, exact: bool) -> Dict:
+        start = self.spans[block][position][0]
+        end = self.spans[block][position + length - 1][1]
+        snippet = self._snippet(block, start, end)
+        return {
+            "block": block,
+            "position": position,
+            "exact": exact,
+            "text": self.texts[block][start:end],
+            "snippet": snippet,
+            "anchor": {"id": "", "text": self.texts[block][start:end], "context": snippet},
+        }
+
+    def search(self, phrase: str, max_hits: int = 20) -> Dict:
+        """
+        Wyszukuje frazę (kolejne słowa w jednym bloku, dokładnie lub w przybliżeniu).
+
+        Returns:
+            {'query', 'count' (wszystkie trafienia), 'exact_count', 'hits'} - 'hits' to do max_hits
+            trafień w kolejności dokumentu: {'block', 'position', 'exact', 'text', 'snippet', 'anchor'}.
+        """
+        wanted = query_terms(phrase)
+        result = {"query": phrase, "count": 0, "exact_count": 0, "hits": []}
+        expansions = [self.vocabulary.expand(word) for word in wanted]
+        if not expansions or not all(expansions):
+            return result
+        # Kandydaci na początek frazy z pozycji najrzadszego słowa
+        pivot = min(range(len(expansions)),
+                    key=lambda i: sum(len(self.postings[candidate]) for candidate in expansions[i]))
+        matches = []
+        for candidate in expansions[pivot]:
+            for block, position in self.postings[candidate]:
+                start = position - pivot
+                terms = self.terms[block]
+                if start < 0 or start + len(expansions) > len(terms):
+                    continue
+                exact = True
+                for offset, expansion in enumerate(expansions):
+                    matched = expansion.get(terms[start + offset])
+                    if matched is None:
+                        break
+                    exact = exact and matched
+                else:
+                    matches.append((block, start, exact))
+        matches.sort()
+        result["count"] = len(matches)
+        result["exact_count"] = sum(1 for match in matches if match[2])
+        result["hits"] = [self._hit(block, start, len(expansions), exact) for block, start, exact in matches[:max_hits]]
+        return result
+
+    def find_section(self, name: str) -> Optional[Dict]:
+        """Zwraca sekcję lub nagłówek najlepiej pasujący do nazwy, z kotwicą do przewinięcia, lub None."""
+        best = self.section_titles.best(name)
+        if best is None:
+            return None
+        section = self.sections[best]
+        return {**section, "anchor": {"id": section["id"], "text": section["name"], "context": ""}}
+
+def scroll_to_anchor(page: Page, anchor: Dict) -> bool:
+    """Przewija stronę do kotwicy trafienia lub sekcji; zwraca False, jeśli nie znaleziono miejsca."""
+    try:
+        return bool(page.evaluate(SCROLL_TO_ANCHOR_SCRIPT, anchor))
+    except Exception as e:
+        logger.warning(f"Nie udało się przewinąć do fragmentu strony: {e}")
+        return False
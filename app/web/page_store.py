@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from utils.url_utils import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+class PageStore:
+    """Trwały, skompresowany magazyn danych scrapera (SQLite + zlib), współdzielony między sesjami."""
+
+    # Maksymalny wiek wpisu (w sekundach) dla wybranych domen; pozostałe używają default_max_age
+    DOMAIN_MAX_AGE = {
+        "google.com": 15 * 60,
+        "bing.com": 15 * 60,
+        "duckduckgo.com": 15 * 60,
+        "youtube.com": 60 * 60,
+        "wikipedia.org": 7 * 24 * 3600,
+    }
+
+    def __init__(self, db_path: str = "page_store.sqlite", max_bytes: int = 200 * 1024 * 1024,
+                 default_max_age: int = 24 * 3600, compression_level: int = 6):
+        """
+        Inicjalizuje magazyn stron.
+
+        Args:
+            db_path: Ścieżka do pliku bazy SQLite.
+            max_bytes: Maksymalny łączny rozmiar skompresowanych danych; po przekroczeniu usuwane są
+                najdawniej używane wpisy.
+            default_max_age: Domyślny czas świeżości wpisu w sekundach.
+            compression_level: Poziom kompresji zlib (1-9).
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.default_max_age = default_max_age
+        self.compression_level = compression_level
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self):
+        """Tworzy tabele: pages (URL -> hash treści) i blobs (hash treści -> skompresowane dane)."""
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    content_hash TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages(content_hash)")
+
+    @staticmethod
+    def content_hash(data: Dict) -> str:
+        """Zwraca hash SHA-256 zserializowanych danych strony."""
+        payload = json.dumps(dict(data), ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def max_age_for(self, url: str) -> int:
+        """Zwraca czas świeżości (w sekundach) dla domeny podanego URL."""
+        domain = urlparse(url).netloc.lower()
+        for suffix, max_age in self.DOMAIN_MAX_AGE.items():
+            if domain == suffix or domain.endswith("." + suffix):
+                return max_age
+        return self.default_max_age
+
+    def get(self, url: str) -> Optional[Tuple[Dict, bool]]:
+        """
+        Pobiera dane strony z magazynu.
+
+        Returns:
+            Krotka (dane, czy_świeże) lub None, jeśli strony nie ma w magazynie.
+        """
+        key = canonicalize_url(url)
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT b.data, p.fetched_at FROM pages p JOIN blobs b ON p.content_hash = b.content_hash "
+                    "WHERE p.url = ?", (key,)
+                ).fetchone()
+                if not row:
+                    return None
+                with self.conn:
+                    self.conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), key))
+            data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+            is_fresh = time.time() - row[1] <= self.max_age_for(key)
+            return data, is_fresh
+        except Exception as e:
+            logger.error(f"Błąd odczytu strony {url} z magazynu: {e}")
+            return None
+
+    def put(self, url: str, data: Dict) -> Optional[str]:
+        """Zapisuje dane strony i zwraca hash treści (identyczne treści są przechowywane raz)."""
+        if not data:
+            return None
+        key = canonicalize_url(url)
+        try:
+            # dict() wymusza ekstrakcję wszystkich pól danych leniwych (LazyPageData)
+            payload = json.dumps(dict(data), ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+            content_hash = hashlib.sha256(payload).hexdigest()
+            compressed = zlib.compress(payload, self.compression_level)
+            now = time.time()
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO blobs (content_hash, data, size) VALUES (?, ?, ?)",
+                    (content_hash, compressed, len(compressed))
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO pages (url, content_hash, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, content_hash, now, now)
+                )
+                self._delete_orphans()
+            self._evict()
+            return content_hash
+        except Exception as e:
+            logger.error(f"Błąd zapisu strony {url} do magazynu: {e}")
+            return None
+
+    def get_hash(self, url: str) -> Optional[str]:
+        """Zwraca hash treści zapisanej dla URL."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash FROM pages WHERE url = ?", (canonicalize_url(url),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, url: str) -> None:
+        """Usuwa stronę z magazynu."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM pages WHERE url = ?", (canonicalize_url(url),))
+            self._delete_orphans()
+
+    def _delete_orphans(self):
+        """Usuwa dane, do których nie odwołuje się już żaden URL (wywoływać pod blokadą)."""
+        self.conn.execute("DELETE FROM blobs WHERE content_hash NOT IN (SELECT content_hash FROM pages)")
+
+    def _evict(self):
+        """Usuwa najdawniej używane strony, dopóki rozmiar magazynu przekracza max_bytes."""
+        with self.lock, self.conn:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self.conn.execute(
+                "SELECT p.url, p.content_hash, b.size FROM pages p JOIN blobs b ON p.content_hash = b.content_hash "
+                "ORDER BY p.accessed_at ASC"
+            ).fetchall()
+            refcounts: Dict[str, int] = {}
+            for _, content_hash, _ in rows:
+                refcounts[content_hash] = refcounts.get(content_hash, 0) + 1
+            evicted = 0
+            for url, content_hash, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                refcounts[content_hash] -= 1
+                if refcounts[content_hash] == 0:
+                    total -= size
+                evicted += 1
+            self._delete_orphans()
+        logger.info(f"Usunięto {evicted} stron z magazynu (limit {self.max_bytes} B)")
+
+    def stats(self) -> Dict:
+        """Zwraca statystyki magazynu: liczbę stron, unikalnych treści i rozmiar w bajtach."""
+        with self.lock:
+            pages = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"pages": pages, "unique_contents": blobs, "bytes": size}
+
+    def close(self):
+        """Zamyka połączenie z bazą."""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,290 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+# Tryby pracy: passthrough (bez przechwytywania), record (sieć + zapis), replay (tylko z dysku),
+# cache (odpowiedzi świeże według polityki z dysku, pozostałe z sieci z zapisem)
+MODES = ("passthrough", "record", "replay", "cache")
+
+# Parametry zapytań dodawane tylko po to, by ominąć cache; pomijane w kluczu odpowiedzi
+CACHE_BUSTING_PARAMS = {"_", "cb", "cachebust", "nocache", "rnd", "rand", "random", "t", "ts", "timestamp"}
+
+# Nagłówki opisujące kodowanie transferu (treść w magazynie jest już zdekodowana)
+HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+@dataclass
+class ResourcePolicy:
+    """Polityka przechowywania odpowiedzi jednego typu zasobu."""
+    store: bool = True
+    max_age: int = 0                    # Świeżość w trybie cache (s); 0 = zawsze z sieci, zapis tylko dla replay
+    max_bytes: int = 10 * 1024 * 1024   # Większe odpowiedzi nie są zapisywane
+
+DEFAULT_POLICIES: Dict[str, ResourcePolicy] = {
+    "document": ResourcePolicy(max_age=0),
+    "stylesheet": ResourcePolicy(max_age=7 * 24 * 3600),
+    "script": ResourcePolicy(max_age=7 * 24 * 3600),
+    "font": ResourcePolicy(max_age=30 * 24 * 3600),
+    "image": ResourcePolicy(max_age=7 * 24 * 3600, max_bytes=5 * 1024 * 1024),
+    "xhr": ResourcePolicy(max_age=0, max_bytes=2 * 1024 * 1024),
+    "fetch": ResourcePolicy(max_age=0, max_bytes=2 * 1024 * 1024),
+    "media": ResourcePolicy(store=False),
+    "websocket": ResourcePolicy(store=False),
+    "eventsource": ResourcePolicy(store=False),
+    "other": ResourcePolicy(max_age=0, max_bytes=1024 * 1024),
+}
+
+class ResponseCache:
+    """
+    Sieciowa pamięć podręczna odpowiedzi oparta na przechwytywaniu żądań Playwright (route).
+
+    W trybie record odpowiedzi (jak w nagraniu HAR) są zapisywane do magazynu na dysku, w którym
+    treści są adresowane hashem (identyczne pliki z różnych URL są zapisane raz), a indeks żądań
+    jest w SQLite. Tryb replay obsługuje żądania wyłącznie z magazynu, bez sieci, więc scraping
+    jest powtarzalny; tryb cache serwuje z dysku odpowiedzi świeże według polityki typu zasobu,
+    skracając ponowne wizyty. Obsługiwane są tylko żądania GET.
+
+    Przechwytywanie żądań wyłącza własną pamięć podręczną HTTP przeglądarki, dlatego tryb
+    passthrough nie rejestruje handlera.
+    """
+
+    def __init__(self, root: str = "response_cache", mode: str = "cache",
+                 policies: Optional[Dict[str, ResourcePolicy]] = None, max_bytes: int = 1024 * 1024 * 1024,
+                 replay_fallback_network: bool = False):
+        """
+        Args:
+            root: Katalog magazynu (indeks SQLite i katalog objects z treściami).
+            mode: Tryb pracy: passthrough, record, replay lub cache.
+            policies: Polityki per typ zasobu (brakujące typy używają polityki 'other').
+            max_bytes: Maksymalny łączny rozmiar treści; po przekroczeniu usuwane są najdawniej używane.
+            replay_fallback_network: Czy w trybie replay brakujące odpowiedzi pobierać z sieci
+                (domyślnie są blokowane, aby przebieg był w pełni offline).
+        """
+        if mode not in MODES:
+            raise ValueError(f"Nieznany tryb pamięci odpowiedzi: {mode}")
+        self.root = root
+        self.mode = mode
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.max_bytes = max_bytes
+        self.replay_fallback_network = replay_fallback_network
+        self.objects_dir = os.path.join(root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._init_schema()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "network": 0, "blocked": 0,
+                      "bytes_served": 0, "bytes_stored": 0}
+
+    def _init_schema(self):
+        """Tworzy tabelę responses (klucz żądania -> status, nagłówki i hash treści)."""
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    resource_type TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_hash ON responses(body_hash)")
+
+    @staticmethod
+    def request_key(method: str, url: str) -> str:
+        """Zwraca klucz żądania: metoda i URL bez fragmentu i parametrów omijających cache."""
+        parsed = urlparse(url)
+        query = urlencode([(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                           if k.lower() not in CACHE_BUSTING_PARAMS])
+        return f"{method.upper()} {urlunparse(parsed._replace(query=query, fragment=''))}"
+
+    def policy_for(self, resource_type: str) -> ResourcePolicy:
+        return self.policies.get(resource_type, self.policies["other"])
+
+    def _object_path(self, body_hash: str) -> str:
+        return os.path.join(self.objects_dir, body_hash[:2], body_hash)
+
+    def lookup(self, method: str, url: str) -> Optional[Dict]:
+        """Zwraca zapisaną odpowiedź (status, nagłówki, treść, wiek) lub None."""
+        key = self.request_key(method, url)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, headers, body_hash, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                with self.conn:
+                    self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        if not row:
+            return None
+        try:
+            with open(self._object_path(row[2]), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        return {"status": row[0], "headers": json.loads(row[1]), "body": body, "age": time.time() - row[3]}
+
+    def store(self, method: str, url: str, resource_type: str, status: int, headers: Dict[str, str],
+              body: bytes) -> None:
+        """Zapisuje odpowiedź (treść pod swoim hashem; identyczna treść jest zapisywana raz)."""
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._object_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        headers = {k: v for k, v in headers.items() if k.lower() not in HOP_HEADERS}
+        key = self.request_key(method, url)
+        now = time.time()
+        with self.lock, self.conn:
+            previous = self.conn.execute("SELECT body_hash FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, resource_type, status, headers, body_hash, size, "
+                "stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, resource_type, status, json.dumps(headers), body_hash, len(body), now, now)
+            )
+            orphan = previous and previous[0] != body_hash and not self.conn.execute(
+                "SELECT 1 FROM responses WHERE body_hash = ? LIMIT 1", (previous[0],)).fetchone()
+        if orphan:
+            # Poprzednia treść tego żądania nie jest już używana przez żaden wpis
+            try:
+                os.remove(self._object_path(previous[0]))
+            except OSError:
+                pass
+        self.stats["stored"] += 1
+        self.stats["bytes_stored"] += len(body)
+
+    def _should_store(self, method: str, resource_type: str, headers: Dict[str, str], body: bytes) -> bool:
+        policy = self.policy_for(resource_type)
+        if method != "GET" or not policy.store or len(body) > policy.max_bytes:
+            return False
+        # Nagrywanie zapisuje wszystko (powtarzalny replay); tryb cache szanuje no-store
+        if self.mode == "cache":
+            if policy.max_age <= 0:
+                return False
+            cache_control = next((v for k, v in headers.items() if k.lower() == "cache-control"), "")
+            return "no-store" not in cache_control.lower()
+        return True
+
+    def _serve(self, route, cached: Dict) -> None:
+        self.stats["hits"] += 1
+        self.stats["bytes_served"] += len(cached["body"])
+        route.fulfill(status=cached["status"], headers=cached["headers"], body=cached["body"])
+
+    def _fetch_and_store(self, route, request) -> None:
+        """Pobiera odpowiedź z sieci (bez podążania za przekierowaniami), zapisuje ją i zwraca karcie."""
+        self.stats["network"] += 1
+        response = route.fetch(max_redirects=0)
+        body = response.body()
+        if self._should_store(request.method, request.resource_type, response.headers, body):
+            try:
+                self.store(request.method, request.url, request.resource_type, response.status,
+                           response.headers, body)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Nie udało się zapisać odpowiedzi {request.url[:80]}: {e}")
+        route.fulfill(response=response, body=body)
+
+    def handle(self, route) -> None:
+        """Handler przechwytywania żądań Playwright (context.route("**/*", cache.handle))."""
+        request = route.request
+        try:
+            if request.method != "GET" or not request.url.startswith(("http://", "https://")):
+                if self.mode == "replay" and not self.replay_fallback_network:
+                    self.stats["blocked"] += 1
+                    route.abort("blockedbyclient")
+                else:
+                    route.continue_()
+                return
+            if self.mode == "replay":
+                cached = self.lookup(request.method, request.url)
+                if cached:
+                    self._serve(route, cached)
+                    return
+                self.stats["misses"] += 1
+                if self.replay_fallback_network:
+                    self._fetch_and_store(route, request)
+                else:
+                    self.stats["blocked"] += 1
+                    route.abort("internetdisconnected")
+                return
+            if self.mode == "cache":
+                policy = self.policy_for(request.resource_type)
+                cached = self.lookup(request.method, request.url) if policy.store and policy.max_age > 0 else None
+                if cached and cached["age"] <= policy.max_age:
+                    self._serve(route, cached)
+                    return
+                self.stats["misses"] += 1
+                if not policy.store or policy.max_age <= 0:
+                    route.continue_()
+                    return
+            self._fetch_and_store(route, request)
+        except Exception as e:
+            logger.warning(f"Błąd obsługi żądania {request.url[:80]} przez pamięć odpowiedzi: {e}")
+            try:
+                route.continue_()
+            except Exception:
+                pass
+
+    def attach(self, context) -> None:
+        """Włącza przechwytywanie żądań w kontekście przeglądarki (w trybie passthrough nic nie robi)."""
+        if self.mode != "passthrough":
+            context.route("**/*", self.handle)
+
+    def evict(self) -> None:
+        """Usuwa najdawniej używane odpowiedzi, dopóki rozmiar treści przekracza max_bytes."""
+        with self.lock, self.conn:
+            total = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM responses)"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self.conn.execute(
+                "SELECT key, body_hash, size FROM responses ORDER BY accessed_at ASC"
+            ).fetchall()
+            refcounts: Dict[str, int] = {}
+            for _, body_hash, _ in rows:
+                refcounts[body_hash] = refcounts.get(body_hash, 0) + 1
+            removed = []
+            for key, body_hash, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                refcounts[body_hash] -= 1
+                if refcounts[body_hash] == 0:
+                    total -= size
+                    removed.append(body_hash)
+        for body_hash in removed:
+            try:
+                os.remove(self._object_path(body_hash))
+            except OSError:
+                pass
+        logger.info(f"Usunięto {len(removed)} treści z pamięci odpowiedzi (limit {self.max_bytes} B)")
+
+    def summary(self) -> Dict:
+        """Zwraca liczbę zapisanych odpowiedzi, unikalnych treści, ich rozmiar i statystyki sesji."""
+        with self.lock:
+            responses = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            objects, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM responses)"
+            ).fetchone()
+        return {"mode": self.mode, "responses": responses, "objects": objects, "bytes": size, **self.stats}
+
+    def close(self):
+        """Przycina magazyn do limitu i zamyka indeks."""
+        self.evict()
+        with self.lock:
+            self.conn.close()
@@ -1,27 +1,140 @@
+import copy
 import json
 import logging
+import os
 import re
+import sys
+import time
+from dataclasses import dataclass
 from urllib.parse import urlparse, urljoin
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from readability import Document
 from bs4 import BeautifulSoup, Tag, NavigableString
 from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
-from utils.url_utils import clean_text, normalize_url, validate_url
+from utils.url_utils import canonicalize_url, clean_text, normalize_url, validate_url
+from web.dom_tracker import DomTracker
+from web.extraction_profiles import ExtractionProfiles, css_path, template_fingerprint
+from web.boilerplate import BoilerplateModel
+from web.structured_data import extract_structured_data
+from web.image_source import BrowserImageSource
+from web.page_data import LazyPageData
+from web.settle import NavigationSettler, SettleTimings
+from web.element_index import ElementIndex
+from web.search_results import SEARCH_ENGINE_SELECTORS
 
 logger = logging.getLogger(__name__)
 
+# Skrypt przycinający dokument po stronie przeglądarki: usuwa regiony niebędące treścią i serializuje
+# body w granicach budżetu znaków (za duże poddrzewa są rozbijane na dzieci zamiast wczytywane w całości).
+PRUNE_SCRIPT = """
+(maxChars) => {
+    const PRUNE = 'script:not([type="application/ld+json"]), style, noscript, svg, iframe, template, canvas, ' +
+        'video, audio, object, embed, nav, footer, aside, [role="navigation"], [role="contentinfo"], ' +
+        '[aria-hidden="true"], [hidden]';
+    const stats = {prunedNodes: 0, droppedNodes: 0, elementCount: document.getElementsByTagName('*').length};
+    let budget = maxChars;
+
+    const serialize = (el) => {
+        if (el.matches && el.matches(PRUNE)) { stats.prunedNodes++; return ''; }
+        const copy = el.cloneNode(true);
+        copy.querySelectorAll(PRUNE).forEach(node => { node.remove(); stats.prunedNodes++; });
+        const html = copy.outerHTML;
+        if (html.length <= budget) { budget -= html.length; return html; }
+        if (!el.children.length) { stats.droppedNodes++; return ''; }
+        const shallow = el.cloneNode(false).outerHTML;
+        const closeTag = `</${el.tagName.toLowerCase()}>`;
+        const openTag = shallow.endsWith(closeTag) ? shallow.slice(0, -closeTag.length) : shallow;
+        budget -= openTag.length + closeTag.length;
+        let inner = '';
+        for (const child of el.children) {
+            if (budget <= 0) { stats.droppedNodes++; continue; }
+            inner += serialize(child);
+        }
+        return openTag + inner + closeTag;
+    };
+
+    const head = [...(document.head ? document.head.children : [])]
+        .filter(el => el.matches('title, meta, link[rel="canonical"], script[type="application/ld+json"]'))
+        .map(el => el.outerHTML).join('');
+    const body = document.body ? [...document.body.children].map(serialize).join('') : '';
+    const lang = document.documentElement.lang || '';
+    return {html: `<html lang="${lang}"><head>${head}</head><body>${body}</body></html>`, ...stats};
+}
+"""
+
+def current_rss_mb() -> float:
+    """Zwraca bieżące zużycie pamięci RSS procesu w MB (0.0, jeśli pomiar jest niedostępny)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return 0.0
+
+@dataclass
+class ScrapeLimits:
+    """Limity trybu ograniczonej pamięci dla bardzo dużych stron."""
+    max_html_chars: int = 2_000_000   # Maksymalny rozmiar przyciętego HTML
+    max_text_chars: int = 100_000     # Maksymalna długość content['text']
+    max_paragraphs: int = 500
+    max_links: int = 300
+    max_lists: int = 100
+    max_list_items: int = 50
+    max_headings: int = 300
+    max_images: int = 100
+    max_sections: int = 200
+    max_rss_mb: float = 1024.0        # Pułap RSS procesu; budżet HTML jest do niego dopasowywany
+    parse_overhead: int = 12          # Przybliżony narzut pamięci drzewa BeautifulSoup względem rozmiaru HTML
+
 class WebScraper:
     """Scraper internetowy zoptymalizowany dla asystenta głosowego, ekstrakcji wyników wyszukiwania i dostępności."""
 
-    def __init__(self, page: Page):
+    def __init__(self, page: Page, dump_path: Optional[str] = None, limits: Optional[ScrapeLimits] = None,
+                 profiles: Optional[ExtractionProfiles] = None, boilerplate: Optional[BoilerplateModel] = None,
+                 timings: Optional[SettleTimings] = None):
         """
         Inicjalizuje scraper z istniejącym obiektem Page z Playwright (z BrowserManager).
         
         Args:
-            page: Obiekt Playwright Page do renderowania i scrapowania.
+            page: Obiekt Playwright Page do renderowania i scrapowania; None dla scrapera używanego tylko
+                do ekstrakcji z gotowego HTML (parse_html, np. w crawlerze witryn).
+            dump_path: Opcjonalna ścieżka pliku JSON, do którego zapisywane są pełne dane każdej strony
+                (do debugowania; wymusza ekstrakcję wszystkich pól).
+            limits: Limity trybu ograniczonej pamięci (przycinanie dokumentu w przeglądarce i limity pól);
+                None oznacza pełny scraping.
+            profiles: Profile ekstrakcji domen (zapamiętany węzeł głównej treści dla szablonu strony).
+            boilerplate: Model szablonu witryny; powtarzające się między stronami bloki są usuwane z 'content'.
+            timings: Współdzielone per-domenowe czasy gotowości stron (do wykrywania końca nawigacji).
         """
         self.page = page
-        self.page.route("**/*", self._intercept_route)
+        self.dump_path = dump_path
+        self.limits = limits
+        self.profiles = profiles
+        self.boilerplate = boilerplate
+        self.tracker = None
+        self.images = None
+        self.settle = None
+        self.elements = None
+        if page is not None:
+            self.page.route("**/*", self._intercept_route)
+            self.tracker = DomTracker(page)
+            self.tracker.install()
+            # Koniec nawigacji wykrywany zdarzeniami karty, ciszą sieci i DOM (zamiast stałych oczekiwań)
+            self.settle = NavigationSettler(page, timings)
+            # Linki i przyciski ze stałą numeracją wspólną dla odczytu i komend kliknięcia
+            self.elements = ElementIndex(page)
+            # Obrazy pobrane przez kartę (do opisu bez ponownego pobierania)
+            self.images = BrowserImageSource(page)
         self.user_agent = (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
             "(KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36 WebAssistBot/1.0"
@@ -34,16 +147,20 @@ class WebScraper:
         else:
             route.continue_()
 
-    def scrape_page(self, url: Optional[str] = None) -> Optional[Dict]:
+    def scrape_page(self, url: Optional[str] = None) -> Optional[LazyPageData]:
         """
-        Scrapuje stronę i zwraca strukturalne dane: nagłówki, wyniki wyszukiwania, treść, obrazy, linki, sekcje i formularze.
+        Scrapuje stronę i zwraca strukturalne dane: nagłówki, wyniki wyszukiwania, treść, dane strukturalne
+        (schema.org), obrazy, linki, sekcje i formularze.
+
+        Od razu pobierany jest tylko HTML i metadane; pozostałe pola są ekstrahowane przy pierwszym
+        dostępie (ze wspólnego drzewa BeautifulSoup) i zapamiętywane.
         
         Args:
             url: URL strony do scrapowania (opcjonalny, używa page.url jeśli brak).
 
         Returns:
-            Dict zawierający metadane, nagłówki, wyniki wyszukiwania, treść, obrazy, linki, sekcje i formularze,
-            lub None w przypadku błędu.
+            Dane (LazyPageData, dostęp jak do dict) zawierające metadane, nagłówki, wyniki wyszukiwania, treść,
+            dane strukturalne, obrazy, linki, sekcje i formularze, lub None w przypadku błędu.
         """
         if not url:
             url = self.page.url
@@ -52,34 +169,34 @@ class WebScraper:
             return None
 
         try:
-            # 1. Załaduj stronę, jeśli URL różni się od aktualnego
-            if url != self.page.url:
-                self.page.goto(url, wait_until="commit", timeout=20000)
-                self.page.wait_for_load_state("domcontentloaded", timeout=15000)
-                self.page.wait_for_selector("body:not(:empty)", timeout=10000)
+            # 1. Załaduj stronę, jeśli karta nie jest już na tym URL (także po przekierowaniu z niego)
+            if canonicalize_url(url) not in (canonicalize_url(self.page.url), self.settle.last_target):
+                self.settle.goto(url)
             print(f"Scrapowanie strony: {url}")
 
-            # 2. Pobierz HTML strony
-            html_content = self.page.content()
-            soup = BeautifulSoup(html_content, "html.parser")
-            
-            data = {
-                "metadata": {
-                    "title": self.page.title(),
-                    "url": self.page.url,
-                    "language": self.page.evaluate("document.documentElement.lang || 'pl'")
-                },
-                "headings": self._extract_headings(soup),
-                "search_results": self._extract_search_results(soup),
-                "content": self._extract_content(soup),
-                "images": self._extract_images(soup),
-                "links": self._extract_links(soup),
-                "sections": self._extract_sections(soup),
-                "forms": self._extract_forms(soup)
+            # 2. Pobierz HTML strony i metadane (parsowanie i ekstrakcja pól następują leniwie)
+            start_time = time.time()
+            rss_start = current_rss_mb()
+            html_content, pruning = self._snapshot_html(rss_start)
+            metadata = {
+                "title": self.page.title(),
+                "url": self.page.url,
+                "language": self.page.evaluate("document.documentElement.lang") or "",
+                # Skrót DOM; śledzenie zmian jest zerowane, by kolejne zmiany liczyć względem tego scrapingu
+                "dom_hash": self.tracker.dom_hash()
             }
-
-            with open('output.json', 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+            self.tracker.reset()
+            if self.limits:
+                metadata["pruning"] = pruning
+                metadata["truncated"] = {}
+                metadata["peak_rss_mb"] = max(rss_start, current_rss_mb())
+            data = self._lazy_page_data(html_content, metadata)
+            del html_content
+            print(f"Migawka strony gotowa w {time.time() - start_time:.3f}s")
+
+            if self.dump_path:
+                with open(self.dump_path, 'w', encoding='utf-8') as f:
+                    json.dump(data.to_dict(), f, ensure_ascii=False, indent=4)
             return data
         except PlaywrightTimeoutError as e:
             logger.error(f"Przekroczono limit czasu podczas scrapowania {url}: {e}")
@@ -88,6 +205,243 @@ class WebScraper:
             logger.exception(f"Krytyczny błąd podczas scrapowania {url}: {e}")
             return None
 
+    def parse_html(self, html_content: str, url: str, title: str = "", language: str = "") -> LazyPageData:
+        """
+        Zwraca leniwe dane strony dla gotowego HTML (bez karty przeglądarki), np. pobranego przez crawler.
+
+        Obrazy są ekstrahowane tylko z HTML (bez odczytu DOM karty).
+        """
+        metadata = {"title": title, "url": url, "language": language, "dom_hash": None}
+        return self._lazy_page_data(html_content, metadata)
+
+    def _snapshot_html(self, rss_now: Optional[float] = None) -> Tuple[str, Optional[Dict]]:
+        """Zwraca HTML bieżącego dokumentu: przycięty w trybie ograniczonej pamięci, inaczej pełny."""
+        if self.limits:
+            return self._fetch_pruned_html(current_rss_mb() if rss_now is None else rss_now)
+        return self.page.content(), None
+
+    def _fetch_pruned_html(self, rss_now: float) -> Tuple[str, Dict]:
+        """
+        Pobiera przycięty HTML (bez skryptów, stylów, nawigacji, stopek itp.) w granicach budżetu znaków.
+
+        Budżet to mniejsza z wartości max_html_chars i zapasu pamięci do pułapu max_rss_mb
+        (z uwzględnieniem narzutu drzewa BeautifulSoup).
+        """
+        limits = self.limits
+        headroom = max(0.0, limits.max_rss_mb - rss_now) * 1024 * 1024 / max(1, limits.parse_overhead)
+        budget = int(max(100_000, min(limits.max_html_chars, headroom)))
+        result = self.page.evaluate(PRUNE_SCRIPT, budget)
+        html_content = result.pop("html")
+        result["budget_chars"] = budget
+        result["html_chars"] = len(html_content)
+        logger.info(
+            f"Przycięto dokument: {result['prunedNodes']} usuniętych regionów, {result['droppedNodes']} "
+            f"pominiętych węzłów (budżet), {len(html_content)} znaków HTML"
+        )
+        return html_content, result
+
+    def _lazy_page_data(self, html_content: str, metadata: Dict, values: Optional[Dict] = None) -> LazyPageData:
+        """Tworzy leniwe dane strony; HTML jest parsowany raz, przy pierwszym polu, które go wymaga."""
+        base_url = metadata["url"]
+        language = metadata.get("language") or None
+        values = dict(values or {})
+        values.setdefault("metadata", {**metadata, "language": metadata.get("language") or "pl"})
+        page_metadata = values["metadata"]
+        # HTML i drzewo są trzymane tylko w source, które LazyPageData zwalnia po ekstrakcji wszystkich pól
+        source = {"html": html_content, "size": len(html_content)}
+        del html_content
+        parse_overhead = self.limits.parse_overhead if self.limits else ScrapeLimits.parse_overhead
+
+        def soup() -> BeautifulSoup:
+            if "soup" not in source:
+                start_time = time.time()
+                html = source["html"]
+                source["soup"] = BeautifulSoup(html, "html.parser")
+                source["size"] = len(html) * (1 + parse_overhead)
+                print(f"Parsowanie HTML ({len(html)} znaków) w {time.time() - start_time:.3f}s")
+                if self.limits:
+                    self._record_rss(page_metadata)
+            return source["soup"]
+
+        def structured() -> Dict:
+            if "structured" not in source:
+                source["structured"] = extract_structured_data(soup())
+            return source["structured"]
+
+        def content() -> Dict:
+            extracted = self._extract_content(soup(), base_url, language, source["html"])
+            # Fakty z danych strukturalnych (JSON-LD, microdata, OpenGraph) dla szybkich odpowiedzi
+            extracted["facts"] = structured()["facts"]
+            return self._strip_boilerplate(base_url, extracted)
+
+        extractors = {
+            "headings": lambda: self._extract_headings(soup()),
+            "search_results": lambda: self._extract_search_results(soup(), base_url),
+            "content": content,
+            "structured_data": structured,
+            "images": lambda: self._extract_images(soup(), base_url),
+            "links": lambda: self._extract_links(soup(), base_url),
+            "sections": lambda: self._extract_sections(soup()),
+            "forms": lambda: self._extract_forms(soup())
+        }
+        if self.limits:
+            extractors = {key: self._bounded(key, extractor, page_metadata) for key, extractor in extractors.items()}
+        return LazyPageData(extractors, values, source)
+
+    def _strip_boilerplate(self, url: str, content: Dict) -> Dict:
+        """Usuwa z treści bloki szablonu witryny (menu, stopki, banery), jeśli model jest dostępny."""
+        if not self.boilerplate:
+            return content
+        return self.boilerplate.process(url, content)
+
+    def _record_rss(self, metadata: Dict) -> None:
+        """Aktualizuje szczytowe RSS scrapingu w metadanych i ostrzega po przekroczeniu pułapu."""
+        rss = current_rss_mb()
+        metadata["peak_rss_mb"] = max(metadata.get("peak_rss_mb", 0.0), rss)
+        if rss > self.limits.max_rss_mb:
+            logger.warning(f"RSS {rss:.0f} MB przekracza pułap {self.limits.max_rss_mb:.0f} MB ({metadata.get('url')})")
+
+    def _bounded(self, key: str, extractor: Callable, metadata: Dict) -> Callable:
+        """Opakowuje ekstraktor pola limitami rozmiaru i pomiarem szczytowego RSS."""
+        def run():
+            value = self._apply_limits(key, extractor(), metadata.setdefault("truncated", {}))
+            self._record_rss(metadata)
+            print(f"Szczytowe RSS scrapingu: {metadata['peak_rss_mb']:.1f} MB")
+            return value
+        return run
+
+    def _apply_limits(self, key: str, value, truncated: Dict):
+        """Przycina pole do limitów ScrapeLimits; liczby pominiętych elementów trafiają do 'truncated'."""
+        limits = self.limits
+
+        def cap(name: str, items: List, limit: int) -> List:
+            if len(items) > limit:
+                truncated[name] = truncated.get(name, 0) + len(items) - limit
+                return items[:limit]
+            return items
+
+        if key in ("links", "headings", "images", "sections") and isinstance(value, list):
+            limit = {"links": limits.max_links, "headings": limits.max_headings,
+                     "images": limits.max_images, "sections": limits.max_sections}[key]
+            return cap(key, value, limit)
+        if key == "content" and isinstance(value, dict):
+            text = value.get("text", "")
+            if len(text) > limits.max_text_chars:
+                truncated["text_chars"] = len(text) - limits.max_text_chars
+                cut = text.rfind(" ", 0, limits.max_text_chars)
+                value["text"] = text[:cut if cut > 0 else limits.max_text_chars] + " [...]"
+            value["paragraphs"] = cap("paragraphs", value.get("paragraphs", []), limits.max_paragraphs)
+            value["links"] = cap("content_links", value.get("links", []), limits.max_links)
+            value["headings"] = cap("content_headings", value.get("headings", []), limits.max_headings)
+            for list_type, lists in value.get("lists", {}).items():
+                lists = cap("lists", lists, limits.max_lists)
+                for i, items in enumerate(lists):
+                    if len(items) > limits.max_list_items:
+                        skipped = len(items) - limits.max_list_items
+                        truncated["list_items"] = truncated.get("list_items", 0) + skipped
+                        lists[i] = items[:limits.max_list_items] + [f"[... pominięto {skipped} pozycji]"]
+                value["lists"][list_type] = lists
+            value["truncated"] = {k: v for k, v in truncated.items()}
+        return value
+
+    def update_page_data(self, previous: Dict) -> Optional[Tuple[Dict, Dict]]:
+        """
+        Aktualizuje dane strony na podstawie zmian DOM zapisanych od ostatniego scrapingu.
+
+        Ponownie ekstrahowane są tylko zmienione poddrzewa; nowe paragrafy, listy, nagłówki, linki,
+        obrazy i formularze są dołączane do kopii poprzednich danych.
+
+        Args:
+            previous: Dane zwrócone wcześniej przez scrape_page dla bieżącej strony.
+
+        Returns:
+            Krotka (zaktualizowane dane, delta treści w formacie 'content') lub None, jeśli zmiany
+            wymagają pełnego scrapingu (nowy dokument, usunięta treść, zbyt duże zmiany).
+        """
+        changes = self.tracker.take_changes()
+        if not changes or changes["full"] or not previous:
+            return None
+        if isinstance(previous, LazyPageData):
+            if not previous.is_loaded("content"):
+                return None
+            # Pola wyekstrahowane są aktualizowane deltą; pozostałe zostaną wyekstrahowane leniwie
+            # z bieżącego HTML, który już zawiera zmiany
+            values = copy.deepcopy(previous.materialized())
+            if len(values) < len(previous):
+                data = self._lazy_page_data(self._snapshot_html()[0], values["metadata"], values)
+            else:
+                data = LazyPageData({}, values)
+            loaded = data.is_loaded
+        else:
+            data = copy.deepcopy(previous)
+            loaded = lambda key: True
+        data["metadata"]["dom_hash"] = self.tracker.dom_hash()
+        delta = {"text": "", "paragraphs": [], "headings": [], "links": [], "lists": {'ordered': [], 'unordered': []}}
+        if not changes["fragments"]:
+            return data, delta
+
+        fragment_soup = BeautifulSoup("<div>" + "".join(changes["fragments"]) + "</div>", "html.parser")
+        collected = self._collect_content(fragment_soup)
+        content = data.setdefault("content", {})
+
+        known_paragraphs = set(content.get("paragraphs", []))
+        delta["paragraphs"] = [p for p in dict.fromkeys(collected["paragraphs"]) if p not in known_paragraphs]
+        known_headings = {h["text"] for h in content.get("headings", [])}
+        delta["headings"] = [h for h in collected["headings"] if h["text"] not in known_headings]
+        known_links = {l["url"] for l in content.get("links", [])}
+        delta["links"] = [l for l in collected["links"] if l["url"] not in known_links]
+        known_lists = {tuple(items) for lists in content.get("lists", {}).values() for items in lists}
+        for list_type, lists in collected["lists"].items():
+            delta["lists"][list_type] = [items for items in lists if tuple(items) not in known_lists]
+        text = content.get("text", "")
+        new_parts = [part for part in dict.fromkeys(collected["text_parts"]) if part not in text]
+        delta["text"] = clean_text(' '.join(new_parts))
+
+        content.setdefault("paragraphs", []).extend(delta["paragraphs"])
+        content.setdefault("headings", []).extend(delta["headings"])
+        content.setdefault("links", []).extend(delta["links"])
+        for list_type, lists in delta["lists"].items():
+            content.setdefault("lists", {}).setdefault(list_type, []).extend(lists)
+        if delta["text"]:
+            text = clean_text(f"{text} {delta['text']}")
+            content["text"] = text
+            content["length"] = len(text)
+            content["word_count"] = len(text.split())
+            content["sentence_count"] = len(re.split(r'[.!?]+', text)) - 1
+
+        if loaded("headings"):
+            data.setdefault("headings", []).extend(
+                {"level": h["level"], "text": h["text"], "aria_label": h["aria_label"]} for h in delta["headings"]
+            )
+        if loaded("links"):
+            known_page_links = {l["url"] for l in data.get("links", [])}
+            data.setdefault("links", []).extend(l for l in delta["links"] if l["url"] not in known_page_links)
+        if loaded("images"):
+            known_srcs = {img["src"] for img in data.get("images", [])}
+            for img in fragment_soup.find_all("img", src=True):
+                src = normalize_url(img["src"], base_url=self.page.url)
+                if src and validate_url(src) and src not in known_srcs:
+                    known_srcs.add(src)
+                    alt = clean_text(img.get("alt", ""))
+                    data.setdefault("images", []).append({"src": src, "alt": alt, "is_meaningful_alt": len(alt) > 20})
+        if loaded("sections"):
+            known_sections = {(sec["name"], sec["id"]) for sec in data.get("sections", [])}
+            data.setdefault("sections", []).extend(
+                sec for sec in self._extract_sections(fragment_soup) if (sec["name"], sec["id"]) not in known_sections
+            )
+        if loaded("forms"):
+            form_key = lambda form: (form["action"], tuple(f["name"] for f in form["fields"]))
+            known_forms = {form_key(form) for form in data.get("forms", [])}
+            data.setdefault("forms", []).extend(
+                form for form in self._extract_forms(fragment_soup) if form_key(form) not in known_forms
+            )
+
+        logger.info(
+            f"Delta DOM: {len(changes['fragments'])} fragmentów, {len(delta['paragraphs'])} paragrafów, "
+            f"{len(delta['links'])} linków, {len(delta['text'])} znaków tekstu"
+        )
+        return data, delta
+
     def _extract_headings(self, soup: BeautifulSoup) -> List[Dict]:
         """Ekstrahuje nagłówki (<h1>-<h6>) z strony, w tym atrybuty ARIA."""
         headings = []
@@ -110,31 +464,14 @@ class WebScraper:
         logger.info(f"Znaleziono {len(headings)} nagłówków")
         return headings
 
-    def _extract_search_results(self, soup: BeautifulSoup) -> List[Dict]:
+    def _extract_search_results(self, soup: BeautifulSoup, base_url: Optional[str] = None) -> List[Dict]:
         """Ekstrahuje tytuły i opisy z wyników wyszukiwania z różnych wyszukiwarek."""
         results = []
-        parsed_url = urlparse(self.page.url)
+        base_url = base_url or self.page.url
+        parsed_url = urlparse(base_url)
         domain = parsed_url.netloc.lower()
 
-        search_engine_selectors = {
-            "google.com": {
-                "result": "div.tF2Cxc",
-                "title": "h3",
-                "link": "a"
-            },
-            "bing.com": {
-                "result": "li.b_algo",
-                "title": "h2",
-                "link": "a"
-            },
-            "duckduckgo.com": {
-                "result": "div.result",
-                "title": "a.result__a",
-                "link": "a.result__a"
-            }
-        }
-
-        for engine, selectors in search_engine_selectors.items():
+        for engine, selectors in SEARCH_ENGINE_SELECTORS.items():
             if engine in domain:
                 result_elements = soup.select(selectors["result"])
                 for index, result in enumerate(result_elements[:10], 1):
@@ -146,32 +483,101 @@ class WebScraper:
                         results.append({
                             "index": index,
                             "title": title,
-                            "url": normalize_url(url, base_url=self.page.url),
+                            "url": normalize_url(url, base_url=base_url),
                         })
                 break
         logger.info(f"Znaleziono {len(results)} wyników wyszukiwania")
         return results
 
-    def _extract_content(self, soup: BeautifulSoup) -> Dict:
+    @staticmethod
+    def _is_visible(tag: Tag) -> bool:
+        """Sprawdza, czy element jest widoczną treścią (nie ukryty, nie skrypt, nie reklama)."""
+        if not tag or not isinstance(tag, Tag):
+            return False
+        # Check for hidden elements via style attributes
+        style = tag.attrs.get('style', '').replace(' ', '').lower()
+        hidden = ['display:none', 'visibility:hidden', 'opacity:0']
+        if any(h in style for h in hidden):
+            return False
+        # Exclude non-content tags
+        if tag.name in ['script', 'style', 'noscript', 'svg', 'meta', 'head']:
+            return False
+        # Exclude advertisement and category-related elements
+        ad_category_classes = ['ad', 'banner', 'sponsored', 'advertisement', 'category', 'tag', 'references', 'source']
+        class_list = tag.get('class', [])
+        if any(c in cls.lower() for cls in class_list for c in ad_category_classes):
+            return False
+        return True
+
+    def _collect_content(self, root: Tag, base_url: Optional[str] = None) -> Dict:
+        """Zbiera widoczne fragmenty tekstu, paragrafy, nagłówki, linki i listy z poddrzewa."""
+        is_visible = self._is_visible
+        visible_text_parts = []
+        paragraphs = []
+        headings = []
+        links = []
+        lists = {'ordered': [], 'unordered': []}
+        base_url = base_url or self.page.url
+
+        for elem in root.find_all(True):
+            if not is_visible(elem):
+                continue
+
+            # Headings
+            if elem.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+                text = clean_text(elem.get_text(strip=True))
+                if text:
+                    headings.append({
+                        'level': int(elem.name[1]),
+                        'text': text,
+                        'aria_label': elem.get('aria-label', None)
+                    })
+                    visible_text_parts.append(text)
+
+            # Paragraphs
+            elif elem.name == 'p':
+                text = clean_text(elem.get_text(strip=True))
+                if text:
+                    paragraphs.append(text)
+                    visible_text_parts.append(text)
+
+            # Links (collect but don't add to text to avoid noise)
+            elif elem.name == 'a' and elem.get('href'):
+                href = normalize_url(elem['href'], base_url=base_url)
+                text = clean_text(elem.get_text(strip=True))
+                if href and validate_url(href):
+                    links.append({
+                        'text': text or 'Link bez tekstu',
+                        'url': href
+                    })
+
+            # Lists (include specs or contact info)
+            elif elem.name in ['ul', 'ol']:
+                list_type = 'ordered' if elem.name == 'ol' else 'unordered'
+                items = [clean_text(li.get_text(strip=True)) for li in elem.find_all('li') if clean_text(li.get_text(strip=True))]
+                if items:
+                    lists[list_type].append(items)
+                    visible_text_parts.extend(items)
+
+            # Divs and other elements (include prices, specs, contact info)
+            else:
+                text = clean_text(elem.get_text(strip=True))
+                if text:
+                    visible_text_parts.append(text)
+
+        return {
+            "text_parts": visible_text_parts,
+            "paragraphs": paragraphs,
+            "headings": headings,
+            "links": links,
+            "lists": lists
+        }
+
+    def _extract_content(self, soup: BeautifulSoup, base_url: Optional[str] = None, language: Optional[str] = None,
+                         html_content: Optional[str] = None) -> Dict:
         """Ekstrahuje główną treść strony, w tym ceny, dane kontaktowe i specyfikacje, eliminując reklamy i nieistotne elementy."""
         try:
-            def is_visible(tag: Tag) -> bool:
-                if not tag or not isinstance(tag, Tag):
-                    return False
-                # Check for hidden elements via style attributes
-                style = tag.attrs.get('style', '').replace(' ', '').lower()
-                hidden = ['display:none', 'visibility:hidden', 'opacity:0']
-                if any(h in style for h in hidden):
-                    return False
-                # Exclude non-content tags
-                if tag.name in ['script', 'style', 'noscript', 'svg', 'meta', 'head']:
-                    return False
-                # Exclude advertisement and category-related elements
-                ad_category_classes = ['ad', 'banner', 'sponsored', 'advertisement', 'category', 'tag', 'references', 'source']
-                class_list = tag.get('class', [])
-                if any(c in cls.lower() for cls in class_list for c in ad_category_classes):
-                    return False
-                return True
+            is_visible = self._is_visible
 
             def get_main_candidate(soup: BeautifulSoup) -> Tag:
                 """Zwraca najbardziej prawdopodobny tag zawierający treść, w tym ceny i specyfikacje."""
@@ -196,74 +602,62 @@ class WebScraper:
                 )
                 return max_div
 
-            main_content = get_main_candidate(soup)
-
-            # Fallback to Readability if main content is insufficient
-            if not main_content or len(clean_text(main_content.get_text(strip=True))) < 100:
-                doc = Document(str(soup))
-                main_html = doc.summary()
-                main_content = BeautifulSoup(main_html, "html.parser")
+            def readability_content() -> BeautifulSoup:
+                # Readability dostaje oryginalny HTML, bez ponownej serializacji drzewa
+                doc = Document(html_content or str(soup))
+                return BeautifulSoup(doc.summary(), "html.parser")
+
+            # Profil domeny: dla znanego szablonu strony przejdź od razu do zapamiętanego węzła
+            profile = None
+            fingerprint = None
+            if self.profiles and base_url:
+                fingerprint = template_fingerprint(soup)
+                profile = self.profiles.lookup(base_url, fingerprint)
+            main_content = None
+            if profile:
+                if profile["method"] == "readability":
+                    main_content = readability_content()
+                else:
+                    main_content = soup.select_one(profile["selector"])
+                length = len(clean_text(main_content.get_text(strip=True))) if main_content else 0
+                if length < self.profiles.min_length:
+                    self.profiles.invalidate(base_url, fingerprint, f"za krótka treść ({length} znaków)")
+                    main_content = None
+                else:
+                    self.profiles.record_hit(base_url, fingerprint)
+                    print(f"Główna treść z profilu domeny: {profile['selector'] or profile['method']}")
+
+            if main_content is None:
+                main_content = get_main_candidate(soup)
+                method = "selector"
+
+                # Fallback to Readability if main content is insufficient
+                if not main_content or len(clean_text(main_content.get_text(strip=True))) < 100:
+                    main_content = readability_content()
+                    method = "readability"
+
+                if fingerprint:
+                    length = len(clean_text(main_content.get_text(strip=True)))
+                    if length >= self.profiles.min_length:
+                        selector = css_path(main_content) if method == "selector" else None
+                        # Selektor musi jednoznacznie wskazywać ten sam węzeł
+                        if method == "readability" or (selector and soup.select_one(selector) is main_content):
+                            self.profiles.learn(base_url, fingerprint, method, selector, length)
 
             # Collect meaningful content, including prices, contact info, and specs
-            visible_text_parts = []
-            paragraphs = []
-            headings = []
-            links = []
-            lists = {'ordered': [], 'unordered': []}
-            base_url = self.page.url
-
-            for elem in main_content.find_all(True):
-                if not is_visible(elem):
-                    continue
-
-                # Headings
-                if elem.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                    text = clean_text(elem.get_text(strip=True))
-                    if text:
-                        headings.append({
-                            'level': int(elem.name[1]),
-                            'text': text,
-                            'aria_label': elem.get('aria-label', None)
-                        })
-                        visible_text_parts.append(text)
-
-                # Paragraphs
-                elif elem.name == 'p':
-                    text = clean_text(elem.get_text(strip=True))
-                    if text:
-                        paragraphs.append(text)
-                        visible_text_parts.append(text)
-
-                # Links (collect but don't add to text to avoid noise)
-                elif elem.name == 'a' and elem.get('href'):
-                    href = normalize_url(elem['href'], base_url=base_url)
-                    text = clean_text(elem.get_text(strip=True))
-                    if href and validate_url(href):
-                        links.append({
-                            'text': text or 'Link bez tekstu',
-                            'url': href
-                        })
-
-                # Lists (include specs or contact info)
-                elif elem.name in ['ul', 'ol']:
-                    list_type = 'ordered' if elem.name == 'ol' else 'unordered'
-                    items = [clean_text(li.get_text(strip=True)) for li in elem.find_all('li') if clean_text(li.get_text(strip=True))]
-                    if items:
-                        lists[list_type].append(items)
-                        visible_text_parts.extend(items)
-
-                # Divs and other elements (include prices, specs, contact info)
-                elif is_visible(elem):
-                    text = clean_text(elem.get_text(strip=True))
-                    if text:
-                        visible_text_parts.append(text)
+            collected = self._collect_content(main_content, base_url)
+            visible_text_parts = collected["text_parts"]
+            paragraphs = collected["paragraphs"]
+            headings = collected["headings"]
+            links = collected["links"]
+            lists = collected["lists"]
 
             # Combine visible text, remove duplicates, and ensure clean formatting
             visible_text = ' '.join(list(dict.fromkeys(visible_text_parts)))  # Remove duplicates while preserving order
 
             word_count = len(visible_text.split())
             sentence_count = len(re.split(r'[.!?]+', visible_text)) - 1 if visible_text else 0
-            main_language = self.page.evaluate("document.documentElement.lang") or "unknown"
+            main_language = language or "unknown"
 
             return {
                 "text": clean_text(visible_text),
@@ -295,10 +689,10 @@ class WebScraper:
                 "aria_roles": []
             }
     
-    def _extract_images(self, soup: BeautifulSoup) -> List[Dict]:
+    def _extract_images(self, soup: BeautifulSoup, base_url: Optional[str] = None) -> List[Dict]:
         """Ekstrahuje obrazy z sensownymi atrybutami alt, podpisami lub istotnymi nazwami."""
         images = []
-        base_url = self.page.url
+        base_url = base_url or self.page.url
         seen_srcs = set()
 
         print(f"\n=== START: Ekstrakcja obrazów ze strony: {base_url} ===")
@@ -330,8 +724,11 @@ class WebScraper:
                         "is_meaningful_alt": len(alt.strip()) > 20
                     })
 
-        # 2. Ekstrahuj inne obrazy z Playwright
+        # 2. Ekstrahuj inne obrazy z Playwright (tylko jeśli karta nadal wyświetla tę stronę)
         print("\n--- Próba ekstrakcji obrazów z DOM za pomocą Playwright ---")
+        if self.page is None or self.page.url != base_url:
+            print(f"Brak karty z tą stroną ({base_url}), pominięto obrazy z DOM")
+            return images
         try:
             other_images = self.page.evaluate("""
                 () => Array.from(document.images)
@@ -363,6 +760,19 @@ class WebScraper:
             """)
 
             for idx, img in enumerate(other_images, 1):
+                if img["src"].startswith(("blob:", "data:")):
+                    # Obrazy blob: i data: są opisywane z przeglądarki (zrzut elementu lub zdekodowane dane)
+                    if len(img["src"]) <= 100000 and img["src"] not in seen_srcs:
+                        seen_srcs.add(img["src"])
+                        alt = clean_text(img["alt"])
+                        images.append({
+                            "src": img["src"],
+                            "alt": alt,
+                            "width": img['width'],
+                            "height": img['height'],
+                            "is_meaningful_alt": len(alt.strip()) > 20
+                        })
+                    continue
                 src = normalize_url(img["src"], base_url=base_url)
                 if any(kw in src for kw in ['profile-', 'avatar', 'user=', 'h=32', 'crop=faces']):
                     continue
@@ -389,10 +799,10 @@ class WebScraper:
         print(f"Znaleziono {len(images)} obrazów na stronie: {base_url}")
         return images
 
-    def _extract_links(self, soup: BeautifulSoup) -> List[Dict]:
+    def _extract_links(self, soup: BeautifulSoup, base_url: Optional[str] = None) -> List[Dict]:
         """Ekstrahuje linki z tekstem i URL-ami, pomijając linki nawigacyjne."""
         links = []
-        base_url = self.page.url
+        base_url = base_url or self.page.url
         try:
             for a in soup.find_all("a", href=True):
                 if a.find_parent(lambda tag: tag.has_attr('role') and 'navigation' in tag['role'] or tag.name in ['nav', 'footer']):
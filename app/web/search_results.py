@@ -0,0 +1,135 @@
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from playwright.sync_api import Page
+
+from utils.url_utils import validate_url
+
+logger = logging.getLogger(__name__)
+
+# Selektory bloków wyników, tytułów, linków i opisów dla obsługiwanych wyszukiwarek
+SEARCH_ENGINE_SELECTORS = {
+    "google.com": {
+        "result": "div.tF2Cxc",
+        "title": "h3",
+        "link": "a",
+        "snippet": "div.VwiC3b",
+    },
+    "bing.com": {
+        "result": "li.b_algo",
+        "title": "h2",
+        "link": "a",
+        "snippet": "div.b_caption p",
+    },
+    "duckduckgo.com": {
+        "result": "div.result",
+        "title": "a.result__a",
+        "link": "a.result__a",
+        "snippet": ".result__snippet",
+    },
+}
+
+# Wyniki wyszukiwania odczytywane w przeglądarce jednym wywołaniem (bez serializacji i parsowania
+# całej strony); null, gdy domena nie jest obsługiwaną wyszukiwarką
+SERP_SCRIPT = """
+([engines, maxResults]) => {
+    const host = location.hostname.toLowerCase();
+    const engine = Object.keys(engines).find(domain => host.includes(domain));
+    if (!engine) return null;
+    const selectors = engines[engine];
+    const text = (el) => el ? (el.innerText || el.textContent || '').replace(/\\s+/g, ' ').trim() : '';
+    const seen = new Set();
+    const results = [];
+    for (const block of document.querySelectorAll(selectors.result)) {
+        const link = block.querySelector(selectors.link);
+        if (!link || !link.href || seen.has(link.href)) continue;
+        seen.add(link.href);
+        results.push({
+            title: text(block.querySelector(selectors.title)) || 'Brak tytułu',
+            url: link.href,
+            snippet: text(block.querySelector(selectors.snippet)),
+        });
+        if (results.length >= maxResults) break;
+    }
+    return results;
+}
+"""
+
+def normalize_query(query: str) -> str:
+    """Zwraca znormalizowaną frazę wyszukiwania (klucz cache): NFC, małe litery, pojedyncze spacje."""
+    return " ".join(unicodedata.normalize("NFC", query or "").lower().split())
+
+def extract_serp(page: Page, max_results: int = 10, timeout_ms: int = 5000,
+                 poll_interval: int = 100) -> Optional[List[Dict]]:
+    """
+    Odczytuje wyniki wyszukiwania z bieżącej strony, czekając tylko do pojawienia się wyników
+    (a nie do pełnego wyrenderowania strony).
+
+    Returns:
+        Lista wyników {'index', 'title', 'url', 'snippet'}; pusta, jeśli wyniki się nie pojawiły
+        (np. strona zgody lub brak wyników); None, jeśli strona nie jest obsługiwaną wyszukiwarką.
+    """
+    deadline = time.time() + timeout_ms / 1000
+    while True:
+        try:
+            found = page.evaluate(SERP_SCRIPT, [SEARCH_ENGINE_SELECTORS, max_results])
+        except Exception as e:
+            # Kontekst wykonania zniszczony przez trwającą nawigację
+            logger.debug(f"Odczyt wyników wyszukiwania nieudany: {e}")
+            found = []
+        if found is None:
+            return None
+        results = [r for r in found if validate_url(r["url"])]
+        if results or time.time() >= deadline:
+            break
+        page.wait_for_timeout(poll_interval)
+    return [{"index": i, **result} for i, result in enumerate(results, 1)]
+
+class SearchCache:
+    """Pamięć wyników wyszukiwania: znormalizowana fraza (i wyszukiwarka) -> wyniki, z czasem ważności."""
+
+    def __init__(self, ttl: int = 15 * 60, max_entries: int = 100):
+        """
+        Args:
+            ttl: Czas ważności wyników w sekundach.
+            max_entries: Maksymalna liczba zapamiętanych wyszukiwań (najdawniej używane są usuwane).
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+
+    @staticmethod
+    def key(query: str, engine: str = "") -> str:
+        return f"{engine}|{normalize_query(query)}"
+
+    def get(self, query: str, engine: str = "") -> Optional[Dict]:
+        """Zwraca wpis {'query', 'url', 'results', 'stored_at'} lub None (brak lub wygasł)."""
+        key = self.key(query, engine)
+        entry = self.entries.get(key)
+        if entry and time.time() - entry["stored_at"] > self.ttl:
+            del self.entries[key]
+            self.stats["expired"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, query: str, url: str, results: List[Dict], engine: str = "") -> Dict:
+        """Zapisuje wyniki wyszukiwania i zwraca wpis."""
+        entry = {"query": query, "url": url, "results": results, "stored_at": time.time()}
+        key = self.key(query, engine)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self.entries.clear()
@@ -0,0 +1,230 @@
+import logging
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from playwright.sync_api import Page
+
+from utils.url_utils import canonicalize_url
+from web.extraction_profiles import ExtractionProfiles
+
+logger = logging.getLogger(__name__)
+
+# Typy zasobów, których trwające pobieranie oznacza, że treść strony może się jeszcze zmienić
+TRACKED_RESOURCES = ("document", "script", "xhr", "fetch", "stylesheet")
+
+# Stan dokumentu i czas od ostatniej mutacji DOM (z obserwatora DomTracker, jeśli zainstalowany)
+SETTLE_PROBE = """
+() => ({
+    state: document.readyState,
+    body: !!(document.body && document.body.childElementCount),
+    quiet: window.__waTracker ? performance.now() - window.__waTracker.lastMutation() : null
+})
+"""
+
+class SettleTimings:
+    """
+    Adaptacyjne, per-domenowe parametry oczekiwania na gotowość stron oraz zmierzone czasy gotowości.
+
+    Okno ciszy (sieci i DOM) i limit czasu wynikają ze średniej kroczącej czasu gotowości domeny:
+    szybkie strony statyczne są uznawane za gotowe po krótkiej ciszy, a aplikacje doładowujące
+    treść dostają dłuższe okno. Domeny, w których sieć nigdy nie cichnie (np. długie odpytywanie,
+    strumienie), po kilku takich pomiarach są oceniane tylko po ciszy DOM.
+    """
+
+    def __init__(self, alpha: float = 0.3, default_ready_ms: float = 1500.0, min_quiet_ms: int = 150,
+                 max_quiet_ms: int = 1000, min_timeout_ms: int = 3000, max_timeout_ms: int = 20000,
+                 noisy_network_after: int = 2):
+        """
+        Args:
+            alpha: Waga nowego pomiaru w średniej kroczącej czasu gotowości.
+            default_ready_ms: Zakładany czas gotowości domeny bez pomiarów.
+            min_quiet_ms: Minimalne okno ciszy sieci i DOM.
+            max_quiet_ms: Maksymalne okno ciszy sieci i DOM.
+            min_timeout_ms: Minimalny limit oczekiwania.
+            max_timeout_ms: Maksymalny limit oczekiwania.
+            noisy_network_after: Liczba pomiarów z nieustającym ruchem sieciowym (przy cichym DOM),
+                po której sieć domeny jest pomijana.
+        """
+        self.alpha = alpha
+        self.default_ready_ms = default_ready_ms
+        self.min_quiet_ms = min_quiet_ms
+        self.max_quiet_ms = max_quiet_ms
+        self.min_timeout_ms = min_timeout_ms
+        self.max_timeout_ms = max_timeout_ms
+        self.noisy_network_after = noisy_network_after
+        self.domains: Dict[str, Dict] = {}
+
+    def params_for(self, url: str) -> Tuple[int, int, bool]:
+        """
+        Zwraca parametry oczekiwania dla domeny URL.
+
+        Returns:
+            Krotka (okno ciszy w ms, limit czasu w ms, czy pominąć ciszę sieci).
+        """
+        domain = self.domains.get(ExtractionProfiles.domain_of(url))
+        ready_ms = domain["ema_ms"] if domain else self.default_ready_ms
+        quiet_ms = int(min(self.max_quiet_ms, max(self.min_quiet_ms, ready_ms * 0.15)))
+        timeout_ms = int(min(self.max_timeout_ms, max(self.min_timeout_ms, ready_ms * 3 + 2000)))
+        noisy = bool(domain) and domain["noisy_network"] >= self.noisy_network_after
+        return quiet_ms, timeout_ms, noisy
+
+    def record(self, url: str, ready_ms: float, timed_out: bool, network_busy: bool) -> None:
+        """Zapisuje pomiar czasu gotowości strony domeny."""
+        key = ExtractionProfiles.domain_of(url)
+        if not key:
+            return
+        domain = self.domains.setdefault(key, {"count": 0, "ema_ms": ready_ms, "min_ms": ready_ms, "max_ms": ready_ms,
+                                               "last_ms": ready_ms, "timeouts": 0, "noisy_network": 0})
+        domain["count"] += 1
+        domain["ema_ms"] = (1 - self.alpha) * domain["ema_ms"] + self.alpha * ready_ms
+        domain["min_ms"] = min(domain["min_ms"], ready_ms)
+        domain["max_ms"] = max(domain["max_ms"], ready_ms)
+        domain["last_ms"] = ready_ms
+        if timed_out:
+            domain["timeouts"] += 1
+            if network_busy:
+                domain["noisy_network"] += 1
+
+    def report(self) -> Dict[str, Dict]:
+        """Zwraca zmierzone czasy gotowości stron (w ms) dla każdej domeny."""
+        return {domain: {k: round(v) if isinstance(v, float) else v for k, v in stats.items()}
+                for domain, stats in self.domains.items()}
+
+class NavigationSettler:
+    """
+    Wykrywa moment, w którym strona jest gotowa po nawigacji lub akcji (kliknięcie, odświeżenie),
+    na podstawie zdarzeń nawigacji karty, ciszy sieciowej (brak trwających żądań dokumentów, skryptów,
+    XHR i fetch) oraz okresu bez mutacji DOM, zamiast stałych opóźnień i wielokrotnych oczekiwań.
+    """
+
+    def __init__(self, page: Page, timings: Optional[SettleTimings] = None, poll_interval: int = 50,
+                 max_inflight: int = 0, stale_request_ms: int = 5000):
+        """
+        Args:
+            page: Obiekt Playwright Page.
+            timings: Współdzielone parametry i pomiary per domena.
+            poll_interval: Odstęp sprawdzania stanu strony w ms (w tym czasie obsługiwane są zdarzenia karty).
+            max_inflight: Liczba trwających żądań, przy której sieć jest jeszcze uznawana za cichą.
+            stale_request_ms: Żądania trwające dłużej (np. długie odpytywanie) nie blokują gotowości.
+        """
+        self.page = page
+        self.timings = timings or SettleTimings()
+        self.poll_interval = poll_interval
+        self.max_inflight = max_inflight
+        self.stale_request_ms = stale_request_ms
+        self.inflight: Dict[object, float] = {}
+        self.last_activity = time.time()
+        self.navigations = 0
+        # Kanoniczny URL ostatniej nawigacji goto (strona po przekierowaniu ma inny page.url)
+        self.last_target: Optional[str] = None
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+        page.on("framenavigated", self._on_frame_navigated)
+
+    def _on_request(self, request) -> None:
+        if request.resource_type in TRACKED_RESOURCES:
+            self.inflight[request] = time.time()
+            self.last_activity = time.time()
+
+    def _on_request_done(self, request) -> None:
+        if self.inflight.pop(request, None) is not None:
+            self.last_activity = time.time()
+
+    def _on_frame_navigated(self, frame) -> None:
+        if frame == self.page.main_frame:
+            self.navigations += 1
+            self.last_target = None
+
+    def _network_quiet_ms(self, now: float) -> float:
+        """Zwraca czas ciszy sieciowej w ms (0, jeśli trwa więcej żądań niż max_inflight)."""
+        for request, started in list(self.inflight.items()):
+            if (now - started) * 1000 >= self.stale_request_ms:
+                del self.inflight[request]
+        return 0.0 if len(self.inflight) > self.max_inflight else (now - self.last_activity) * 1000
+
+    def _probe(self) -> Optional[Dict]:
+        try:
+            return self.page.evaluate(SETTLE_PROBE)
+        except Exception:
+            # Kontekst wykonania zniszczony przez trwającą nawigację
+            return None
+
+    def wait(self, url: Optional[str] = None, since_navigations: Optional[int] = None,
+             expect_navigation: bool = False, wait_until: str = "settled") -> Dict:
+        """
+        Czeka, aż strona będzie gotowa: dokument wczytany, body niepuste, a sieć i DOM ciche przez
+        okno ciszy domeny (lub do limitu czasu).
+
+        Args:
+            url: Adres, dla którego dobierane są parametry domeny (domyślnie page.url).
+            since_navigations: Licznik nawigacji sprzed akcji; nawigacja rozpoczęta przez akcję jest
+                wykrywana zdarzeniem framenavigated.
+            expect_navigation: Czy czekać na nawigację głównej ramki (np. po goto z wait_until="commit").
+            wait_until: "settled" (cisza sieci i DOM) albo "domcontentloaded" (tylko sparsowany
+                dokument, np. gdy potrzebne dane są osadzone w HTML).
+
+        Returns:
+            Dict z kluczami 'ready_ms', 'timed_out', 'navigated' i 'url'.
+        """
+        url = url or self.page.url
+        quiet_ms, timeout_ms, ignore_network = self.timings.params_for(url)
+        if since_navigations is None:
+            since_navigations = self.navigations
+        start = time.time()
+        deadline = start + timeout_ms / 1000
+        timed_out, network_busy = True, False
+        while time.time() < deadline:
+            navigated = self.navigations != since_navigations
+            if not expect_navigation or navigated:
+                probe = self._probe()
+                now = time.time()
+                network_busy = not ignore_network and self._network_quiet_ms(now) < quiet_ms
+                loaded = bool(probe) and probe["state"] != "loading" and probe["body"]
+                if loaded and wait_until == "domcontentloaded":
+                    timed_out, network_busy = False, False
+                    break
+                dom_ready = loaded and (probe["quiet"] is None or probe["quiet"] >= quiet_ms)
+                if dom_ready and not network_busy:
+                    timed_out = False
+                    break
+            # Oczekiwanie w Playwright obsługuje zdarzenia karty (żądania, nawigacje)
+            self.page.wait_for_timeout(self.poll_interval)
+        ready_ms = (time.time() - start) * 1000
+        final_url = self.page.url
+        navigated = self.navigations != since_navigations
+        if navigated and wait_until == "settled":
+            # Czas gotowości domeny mierzony jest tylko dla pełnych nawigacji (nie dla zmian w obrębie
+            # strony ani samego wczytania dokumentu, które zaniżyłoby okno ciszy domeny)
+            self.timings.record(final_url if final_url.startswith(("http://", "https://")) else url,
+                                ready_ms, timed_out, network_busy)
+        if timed_out:
+            logger.info(f"Strona {final_url} nie ustabilizowała się w {timeout_ms} ms (sieć aktywna: {network_busy})")
+        print(f"Strona gotowa w {ready_ms / 1000:.2f}s (okno ciszy {quiet_ms} ms): {final_url}")
+        return {"ready_ms": ready_ms, "timed_out": timed_out, "navigated": navigated, "url": final_url}
+
+    def goto(self, url: str, wait_until: str = "settled") -> Dict:
+        """
+        Nawiguje do URL (do zatwierdzenia nawigacji) i czeka na gotowość strony: pełną ("settled")
+        albo tylko wczytanie dokumentu ("domcontentloaded"), w obu przypadkach w limicie czasu domeny.
+        """
+        before = self.navigations
+        self.page.goto(url, wait_until="commit", timeout=self.timings.max_timeout_ms)
+        result = self.wait(url, since_navigations=before, expect_navigation=True, wait_until=wait_until)
+        self.last_target = canonicalize_url(url)
+        return result
+
+    def reload(self) -> Dict:
+        """Odświeża stronę i czeka na jej gotowość."""
+        before = self.navigations
+        self.page.reload(wait_until="commit", timeout=self.timings.max_timeout_ms)
+        return self.wait(since_navigations=before, expect_navigation=True)
+
+    def run(self, action: Callable[[], None]) -> Dict:
+        """
+        Wykonuje akcję (np. kliknięcie) i czeka, aż wywołana nią nawigacja lub zmiany strony się zakończą.
+        """
+        before = self.navigations
+        url = self.page.url
+        action()
+        return self.wait(url, since_navigations=before)
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Set
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+from playwright.async_api import async_playwright
+
+from web.boilerplate import BoilerplateModel
+from web.extraction_profiles import ExtractionProfiles
+from web.scraper import WebScraper
+from web.site_index import SiteIndex
+from utils.url_utils import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# Rozszerzenia plików, które nie są stronami HTML
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".zip", ".rar", ".7z", ".mp3", ".mp4",
+    ".avi", ".mov", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".exe", ".dmg", ".css", ".js", ".xml"
+)
+
+class SiteCrawler:
+    """
+    Crawler witryny działający w tle: od podanego URL odwiedza linki w tej samej domenie
+    (z limitem głębokości i liczby stron), ekstrahuje treść przez WebScraper i zasila SiteIndex.
+
+    Używa asynchronicznego API Playwright we własnym wątku i własnej (bezgłowej) przeglądarce,
+    więc nie blokuje synchronicznej karty użytkownika w wątku głównym.
+    """
+
+    def __init__(self, index: SiteIndex, max_pages: int = 50, max_depth: int = 2, concurrency: int = 4,
+                 delay: float = 0.5, timeout: int = 15000, profiles: Optional[ExtractionProfiles] = None,
+                 user_agent: Optional[str] = None):
+        """
+        Args:
+            index: Indeks, do którego trafiają fragmenty stron.
+            max_pages: Maksymalna liczba stron na jedno indeksowanie.
+            max_depth: Maksymalna głębokość linków od strony startowej.
+            concurrency: Liczba równolegle pobieranych stron.
+            delay: Minimalny odstęp (w sekundach) między rozpoczęciem kolejnych pobrań (uprzejmość wobec serwera).
+            timeout: Limit czasu ładowania strony w ms.
+            profiles: Profile ekstrakcji domen (współdzielone ze scraperem kart).
+            user_agent: User-Agent przeglądarki crawlera.
+        """
+        self.index = index
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.delay = delay
+        self.timeout = timeout
+        self.user_agent = user_agent
+        # Scraper bez karty: ekstrakcja z HTML pobranego przez crawler; własny model szablonu witryny
+        self.scraper = WebScraper(None, profiles=profiles, boilerplate=BoilerplateModel())
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.domain: Optional[str] = None
+        self.stats: Dict = {}
+
+    def is_running(self) -> bool:
+        """Czy indeksowanie trwa."""
+        return bool(self.thread and self.thread.is_alive())
+
+    def start(self, start_url: str) -> bool:
+        """
+        Rozpoczyna indeksowanie witryny w tle.
+
+        Returns:
+            False, jeśli indeksowanie już trwa.
+        """
+        if self.is_running():
+            return False
+        self.domain = ExtractionProfiles.domain_of(start_url)
+        self.stop_event.clear()
+        self.stats = {"domain": self.domain, "visited": 0, "pages": 0, "skipped": 0, "failed": 0, "chunks": 0,
+                      "queued": 0, "started": time.time(), "finished": None}
+        self.thread = threading.Thread(target=self._run, args=(start_url,), daemon=True, name="SiteCrawler")
+        self.thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Przerywa indeksowanie i czeka na zakończenie wątku."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def throughput(self) -> float:
+        """Zwraca przepustowość indeksowania (strony na sekundę)."""
+        if not self.stats:
+            return 0.0
+        elapsed = (self.stats["finished"] or time.time()) - self.stats["started"]
+        return self.stats["pages"] / elapsed if elapsed > 0 else 0.0
+
+    def _run(self, start_url: str) -> None:
+        try:
+            asyncio.run(self._crawl(start_url))
+        except Exception as e:
+            logger.error(f"Błąd indeksowania witryny {start_url}: {e}")
+        finally:
+            self.stats["finished"] = time.time()
+            index_stats = self.index.stats(self.domain)
+            print(f"Indeksowanie {self.domain} zakończone: {self.stats['pages']} stron, "
+                  f"{self.throughput():.2f} stron/s, indeks: {index_stats['chunks']} fragmentów, "
+                  f"{index_stats['bytes'] / 1024:.0f} KB")
+
+    def _load_robots(self, start_url: str) -> Optional[RobotFileParser]:
+        """Wczytuje robots.txt witryny (None, jeśli niedostępny)."""
+        parsed = urlparse(start_url)
+        if parsed.scheme not in ("http", "https"):
+            return None
+        robots = RobotFileParser(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+        try:
+            robots.read()
+            return robots
+        except Exception as e:
+            logger.debug(f"Brak robots.txt dla {parsed.netloc}: {e}")
+            return None
+
+    def _accept(self, url: str, robots: Optional[RobotFileParser]) -> bool:
+        """Sprawdza, czy link należy do indeksowanej domeny i jest dozwoloną stroną HTML."""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https", "file"):
+            return False
+        if parsed.scheme != "file" and ExtractionProfiles.domain_of(url) != self.domain:
+            return False
+        if parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+            return False
+        return robots is None or robots.can_fetch(self.user_agent or "*", url)
+
+    async def _crawl(self, start_url: str) -> None:
+        loop = asyncio.get_running_loop()
+        robots = await loop.run_in_executor(None, self._load_robots, start_url)
+        queue: asyncio.Queue = asyncio.Queue()
+        seen: Set[str] = {canonicalize_url(start_url)}
+        await queue.put((start_url, 0))
+        rate_lock = asyncio.Lock()
+        last_start = [0.0]
+        active = [0]
+
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+            context = await browser.new_context(user_agent=self.user_agent) if self.user_agent else await browser.new_context()
+
+            async def block_assets(route):
+                # Crawler potrzebuje tylko HTML: obrazy, media, czcionki i style nie są pobierane
+                if route.request.resource_type in ("image", "media", "font", "stylesheet"):
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await context.route("**/*", block_assets)
+
+            async def polite_wait():
+                async with rate_lock:
+                    wait = self.delay - (time.time() - last_start[0])
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    last_start[0] = time.time()
+
+            async def worker():
+                page = await context.new_page()
+                try:
+                    while not self.stop_event.is_set():
+                        try:
+                            url, depth = await asyncio.wait_for(queue.get(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            # Koniec, gdy kolejka jest pusta i żaden worker nie może dodać nowych linków
+                            if queue.empty() and active[0] == 0:
+                                return
+                            continue
+                        active[0] += 1
+                        try:
+                            if self.stats["visited"] >= self.max_pages:
+                                continue
+                            self.stats["visited"] += 1
+                            await polite_wait()
+                            links = await self._process(page, url)
+                            if links is None or depth >= self.max_depth:
+                                continue
+                            for link in links:
+                                link = urldefrag(urljoin(url, link))[0]
+                                key = canonicalize_url(link)
+                                if key in seen or not self._accept(link, robots):
+                                    continue
+                                if len(seen) >= self.max_pages * 3:
+                                    break
+                                seen.add(key)
+                                self.stats["queued"] += 1
+                                await queue.put((link, depth + 1))
+                        finally:
+                            active[0] -= 1
+                            queue.task_done()
+                finally:
+                    await page.close()
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            await context.close()
+            await browser.close()
+
+    async def _process(self, page, url: str) -> Optional[list]:
+        """Pobiera stronę, indeksuje jej treść i zwraca linki (None przy błędzie)."""
+        start_time = time.time()
+        try:
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout)
+            if response is not None and (response.status >= 400 or "html" not in response.headers.get("content-type", "text/html")):
+                self.stats["skipped"] += 1
+                return None
+            html = await page.content()
+            title = await page.title()
+            language = await page.evaluate("document.documentElement.lang") or ""
+            links = await page.evaluate("() => Array.from(document.links, a => a.href)")
+            final_url = page.url
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Crawler: błąd pobierania {url}: {e}")
+            return None
+
+        data = self.scraper.parse_html(html, final_url, title, language)
+        content = data.get("content", {})
+        parts = [title]
+        parts.extend(h["text"] for h in content.get("headings", []))
+        parts.append(content.get("text", ""))
+        text = "\n".join(p for p in parts if p)
+        if self.index.is_indexed(final_url, text):
+            self.stats["skipped"] += 1
+            return links
+        chunks = await asyncio.get_running_loop().run_in_executor(
+            None, self.index.add_page, final_url, self.domain or "", title, text
+        )
+        self.stats["pages"] += 1
+        self.stats["chunks"] += chunks
+        print(f"Crawler: zaindeksowano {final_url} ({chunks} fragmentów) w {time.time() - start_time:.2f}s")
+        return links
@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SiteIndex:
+    """
+    Trwały indeks fragmentów stron witryn (SQLite) z osadzeniami, przeszukiwany semantycznie
+    w obrębie domeny ("pytanie o całą witrynę").
+    """
+
+    def __init__(self, embedder, db_path: str = "site_index.sqlite", chunk_words: int = 220, overlap_words: int = 40):
+        """
+        Args:
+            embedder: Model osadzania z metodą encode (np. SentenceTransformer z PageAssistant).
+            db_path: Ścieżka do pliku bazy SQLite.
+            chunk_words: Długość fragmentu w słowach.
+            overlap_words: Zakładka między kolejnymi fragmentami w słowach.
+        """
+        self.embedder = embedder
+        self.db_path = db_path
+        self.chunk_words = chunk_words
+        self.overlap_words = overlap_words
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Macierze osadzeń domen wczytane do wyszukiwania (unieważniane po dodaniu stron)
+        self.matrix_cache: Dict[str, Tuple[np.ndarray, List[Tuple[str, str, str]]]] = {}
+        self._init_schema()
+
+    def _init_schema(self):
+        """Tworzy tabele: pages (strony witryn) i chunks (fragmenty z osadzeniami float32)."""
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    domain TEXT NOT NULL,
+                    title TEXT,
+                    content_hash TEXT NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    url TEXT NOT NULL,
+                    domain TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (url, position)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_domain ON chunks(domain)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_domain ON pages(domain)")
+
+    def chunk_text(self, text: str) -> List[str]:
+        """Dzieli tekst na fragmenty o stałej liczbie słów z zakładką."""
+        words = text.split()
+        if not words:
+            return []
+        step = max(1, self.chunk_words - self.overlap_words)
+        return [" ".join(words[i:i + self.chunk_words]) for i in range(0, max(1, len(words) - self.overlap_words), step)]
+
+    def is_indexed(self, url: str, text: str) -> bool:
+        """Sprawdza, czy strona jest już zaindeksowana z identyczną treścią."""
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self.lock:
+            row = self.conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+        return bool(row) and row[0] == content_hash
+
+    def add_page(self, url: str, domain: str, title: str, text: str) -> int:
+        """
+        Dzieli tekst strony na fragmenty, osadza je i zapisuje w indeksie (zastępując poprzednią wersję).
+
+        Returns:
+            Liczba zapisanych fragmentów.
+        """
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        chunks = self.chunk_text(text)
+        if not chunks:
+            return 0
+        prefixed = [f"{title}\n{chunk}" if title else chunk for chunk in chunks]
+        embeddings = np.asarray(self.embedder.encode(prefixed, convert_to_numpy=True), dtype=np.float32)
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+            self.conn.executemany(
+                "INSERT INTO chunks (url, domain, position, text, embedding) VALUES (?, ?, ?, ?, ?)",
+                [(url, domain, i, chunk, embedding.tobytes()) for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, domain, title, content_hash, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (url, domain, title, content_hash, time.time())
+            )
+            self.matrix_cache.pop(domain, None)
+        return len(chunks)
+
+    def _domain_matrix(self, domain: str) -> Tuple[np.ndarray, List[Tuple[str, str, str]]]:
+        """Wczytuje znormalizowane osadzenia fragmentów domeny (z cache'a w pamięci)."""
+        with self.lock:
+            cached = self.matrix_cache.get(domain)
+            if cached:
+                return cached
+            rows = self.conn.execute(
+                "SELECT c.url, COALESCE(p.title, ''), c.text, c.embedding FROM chunks c "
+                "LEFT JOIN pages p ON p.url = c.url WHERE c.domain = ? ORDER BY c.url, c.position", (domain,)
+            ).fetchall()
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32), []
+        matrix = np.vstack([np.frombuffer(row[3], dtype=np.float32) for row in rows])
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-8
+        meta = [(row[0], row[1], row[2]) for row in rows]
+        with self.lock:
+            self.matrix_cache[domain] = (matrix, meta)
+        return matrix, meta
+
+    def search(self, domain: str, query: str, k: int = 6) -> List[Dict]:
+        """
+        Zwraca k fragmentów witryny najbardziej podobnych do zapytania.
+
+        Returns:
+            Lista słowników {'url', 'title', 'text', 'score'} posortowana malejąco po podobieństwie.
+        """
+        matrix, meta = self._domain_matrix(domain)
+        if not meta:
+            return []
+        query_embedding = np.asarray(self.embedder.encode([query], convert_to_numpy=True), dtype=np.float32)[0]
+        query_embedding /= np.linalg.norm(query_embedding) + 1e-8
+        scores = matrix @ query_embedding
+        top = np.argsort(scores)[-k:][::-1]
+        return [{"url": meta[i][0], "title": meta[i][1], "text": meta[i][2], "score": float(scores[i])} for i in top]
+
+    def stats(self, domain: Optional[str] = None) -> Dict:
+        """Zwraca liczbę stron i fragmentów (dla domeny lub całego indeksu) oraz rozmiar bazy w bajtach."""
+        where, args = ("WHERE domain = ?", (domain,)) if domain else ("", ())
+        with self.lock:
+            pages = self.conn.execute(f"SELECT COUNT(*) FROM pages {where}", args).fetchone()[0]
+            chunks = self.conn.execute(f"SELECT COUNT(*) FROM chunks {where}", args).fetchone()[0]
+        size = sum(os.path.getsize(path) for path in (self.db_path, self.db_path + "-wal") if os.path.exists(path))
+        return {"pages": pages, "chunks": chunks, "bytes": size}
+
+    def close(self):
+        """Zamyka połączenie z bazą."""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,140 @@
+import logging
+import time
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Progi złożoności strony, powyżej których opis z reguł jest skrótem, a opis modelu może pomóc
+COMPLEX_HEADINGS = 40
+COMPLEX_PARTS = 12
+COMPLEX_DEPTH = 4
+COMPLEX_SECTIONS = 30
+
+def plural(count: int, one: str, few: str, many: str) -> str:
+    """Zwraca liczbę z polską formą rzeczownika ('1 dział', '3 działy', '5 działów')."""
+    if count == 1:
+        return f"{count} {one}"
+    if count % 10 in (2, 3, 4) and count % 100 not in (12, 13, 14):
+        return f"{count} {few}"
+    return f"{count} {many}"
+
+def heading_tree(headings: List[Dict]) -> List[Dict]:
+    """Buduje drzewo nagłówków według poziomów: [{'text', 'level', 'children': [...]}]."""
+    root = {"text": "", "level": 0, "children": []}
+    stack = [root]
+    previous = None
+    for heading in headings:
+        text = heading.get("text", "")
+        if not text or text == previous:
+            continue
+        previous = text
+        node = {"text": text, "level": heading["level"], "aria_label": heading.get("aria_label"), "children": []}
+        while stack[-1]["level"] >= node["level"]:
+            stack.pop()
+        stack[-1]["children"].append(node)
+        stack.append(node)
+    return root["children"]
+
+def _depth(nodes: List[Dict]) -> int:
+    return max((1 + _depth(node["children"]) for node in nodes), default=0)
+
+def _count(nodes: List[Dict]) -> int:
+    return sum(1 + _count(node["children"]) for node in nodes)
+
+def build_outline(headings: List[Dict], sections: List[Dict]) -> Dict:
+    """
+    Buduje konspekt strony: tytuł (jedyny nagłówek najwyższego poziomu), działy z podsekcjami
+    i regiony strony (role ARIA z sekcji, w kolejności pierwszego wystąpienia, z liczbą wystąpień).
+    """
+    parts = heading_tree(headings)
+    title = ""
+    if len(parts) == 1 and parts[0]["level"] == 1:
+        title = parts[0]["text"]
+        parts = parts[0]["children"]
+    landmarks: Dict[str, int] = {}
+    for section in sections:
+        if section.get("role", "unknown") == "unknown":
+            continue
+        name = section.get("description") or section["role"]
+        landmarks[name] = landmarks.get(name, 0) + 1
+    heading_count = _count(parts) + (1 if title else 0)
+    depth = _depth(parts)
+    return {
+        "title": title,
+        "parts": parts,
+        "landmarks": landmarks,
+        "heading_count": heading_count,
+        "section_count": len(sections),
+        "depth": depth,
+        "complex": heading_count > COMPLEX_HEADINGS or len(parts) > COMPLEX_PARTS or depth >= COMPLEX_DEPTH
+                   or (not heading_count and len(sections) > COMPLEX_SECTIONS),
+    }
+
+def _names(nodes: List[Dict], limit: int) -> str:
+    """Wylicza nazwy węzłów, skracając listę do limitu ('a, b i 3 inne')."""
+    names = [node["text"] for node in nodes[:limit]]
+    rest = len(nodes) - len(names)
+    if rest:
+        return f"{', '.join(names)} i {plural(rest, 'inna', 'inne', 'innych')}"
+    return names[0] if len(names) == 1 else f"{', '.join(names[:-1])} i {names[-1]}"
+
+def outline_text(outline: Dict, max_parts: int = 8, max_children: int = 4) -> str:
+    """Zwraca opis konspektu do odczytania: tytuł, regiony strony i działy z podsekcjami."""
+    sentences = []
+    if outline["title"]:
+        sentences.append(f"Strona: {outline['title']}.")
+    if outline["landmarks"]:
+        regions = [name if count == 1 else f"{name} ({count})" for name, count in outline["landmarks"].items()]
+        sentences.append(f"Obszary strony: {', '.join(regions)}.")
+    parts = outline["parts"]
+    if parts:
+        sentences.append(f"Treść ma {plural(outline['heading_count'], 'nagłówek', 'nagłówki', 'nagłówków')} "
+                         f"w {plural(len(parts), 'dziale', 'działach', 'działach')}:")
+        for number, part in enumerate(parts[:max_parts], 1):
+            children = part["children"]
+            if children:
+                sentences.append(f"{number}. {part['text']}, "
+                                 f"{plural(len(children), 'podsekcja', 'podsekcje', 'podsekcji')}: "
+                                 f"{_names(children, max_children)}.")
+            else:
+                sentences.append(f"{number}. {part['text']}.")
+        if len(parts) > max_parts:
+            sentences.append(f"Oraz {plural(len(parts) - max_parts, 'dalszy dział', 'dalsze działy', 'dalszych działów')}.")
+    elif not outline["title"]:
+        sentences.append("Strona nie ma nagłówków.")
+    return " ".join(sentences)
+
+def describe_structure(page_data: Dict) -> Dict:
+    """
+    Opisuje strukturę strony z nagłówków i sekcji (regionów ARIA) według reguł, bez modelu językowego.
+
+    Returns:
+        Wynik w formacie operacji PageAssistant {'text', 'time', 'vram_usage', 'error'} z polami
+        'source' ('rules'), 'complex' (czy opis modelu może być pełniejszy) i 'outline'.
+    """
+    start_time = time.time()
+    result = {"text": None, "time": 0.0, "vram_usage": 0.0, "error": None, "source": "rules", "complex": False}
+    headings = page_data.get("headings", [])
+    sections = page_data.get("sections", [])
+    if not headings and not sections:
+        result["error"] = "Brak danych o nagłówkach lub sekcjach do opisu struktury"
+    else:
+        outline = build_outline(headings, sections)
+        result.update(text=outline_text(outline), complex=outline["complex"], outline=outline)
+    result["time"] = time.time() - start_time
+    print(f"Opis struktury z reguł w {result['time'] * 1000:.1f} ms")
+    return result
+
+def _narrate(nodes: List[Dict], prefix: str, lines: List[str]) -> None:
+    for number, node in enumerate(nodes, 1):
+        text = node["text"]
+        if node.get("aria_label") and node["aria_label"] != text:
+            text += f" ({node['aria_label']})"
+        lines.append(f"{prefix}{number}. {text}")
+        _narrate(node["children"], f"{prefix}{number}.", lines)
+
+def narrate_headings(headings: List[Dict]) -> str:
+    """Zwraca wszystkie nagłówki do odczytania jako konspekt numerowany według zagnieżdżenia (1., 1.1., 1.2.)."""
+    lines: List[str] = []
+    _narrate(heading_tree(headings), "", lines)
+    return "\n".join(lines)
@@ -0,0 +1,235 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+logger = logging.getLogger(__name__)
+
+# Dni tygodnia schema.org -> polskie skróty
+DAY_NAMES = {
+    "monday": "pon.", "tuesday": "wt.", "wednesday": "śr.", "thursday": "czw.",
+    "friday": "pt.", "saturday": "sob.", "sunday": "niedz.",
+    "mo": "pon.", "tu": "wt.", "we": "śr.", "th": "czw.", "fr": "pt.", "sa": "sob.", "su": "niedz."
+}
+
+AVAILABILITY = {
+    "instock": "dostępny", "outofstock": "niedostępny", "preorder": "przedsprzedaż",
+    "limitedavailability": "ograniczona dostępność", "soldout": "wyprzedany", "discontinued": "wycofany",
+    "instoreonly": "tylko w sklepie stacjonarnym", "onlineonly": "tylko online"
+}
+
+def _text(value: Any) -> str:
+    """Zamienia wartość schema.org (tekst, liczba, obiekt z 'name') na tekst."""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return _text(value.get("name") or value.get("@value") or value.get("text") or "")
+    if isinstance(value, list):
+        return ", ".join(t for t in (_text(v) for v in value) if t)
+    return re.sub(r"\s+", " ", str(value)).strip()
+
+def _type_of(entity: Dict) -> str:
+    entity_type = entity.get("@type", "")
+    if isinstance(entity_type, list):
+        entity_type = entity_type[0] if entity_type else ""
+    return str(entity_type).rsplit("/", 1)[-1]
+
+def format_duration(value: str) -> str:
+    """Zamienia czas ISO 8601 (np. PT1H30M) na tekst (1 godz. 30 min)."""
+    match = re.fullmatch(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:\d+S)?)?", value.strip().upper())
+    if not match or not any(match.groups()):
+        return value
+    days, hours, minutes = (int(g) if g else 0 for g in match.groups())
+    hours += days * 24
+    parts = []
+    if hours:
+        parts.append(f"{hours} godz.")
+    if minutes:
+        parts.append(f"{minutes} min")
+    return " ".join(parts)
+
+def _format_price(offer: Dict) -> str:
+    currency = _text(offer.get("priceCurrency"))
+    if offer.get("lowPrice") or offer.get("highPrice"):
+        low, high = _text(offer.get("lowPrice")), _text(offer.get("highPrice"))
+        price = f"{low}–{high}" if low and high and low != high else (low or high)
+    else:
+        price = _text(offer.get("price"))
+    return f"{price} {currency}".strip() if price else ""
+
+def _format_address(address: Any) -> str:
+    if not isinstance(address, dict):
+        return _text(address)
+    locality = " ".join(filter(None, [_text(address.get("postalCode")), _text(address.get("addressLocality"))]))
+    parts = [_text(address.get("streetAddress")), locality, _text(address.get("addressRegion")),
+             _text(address.get("addressCountry"))]
+    return ", ".join(p for p in parts if p)
+
+def _format_opening_hours(entity: Dict) -> List[str]:
+    hours = []
+    raw = entity.get("openingHours")
+    for spec in raw if isinstance(raw, list) else [raw] if raw else []:
+        text = _text(spec)
+        for code, name in DAY_NAMES.items():
+            if len(code) == 2:
+                text = re.sub(rf"\b{code.capitalize()}\b", name, text)
+        hours.append(text)
+    specs = entity.get("openingHoursSpecification")
+    for spec in specs if isinstance(specs, list) else [specs] if specs else []:
+        if not isinstance(spec, dict):
+            continue
+        days = spec.get("dayOfWeek", [])
+        days = days if isinstance(days, list) else [days]
+        day_names = [DAY_NAMES.get(_text(d).rsplit("/", 1)[-1].lower(), _text(d)) for d in days]
+        opens, closes = _text(spec.get("opens"))[:5], _text(spec.get("closes"))[:5]
+        if opens or closes:
+            hours.append(f"{', '.join(day_names)} {opens}–{closes}".strip())
+    return hours
+
+def _format_rating(rating: Any) -> str:
+    if not isinstance(rating, dict):
+        return _text(rating)
+    value = _text(rating.get("ratingValue"))
+    if not value:
+        return ""
+    best = _text(rating.get("bestRating")) or "5"
+    count = _text(rating.get("ratingCount") or rating.get("reviewCount"))
+    return f"{value}/{best}" + (f" ({count} ocen)" if count else "")
+
+def normalize_entity(entity: Dict, source: str) -> List[Dict]:
+    """
+    Zamienia obiekt schema.org na listę faktów {'type', 'subject', 'property', 'value', 'source'}.
+    Obiekty zagnieżdżone (np. oferty, oceny, adresy) są rozwijane do faktów obiektu nadrzędnego.
+    """
+    entity_type = _type_of(entity)
+    subject = _text(entity.get("name") or entity.get("headline"))
+    facts = []
+
+    def add(prop: str, value: Any):
+        value = value if isinstance(value, str) else _text(value)
+        if value:
+            facts.append({"type": entity_type, "subject": subject, "property": prop, "value": value, "source": source})
+
+    offers = entity.get("offers")
+    offers = list(offers) if isinstance(offers, list) else [offers] if offers else []
+    if entity.get("price") or entity.get("lowPrice"):
+        offers.append(entity)
+    for offer in offers:
+        if isinstance(offer, dict):
+            add("price", _format_price(offer))
+            availability = _text(offer.get("availability")).rsplit("/", 1)[-1]
+            add("availability", AVAILABILITY.get(availability.lower(), availability))
+    add("rating", _format_rating(entity.get("aggregateRating")))
+    add("address", _format_address(entity.get("address")))
+    for hours in _format_opening_hours(entity):
+        add("opening_hours", hours)
+    add("telephone", entity.get("telephone"))
+    add("email", _text(entity.get("email")).replace("mailto:", ""))
+    add("brand", entity.get("brand"))
+    add("author", entity.get("author"))
+    add("date_published", _text(entity.get("datePublished"))[:10])
+    add("sku", entity.get("sku") or entity.get("gtin13") or entity.get("gtin"))
+    ingredients = entity.get("recipeIngredient") or entity.get("ingredients")
+    if ingredients:
+        add("ingredients", "; ".join(_text(i) for i in (ingredients if isinstance(ingredients, list) else [ingredients])))
+    add("servings", entity.get("recipeYield"))
+    for prop, key in (("prep_time", "prepTime"), ("cook_time", "cookTime"), ("total_time", "totalTime")):
+        if entity.get(key):
+            add(prop, format_duration(_text(entity.get(key))))
+    if entity_type in ("Event",):
+        add("start_date", _text(entity.get("startDate"))[:16].replace("T", " "))
+        add("location", _text(entity.get("location")))
+    return facts
+
+def _walk_json_ld(node: Any, entities: List[Dict]) -> None:
+    """Zbiera obiekty z @type z dokumentu JSON-LD (także z @graph i obiektów zagnieżdżonych w listach)."""
+    if isinstance(node, list):
+        for item in node:
+            _walk_json_ld(item, entities)
+    elif isinstance(node, dict):
+        if "@graph" in node:
+            _walk_json_ld(node["@graph"], entities)
+        if "@type" in node:
+            entities.append(node)
+        for key in ("mainEntity", "itemListElement", "item"):
+            if isinstance(node.get(key), (dict, list)):
+                _walk_json_ld(node[key], entities)
+
+def _microdata_value(tag: Tag) -> Any:
+    if tag.has_attr("itemscope"):
+        return _microdata_item(tag)
+    for attr in ("content", "datetime", "href", "src", "value"):
+        if tag.has_attr(attr):
+            return tag[attr]
+    return tag.get_text(" ", strip=True)
+
+def _microdata_item(scope: Tag) -> Dict:
+    """Buduje obiekt schema.org z elementu itemscope (właściwości z najbliższym itemscope = scope)."""
+    item: Dict[str, Any] = {"@type": (scope.get("itemtype") or "").split()[0] if scope.get("itemtype") else ""}
+    for prop_tag in scope.find_all(attrs={"itemprop": True}):
+        owner = prop_tag.find_parent(attrs={"itemscope": True})
+        if owner is not scope:
+            continue
+        for name in prop_tag["itemprop"].split():
+            value = _microdata_value(prop_tag)
+            if name in item:
+                existing = item[name] if isinstance(item[name], list) else [item[name]]
+                item[name] = existing + [value]
+            else:
+                item[name] = value
+    return item
+
+def extract_structured_data(soup: BeautifulSoup) -> Dict:
+    """
+    Ekstrahuje dane strukturalne strony (JSON-LD, microdata, OpenGraph) do znormalizowanej tabeli faktów.
+
+    Returns:
+        Dict z kluczami 'facts' (lista faktów) i 'types' (typy schema.org obecne na stronie).
+    """
+    facts: List[Dict] = []
+    types = set()
+
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            document = json.loads(script.string or script.get_text() or "")
+        except ValueError as e:
+            logger.debug(f"Nieprawidłowy JSON-LD: {e}")
+            continue
+        entities: List[Dict] = []
+        _walk_json_ld(document, entities)
+        for entity in entities:
+            types.add(_type_of(entity))
+            facts.extend(normalize_entity(entity, "json-ld"))
+
+    for scope in soup.find_all(attrs={"itemscope": True}):
+        if scope.has_attr("itemprop"):
+            continue  # Obiekt zagnieżdżony, rozwijany przez obiekt nadrzędny
+        item = _microdata_item(scope)
+        if item["@type"]:
+            types.add(_type_of(item))
+            facts.extend(normalize_entity(item, "microdata"))
+
+    og = {meta.get("property"): meta.get("content", "") for meta in soup.find_all("meta", property=True)}
+    if og.get("product:price:amount") or og.get("og:price:amount"):
+        facts.extend(normalize_entity({
+            "@type": og.get("og:type", "product"),
+            "name": og.get("og:title", ""),
+            "price": og.get("product:price:amount") or og.get("og:price:amount"),
+            "priceCurrency": og.get("product:price:currency") or og.get("og:price:currency", ""),
+            "availability": og.get("product:availability", "")
+        }, "opengraph"))
+
+    unique = list({(f["subject"], f["property"], f["value"]): f for f in facts}.values())
+    return {"facts": unique, "types": sorted(t for t in types if t)}
+
+def format_facts(facts: List[Dict], properties: Optional[List[str]] = None) -> str:
+    """Formatuje fakty (opcjonalnie tylko wybrane właściwości) jako zwięzłe linie tekstu."""
+    lines = []
+    for fact in facts:
+        if properties and fact["property"] not in properties:
+            continue
+        subject = f"{fact['subject']} " if fact["subject"] else ""
+        lines.append(f"- {subject}[{fact['type']}] {fact['property']}: {fact['value']}")
+    return "\n".join(lines)
@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote, urlparse
+
+import wikipediaapi
+
+from web.page_index import TitleIndex
+
+logger = logging.getLogger(__name__)
+
+def normalize_title(title: str) -> str:
+    """Zwraca klucz tytułu artykułu lub sekcji: NFC, spacje zamiast podkreśleń, małe litery."""
+    return " ".join(unicodedata.normalize("NFC", title or "").replace("_", " ").split()).casefold()
+
+@dataclass
+class WikiArticle:
+    """Artykuł Wikipedii z drzewem sekcji i indeksem sekcji po tytule."""
+    title: str
+    url: str
+    summary: str
+    text: str
+    # Drzewo sekcji: {'title', 'level', 'text', 'sections': [...]}
+    sections: List[Dict] = field(default_factory=list)
+    section_index: Dict[str, Dict] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        if not self.section_index:
+            self._index_sections(self.sections)
+
+    def _index_sections(self, sections: List[Dict]) -> None:
+        for section in sections:
+            # Przy powtórzonych tytułach (np. "Przypisy" w podsekcjach) wygrywa pierwsza sekcja
+            self.section_index.setdefault(normalize_title(section["title"]), section)
+            self._index_sections(section.get("sections", []))
+
+    def exists(self) -> bool:
+        return True
+
+    @cached_property
+    def content(self) -> Dict:
+        """
+        Treść artykułu w formacie słownika 'content' scrapera (tytuł i sekcje jako nagłówki, tekst
+        artykułu), np. dla kontekstu PageAssistant; ten sam obiekt przy każdym odczycie.
+        """
+        headings = [{"level": 1, "text": self.title}]
+
+        def collect(sections: List[Dict]) -> None:
+            for section in sections:
+                # Sekcje najwyższego poziomu artykułu odpowiadają nagłówkom h2 strony
+                headings.append({"level": section["level"] + 1, "text": section["title"]})
+                collect(section.get("sections", []))
+
+        collect(self.sections)
+        return {"headings": headings, "paragraphs": [], "lists": {"ordered": [], "unordered": []},
+                "links": [], "text": self.text}
+
+    @cached_property
+    def title_index(self) -> TitleIndex:
+        return TitleIndex(list(self.section_index))
+
+    def section(self, name: str) -> Optional[Dict]:
+        """Zwraca sekcję o tytule (bez względu na wielkość liter); gdy brak, najlepiej pasującą do nazwy."""
+        key = normalize_title(name)
+        section = self.section_index.get(key)
+        if section is None and key:
+            # Tytuł zawierający słowa nazwy bez względu na znaki diakrytyczne, odmianę i literówki
+            best = self.title_index.best(key)
+            section = self.section_index[self.title_index.titles[best]] if best is not None else None
+        return section
+
+    def to_dict(self) -> Dict:
+        return {"title": self.title, "url": self.url, "summary": self.summary, "text": self.text,
+                "sections": self.sections}
+
+    @classmethod
+    def from_page(cls, page) -> "WikiArticle":
+        """Buduje artykuł ze strony wikipediaapi (tekst, streszczenie i sekcje z jednego zapytania o treść)."""
+        def convert(sections) -> List[Dict]:
+            return [{"title": s.title, "level": s.level, "text": s.text, "sections": convert(s.sections)}
+                    for s in sections]
+        return cls(title=page.title, url=page.fullurl, summary=page.summary, text=page.text,
+                   sections=convert(page.sections))
+
+class WikipediaDump:
+    """
+    Lokalny zrzut artykułów w formacie JSON Lines (jeden artykuł na wiersz: 'title', 'text',
+    opcjonalnie 'url', 'summary' i 'sections'), np. z wikiextractor --json.
+
+    Przy pierwszym użyciu zrzut jest jednorazowo skanowany, a przesunięcia wierszy per tytuł
+    zapisywane obok pliku (.idx), więc odczyt artykułu to jedno przesunięcie i odczyt wiersza.
+    """
+
+    def __init__(self, path: str, language: str = "pl"):
+        self.path = path
+        self.language = language
+        self.offsets: Optional[Dict[str, int]] = None
+        self.lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, int]:
+        index_path = self.path + ".idx"
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(self.path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        start_time = time.time()
+        offsets = {}
+        with open(self.path, "rb") as f:
+            offset = f.tell()
+            for line in iter(f.readline, b""):
+                try:
+                    title = json.loads(line)["title"]
+                    offsets.setdefault(normalize_title(title), offset)
+                except (ValueError, KeyError):
+                    pass
+                offset = f.tell()
+        try:
+            with open(index_path, "w", encoding="utf-8") as f:
+                json.dump(offsets, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"Nie udało się zapisać indeksu zrzutu Wikipedii {index_path}: {e}")
+        logger.info(f"Zindeksowano zrzut Wikipedii {self.path}: {len(offsets)} artykułów w {time.time() - start_time:.1f}s")
+        return offsets
+
+    def get(self, title: str) -> Optional[WikiArticle]:
+        """Zwraca artykuł ze zrzutu lub None."""
+        with self.lock:
+            if self.offsets is None:
+                self.offsets = self._load_index()
+            offset = self.offsets.get(normalize_title(title))
+            if offset is None:
+                return None
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                record = json.loads(f.readline())
+        text = record.get("text", "")
+        url = record.get("url") or f"https://{self.language}.wikipedia.org/wiki/{quote(record['title'].replace(' ', '_'))}"
+        summary = record.get("summary") or text.split("\n\n", 1)[0]
+        return WikiArticle(title=record["title"], url=url, summary=summary, text=text,
+                           sections=record.get("sections", []))
+
+class WikipediaService:
+    """
+    Wspólny dostęp do artykułów Wikipedii dla BrowserManager i CommandParser.
+
+    Artykuł jest pobierany raz (streszczenie, tekst i sekcje) i przechowywany w pamięci (LRU)
+    oraz w trwałym magazynie na dysku (SQLite + zlib); opcjonalnie artykuły są czytane
+    z lokalnego zrzutu, bez sieci. Drzewo sekcji jest budowane raz, z indeksem po tytule.
+    """
+
+    def __init__(self, language: str = "pl", db_path: Optional[str] = "wikipedia_cache.sqlite",
+                 dump_path: Optional[str] = None, max_memory: int = 32, max_age: int = 7 * 24 * 3600,
+                 user_agent: str = "WebAssistBot/1.0"):
+        """
+        Args:
+            language: Domyślny język Wikipedii.
+            db_path: Plik trwałego magazynu artykułów (None = tylko pamięć).
+            dump_path: Lokalny zrzut artykułów JSON Lines (sprawdzany przed siecią).
+            max_memory: Liczba artykułów przechowywanych w pamięci.
+            max_age: Czas świeżości artykułu w magazynie w sekundach.
+            user_agent: Identyfikator klienta API Wikipedii.
+        """
+        self.language = language
+        self.max_memory = max_memory
+        self.max_age = max_age
+        self.user_agent = user_agent
+        self.clients: Dict[str, wikipediaapi.Wikipedia] = {}
+        self.memory: "OrderedDict[str, WikiArticle]" = OrderedDict()
+        self.dump = WikipediaDump(dump_path, language) if dump_path and os.path.exists(dump_path) else None
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False) if db_path else None
+        if self.conn:
+            with self.conn:
+                self.conn.execute("""
+                    CREATE TABLE IF NOT EXISTS articles (
+                        key TEXT PRIMARY KEY,
+                        data BLOB NOT NULL,
+                        fetched_at REAL NOT NULL
+                    )
+                """)
+        self.stats = {"memory": 0, "disk": 0, "dump": 0, "network": 0, "missing": 0}
+
+    def _client(self, language: str) -> wikipediaapi.Wikipedia:
+        if language not in self.clients:
+            self.clients[language] = wikipediaapi.Wikipedia(self.user_agent, language)
+        return self.clients[language]
+
+    @staticmethod
+    def title_from_url(url: str) -> Optional[tuple]:
+        """Zwraca (język, tytuł) dla adresu artykułu Wikipedii lub None."""
+        parsed = urlparse(url or "")
+        host = parsed.netloc.lower()
+        if not host.endswith("wikipedia.org") or not parsed.path.startswith("/wiki/"):
+            return None
+        language = host.split(".")[0] if host.count(".") >= 2 else "pl"
+        return language, unquote(parsed.path[len("/wiki/"):]).replace("_", " ")
+
+    def _read_disk(self, key: str) -> Optional[WikiArticle]:
+        if not self.conn:
+            return None
+        row = self.conn.execute("SELECT data, fetched_at FROM articles WHERE key = ?", (key,)).fetchone()
+        if not row or time.time() - row[1] > self.max_age:
+            return None
+        return WikiArticle(**json.loads(zlib.decompress(row[0]).decode("utf-8")))
+
+    def _write_disk(self, key: str, article: WikiArticle) -> None:
+        if not self.conn:
+            return
+        data = zlib.compress(json.dumps(article.to_dict(), ensure_ascii=False).encode("utf-8"))
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO articles (key, data, fetched_at) VALUES (?, ?, ?)",
+                              (key, data, time.time()))
+
+    def _remember(self, key: str, article: WikiArticle) -> None:
+        self.memory[key] = article
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory:
+            self.memory.popitem(last=False)
+
+    def article(self, title: str, language: Optional[str] = None) -> Optional[WikiArticle]:
+        """
+        Zwraca artykuł o tytule: z pamięci, magazynu na dysku, zrzutu lub (ostatecznie) z sieci.
+
+        Returns:
+            Artykuł lub None, jeśli nie istnieje.
+        """
+        language = language or self.language
+        key = f"{language}:{normalize_title(title)}"
+        with self.lock:
+            article = self.memory.get(key)
+            if article is not None:
+                self.memory.move_to_end(key)
+                self.stats["memory"] += 1
+                return article
+            try:
+                article = self._read_disk(key)
+            except (sqlite3.Error, ValueError, zlib.error) as e:
+                logger.warning(f"Błąd odczytu artykułu {title} z magazynu: {e}")
+            if article is not None:
+                return self._store(key, language, article, "disk")
+            client = self._client(language)
+        # Zrzut (pierwszy odczyt skanuje cały plik do indeksu, pod blokadą zrzutu) i sieć są czytane
+        # bez blokady usługi, aby inne wątki mogły w tym czasie czytać artykuły z pamięci
+        if self.dump and language == self.language:
+            article = self.dump.get(title)
+            if article is not None:
+                with self.lock:
+                    return self._store(key, language, article, "dump")
+        page = client.page(title)
+        if not page.exists():
+            with self.lock:
+                self.stats["missing"] += 1
+            return None
+        article = WikiArticle.from_page(page)
+        with self.lock:
+            if key in self.memory:
+                # Ten sam artykuł pobrał w międzyczasie inny wątek
+                return self.memory[key]
+            try:
+                self._write_disk(key, article)
+            except sqlite3.Error as e:
+                logger.warning(f"Błąd zapisu artykułu {title} do magazynu: {e}")
+            return self._store(key, language, article, "network")
+
+    def _store(self, key: str, language: str, article: WikiArticle, source: str) -> WikiArticle:
+        """Zapamiętuje artykuł w pamięci pod kluczem zapytania i tytułem kanonicznym (wywoływane pod blokadą)."""
+        self.stats[source] += 1
+        self._remember(key, article)
+        # Artykuł jest dostępny także pod tytułem kanonicznym (np. po przekierowaniu)
+        self._remember(f"{language}:{normalize_title(article.title)}", article)
+        return article
+
+    def article_for_url(self, url: str) -> Optional[WikiArticle]:
+        """Zwraca artykuł dla adresu strony Wikipedii (None dla innych stron)."""
+        parsed = self.title_from_url(url)
+        if not parsed:
+            return None
+        language, title = parsed
+        return self.article(title, language)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
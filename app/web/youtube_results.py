@@ -0,0 +1,94 @@
+import logging
+import time
+from typing import Dict, List
+from urllib.parse import quote_plus
+
+from playwright.sync_api import Page
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_SEARCH_URL = "https://www.youtube.com/results?search_query="
+
+# Wyniki wyszukiwania YouTube z danych startowych strony (ytInitialData, osadzonych w HTML), odczytane
+# jednym wywołaniem; bez danych startowych (np. zmieniony układ) z wyrenderowanych elementów wyników.
+# null, gdy wyniki jeszcze nie są dostępne.
+YOUTUBE_RESULTS_SCRIPT = """
+(maxResults) => {
+    const text = (t) => !t ? '' : (t.simpleText || (t.runs || []).map(r => r.text).join('')).trim();
+    const videos = [];
+    const seen = new Set();
+    const add = (video) => {
+        if (!video.videoId || seen.has(video.videoId)) return;
+        seen.add(video.videoId);
+        videos.push(video);
+    };
+    const data = window.ytInitialData;
+    if (data) {
+        // Przejście w głąb w kolejności dokumentu; liczą się tylko zwykłe filmy (bez reklam, shortsów, kanałów)
+        const stack = [data];
+        while (stack.length && videos.length < maxResults) {
+            const node = stack.pop();
+            if (!node || typeof node !== 'object') continue;
+            if (node.videoRenderer) {
+                const v = node.videoRenderer;
+                add({
+                    videoId: v.videoId,
+                    title: text(v.title),
+                    channel: text(v.ownerText || v.longBylineText),
+                    duration: text(v.lengthText),
+                    views: text(v.viewCountText),
+                    published: text(v.publishedTimeText),
+                });
+                continue;
+            }
+            const children = Array.isArray(node) ? node : Object.values(node);
+            for (let i = children.length - 1; i >= 0; i--) {
+                if (children[i] && typeof children[i] === 'object') stack.push(children[i]);
+            }
+        }
+        return videos;
+    }
+    const links = document.querySelectorAll('ytd-video-renderer a#video-title');
+    if (!links.length) return null;
+    for (const link of links) {
+        const match = (link.getAttribute('href') || '').match(/[?&]v=([\\w-]{11})/);
+        if (match) add({videoId: match[1], title: (link.getAttribute('title') || link.textContent || '').trim(),
+                        channel: '', duration: '', views: '', published: ''});
+        if (videos.length >= maxResults) break;
+    }
+    return videos;
+}
+"""
+
+def youtube_search_url(query: str) -> str:
+    return f"{YOUTUBE_SEARCH_URL}{quote_plus(query)}"
+
+def extract_youtube_results(page: Page, max_results: int = 10, timeout_ms: int = 8000,
+                            poll_interval: int = 100) -> List[Dict]:
+    """
+    Odczytuje filmy z załadowanej strony wyników YouTube, czekając tylko na dane startowe strony.
+
+    Returns:
+        Lista filmów {'index', 'video_id', 'title', 'url', 'channel', 'duration', 'views', 'published'}.
+    """
+    deadline = time.time() + timeout_ms / 1000
+    found = None
+    while True:
+        try:
+            found = page.evaluate(YOUTUBE_RESULTS_SCRIPT, max_results)
+        except Exception as e:
+            # Kontekst wykonania zniszczony przez trwającą nawigację
+            logger.debug(f"Odczyt wyników YouTube nieudany: {e}")
+        if found is not None or time.time() >= deadline:
+            break
+        page.wait_for_timeout(poll_interval)
+    return [{
+        "index": i,
+        "video_id": video["videoId"],
+        "title": video["title"] or "Film bez tytułu",
+        "url": f"https://www.youtube.com/watch?v={video['videoId']}",
+        "channel": video["channel"],
+        "duration": video["duration"],
+        "views": video["views"],
+        "published": video["published"],
+    } for i, video in enumerate(found or [], 1)]